@@ -19,6 +19,7 @@ from piperider_cli.feedback import Feedback
 from piperider_cli.generate_report import GenerateReport
 from piperider_cli.guide import Guide
 from piperider_cli.initializer import Initializer
+from piperider_cli.runresult import load_run_result
 
 release_version = __version__ if sentry_env != 'development' else None
 
@@ -107,8 +108,7 @@ class RunDataPath(click.Path):
 
     def read_file(self, rv):
         try:
-            with open(rv) as fh:
-                return json.loads(fh.read())
+            return load_run_result(rv)
         except BaseException:
             raise ValueError('failed to read data')
 
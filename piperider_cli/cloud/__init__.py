@@ -11,6 +11,7 @@ from piperider_cli import __version__
 from piperider_cli.configuration import Configuration
 from piperider_cli.error import PipeRiderNoDefaultProjectError, CloudReportError, PipeRiderConfigError
 from piperider_cli.event import load_user_profile, update_user_profile
+from piperider_cli.runresult import open_run_json_as_plain
 
 PIPERIDER_CLOUD_SERVICE = 'https://cloud.piperider.io/'
 
@@ -299,7 +300,7 @@ class PipeRiderCloud:
             if show_progress and upload_progress:
                 upload_progress.update(task_id, completed=monitor.bytes_read)
 
-        with open(file_path, 'rb') as file:
+        with open_run_json_as_plain(file_path) as file:
             encoder = MultipartEncoder(
                 fields={'file': ('run.json', file)},
             )
@@ -18,6 +18,7 @@ from piperider_cli.configuration import Configuration
 from piperider_cli.datasource import FANCY_USER_INPUT
 from piperider_cli.error import CloudReportError
 from piperider_cli.githubutil import fetch_pr_metadata
+from piperider_cli.runresult import detect_run_format, load_run_result, update_report_index, write_run_result
 
 console = Console()
 piperider_cloud = PipeRiderCloud()
@@ -234,8 +235,7 @@ def upload_to_cloud(run: RunOutput, debug=False, project: PipeRiderProject = Non
     # TODO refine the output when API is ready
 
     def _patch_cloud_upload_response(run_path, project: PipeRiderProject, run_id):
-        with open(run_path, 'r') as f:
-            report = json.load(f)
+        report = load_run_result(run_path)
         if isinstance(project, PipeRiderTemporaryProject):
             report['cloud'] = {
                 'run_id': run_id,
@@ -246,8 +246,8 @@ def upload_to_cloud(run: RunOutput, debug=False, project: PipeRiderProject = Non
                 'run_id': run_id,
                 'project_name': f'{project.workspace_name}/{project.name}'
             }
-        with open(run_path, 'w', encoding='utf-8') as f:
-            f.write(json.dumps(report, separators=(',', ':')))
+        header = write_run_result(run_path, report, run_format=detect_run_format(run_path))
+        update_report_index(run_path, header)
 
     if response.get('success') is True:
         run_id = response.get('id')
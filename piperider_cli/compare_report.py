@@ -10,18 +10,20 @@ import readchar
 from rich.console import Console
 
 import piperider_cli.hack.inquirer as inquirer_hack
-from piperider_cli import clone_directory, datetime_to_str, open_report_in_browser, \
+from piperider_cli import datetime_to_str, open_report_in_browser, \
     raise_exception_when_directory_not_writable, str_to_datetime
 from piperider_cli.configuration import Configuration, ReportDirectory
 from piperider_cli.dbt.changeset import SummaryChangeSet
 from piperider_cli.dbt.utils import ChangeType
-from piperider_cli.generate_report import setup_report_variables
+from piperider_cli.generate_report import clone_report, link_report_assets, write_report_html
 from piperider_cli.githubutil import fetch_pr_metadata
+from piperider_cli.runresult import ReportIndex, find_run_jsons, load_run_result, read_run_header, \
+    summarize_run_result
 from piperider_cli.utils import create_link, remove_link
 
 
 class RunOutput(object):
-    def __init__(self, path):
+    def __init__(self, path, summary: dict = None, file_size: int = None):
         self.path = path
         self.name = None
         self.created_at = None
@@ -30,38 +32,41 @@ class RunOutput(object):
         self.pass_count = 0
         self.fail_count = 0
         self.cloud = None
-        self.file_size = os.path.getsize(path)
+        self.file_size = file_size if file_size is not None else os.path.getsize(path)
+
+        header = summary if summary is not None else read_run_header(path)
+        if header is not None:
+            self._set_summary(header)
+            return
 
         try:
-            with open(path, 'r') as f:
-                run_result = json.load(f)
-                self.report_id = run_result['id']
-                self.name = run_result['datasource']['name']
-                self.created_at = run_result['created_at']
-
-                tables = run_result.get('tables', {})
-                self.table_count = len(tables.keys())
-
-                for test in run_result.get('tests', []):
-                    if test.get('status') == 'passed':
-                        self.pass_count += 1
-                    else:
-                        self.fail_count += 1
-                self.cloud = run_result.get('cloud')
+            run_result = load_run_result(path)
+            self._set_summary(summarize_run_result(run_result))
         except Exception as e:
             if isinstance(e, json.decoder.JSONDecodeError):
                 raise json.decoder.JSONDecodeError(
                     f'Invalid JSON in file "{path}"', e.doc, e.pos)
             raise e
 
+    def _set_summary(self, summary: dict):
+        self.report_id = summary['id']
+        self.name = summary['name']
+        self.created_at = summary['created_at']
+        self.table_count = summary['table_count']
+        self.pass_count = summary['pass_count']
+        self.fail_count = summary['fail_count']
+        self.cloud = summary.get('cloud')
+
+    def summary(self) -> dict:
+        return dict(id=self.report_id, name=self.name, created_at=self.created_at, table_count=self.table_count,
+                    pass_count=self.pass_count, fail_count=self.fail_count, cloud=self.cloud)
+
     def verify(self) -> bool:
         # TODO: add some verification logic
         return True
 
     def load(self):
-        with open(self.path, 'r') as f:
-            data = json.load(f)
-        return data
+        return load_run_result(self.path)
 
     def refresh(self):
         self.__init__(self.path)
@@ -195,12 +200,13 @@ class ComparisonData(object):
 
     def _update_implicit_and_explicit_changeset(self):
         try:
-            from piperider_cli.dbt.changeset import GraphDataChangeSet
-            c = GraphDataChangeSet(self._base, self._target)
+            from piperider_cli.dbt.changeset import ComparisonManifests, GraphDataChangeSet
+            manifests = ComparisonManifests(self._base, self._target)
+            c = GraphDataChangeSet(self._base, self._target, manifests=manifests)
             self.explicit = c.list_explicit_changes()
             self.implicit = c.list_implicit_changes()
 
-            self.summary_change_set = SummaryChangeSet(self._base, self._target)
+            self.summary_change_set = SummaryChangeSet(self._base, self._target, manifests=manifests)
         except BaseException as e:
             self.warning_for_legacy_metrics(e)
 
@@ -333,29 +339,34 @@ class CompareReport(object):
 
     def list_existing_outputs(self, output_search_path=None) -> List[RunOutput]:
         """
-        List existing profiler outputs.
+        List existing profiler outputs. The outputs are listed by the report index without reading the run.json files.
+        The index of the output directory of PipeRider is maintained when the runs are written, and it is built once if
+        it is absent. The other directories are read-only, they are listed by the headers of the run.json files if they
+        are not indexed.
         """
 
-        def _walk_throw_runs(path):
-            outputs = []
-            for root, dirs, _ in os.walk(path):
-                for dir_name in dirs:
-                    if dir_name == 'latest':
-                        continue
-                    run_json = os.path.join(root, dir_name, 'run.json')
-                    if not os.path.exists(run_json):
-                        continue
-                    output = RunOutput(run_json)
-                    if self.datasource and output.name != self.datasource:
-                        continue
-                    outputs.append(output)
-            outputs.sort(key=lambda x: (x.name, x.created_at), reverse=True)
-            return outputs
-
         if output_search_path is None:
             output_search_path = self.profiler_output_path
 
-        return _walk_throw_runs(output_search_path)
+        index = ReportIndex(output_search_path)
+        if not index.exists and self._is_output_dir(output_search_path):
+            index.build()
+            index.save()
+
+        if index.exists:
+            outputs = [RunOutput(path, summary=summary, file_size=summary['run_json']['size'])
+                       for path, summary in index.outputs()]
+        else:
+            outputs = [RunOutput(run_json) for run_json in find_run_jsons(output_search_path)]
+
+        if self.datasource:
+            outputs = [output for output in outputs if output.name == self.datasource]
+        outputs.sort(key=lambda x: (x.name, x.created_at), reverse=True)
+        return outputs
+
+    def _is_output_dir(self, path) -> bool:
+        return self.profiler_output_path is not None and \
+            os.path.abspath(path) == os.path.abspath(self.profiler_output_path)
 
     def get_the_last_two_reports(self):
         outputs = self.list_existing_outputs()
@@ -461,7 +472,8 @@ class CompareReport(object):
         console = Console()
         console.rule('Comparison report', style='bold blue')
 
-        filesystem = Configuration.instance().activate_report_directory(report_dir=report_dir)
+        configuration = Configuration.instance()
+        filesystem = configuration.activate_report_directory(report_dir=report_dir)
         raise_exception_when_directory_not_writable(output)
 
         report = CompareReport(filesystem.get_output_dir(), a, b, datasource=datasource)
@@ -508,11 +520,9 @@ class CompareReport(object):
             report_template_html = f.read()
 
         def output_report(directory):
-            clone_directory(report_template_dir, directory)
-            filename = os.path.join(directory, 'index.html')
-            with open(filename, 'w', encoding='utf-8') as f:
-                html = setup_report_variables(report_template_html, False, comparison_data.to_json())
-                f.write(html)
+            link_report_assets(report_template_dir, directory, filesystem.get_asset_dir())
+            write_report_html(report_template_html, False, comparison_data.to_json(), directory,
+                              layout=configuration.report_layout)
 
         def output_summary(directory, summary_data):
             filename = os.path.join(directory, 'summary.md')
@@ -550,7 +560,9 @@ class CompareReport(object):
                     CloudConnector.share_compare_report(base, target, project_name=project_name)
 
         if output:
-            clone_directory(default_report_directory, output)
+            clone_report(report_template_dir, default_report_directory, output, filesystem.get_asset_dir())
+            if summary_data:
+                shutil.copyfile(os.path.join(default_report_directory, 'summary.md'), os.path.join(output, 'summary.md'))
             report_path = os.path.abspath(os.path.join(output, 'index.html'))
             summary_md_path = os.path.abspath(os.path.join(output, 'summary.md'))
 
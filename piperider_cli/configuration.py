@@ -1,4 +1,5 @@
 import copy
+import importlib.util
 import json
 import os
 import shlex
@@ -25,6 +26,7 @@ from piperider_cli.error import \
     DbtProjectNotFoundError, \
     DbtProfileNotFoundError
 from piperider_cli import yaml as pyml
+from piperider_cli.runresult import RUN_FORMATS, load_run_result
 
 # ref: https://docs.getdbt.com/dbt-cli/configure-your-profile
 DBT_PROFILES_DIR_DEFAULT = '~/.dbt/'
@@ -144,6 +146,11 @@ class ReportDirectory:
             return os.path.join(FileSystem.piperider_default_report_dir, 'comparisons')
         return os.path.join(self.report_dir, 'comparisons')
 
+    def get_asset_dir(self):
+        if self.report_dir is None:
+            return os.path.join(FileSystem.piperider_default_report_dir, 'assets')
+        return os.path.join(self.report_dir, 'assets')
+
     def get_report_dir(self):
         return self.report_dir
 
@@ -207,11 +214,10 @@ class TelemetryIdResolver:
         output_dir = configuration.report_directory_filesystem.get_output_dir()
 
         def _extract_id(run_json_file: str):
-            with open(run_json_file) as fh:
-                content: Dict = json.loads(fh.read())
-                project_id = content.get('project_id')
-                if project_id:
-                    return project_id
+            content: Dict = load_run_result(run_json_file)
+            project_id = content.get('project_id')
+            if project_id:
+                return project_id
 
         def _resolve_id_from_report_dir(directory):
             target_file = 'run.json'
@@ -294,6 +300,8 @@ class Configuration(object):
         # only the legacy project will set telemetry_id from config
         self.telemetry_id = kwargs.get('telemetry_id', None)
         self.report_dir = ReportDirectory.normalize_report_dir(kwargs.get('report_dir', '.'))
+        self.run_format = kwargs.get('run_format', 'json') or 'json'
+        self.report_layout = kwargs.get('report_layout', 'inline') or 'inline'
         self.report_directory_filesystem: Optional[ReportDirectory] = None
 
         self._verify_input_config()
@@ -317,6 +325,83 @@ class Configuration(object):
             if not isinstance(duplicate_rows, bool):
                 raise PipeRiderConfigTypeError("profiler 'duplicateRows' should be an boolean")
 
+            sample = self.profiler_config.get('table', {}).get('sample')
+            if sample is not None:
+                if not isinstance(sample, dict):
+                    raise PipeRiderConfigTypeError("profiler 'sample' should be a mapping")
+                percent = sample.get('percent')
+                rows = sample.get('rows')
+                if percent is not None and rows is not None:
+                    raise PipeRiderConfigTypeError("profiler 'sample' should specify either 'percent' or 'rows'")
+                is_number = isinstance(percent, (int, float)) and not isinstance(percent, bool)
+                if percent is not None and not (is_number and 0 < percent <= 100):
+                    raise PipeRiderConfigTypeError("profiler sample 'percent' should be a number between 0 and 100")
+                if rows is not None and (isinstance(rows, bool) or not isinstance(rows, int) or rows <= 0):
+                    raise PipeRiderConfigTypeError("profiler sample 'rows' should be a positive integer")
+                if not isinstance(sample.get('seed', 0), int):
+                    raise PipeRiderConfigTypeError("profiler sample 'seed' should be an integer")
+
+            materialize = self.profiler_config.get('table', {}).get('materialize')
+            if materialize is not None and materialize not in ['table', 'duckdb']:
+                raise PipeRiderConfigTypeError("profiler 'materialize' should be 'table' or 'duckdb'")
+
+            fused = self.profiler_config.get('fused', False)
+            if not isinstance(fused, bool):
+                raise PipeRiderConfigTypeError("profiler 'fused' should be an boolean")
+
+            approximate = self.profiler_config.get('approximate', False)
+            if not isinstance(approximate, bool):
+                raise PipeRiderConfigTypeError("profiler 'approximate' should be an boolean")
+
+            incremental = self.profiler_config.get('incremental', False)
+            if not isinstance(incremental, bool):
+                raise PipeRiderConfigTypeError("profiler 'incremental' should be an boolean")
+
+            dbt_catalog = self.profiler_config.get('dbtCatalog', False)
+            if not isinstance(dbt_catalog, bool):
+                raise PipeRiderConfigTypeError("profiler 'dbtCatalog' should be an boolean")
+
+            concurrent_tables = self.profiler_config.get('concurrentTables', 1)
+            if not isinstance(concurrent_tables, int):
+                raise PipeRiderConfigTypeError("profiler 'concurrentTables' should be an integer")
+
+            prefetch_histogram = self.profiler_config.get('prefetchHistogram', True)
+            if not isinstance(prefetch_histogram, bool):
+                raise PipeRiderConfigTypeError("profiler 'prefetchHistogram' should be an boolean")
+
+            percentiles = self.profiler_config.get('percentiles', [])
+            if not isinstance(percentiles, list) or \
+                    any(isinstance(p, bool) or not isinstance(p, (int, float)) or not 0 <= p <= 100
+                        for p in percentiles):
+                raise PipeRiderConfigTypeError("profiler 'percentiles' should be a list of numbers between 0 and 100")
+
+            engine = self.profiler_config.get('engine')
+            if engine is not None and engine not in ['warehouse', 'local', 'columnar']:
+                raise PipeRiderConfigTypeError("profiler 'engine' should be 'warehouse', 'local' or 'columnar'")
+            if engine == 'columnar' and importlib.util.find_spec('pyarrow') is None:
+                console = Console()
+                console.print("[[bold yellow]WARNING[/bold yellow]] The columnar engine requires the pyarrow package, "
+                              "please run \"pip install 'piperider[columnar]'\". The tables are profiled by queries.")
+                self.profiler_config = {**self.profiler_config, 'engine': 'warehouse'}
+
+            memory_limit = self.profiler_config.get('local', {}).get('memoryLimit', 0)
+            if isinstance(memory_limit, bool) or not isinstance(memory_limit, int):
+                raise PipeRiderConfigTypeError("profiler local 'memoryLimit' should be an integer")
+
+            cache_enabled = self.profiler_config.get('cache', {}).get('enabled', False)
+            if not isinstance(cache_enabled, bool):
+                raise PipeRiderConfigTypeError("profiler cache 'enabled' should be an boolean")
+
+            cache_max_size = self.profiler_config.get('cache', {}).get('maxSize', 0)
+            if not isinstance(cache_max_size, int):
+                raise PipeRiderConfigTypeError("profiler cache 'maxSize' should be an integer")
+
+        if self.run_format not in RUN_FORMATS:
+            raise PipeRiderConfigTypeError(f"'run_format' should be one of {', '.join(RUN_FORMATS)}")
+
+        if self.report_layout not in ['inline', 'sharded']:
+            raise PipeRiderConfigTypeError("'report_layout' should be one of inline, sharded")
+
         if self.includes is not None:
             if not isinstance(self.includes, List):
                 raise PipeRiderConfigTypeError("'includes' should be a list of tables' name")
@@ -594,6 +679,8 @@ class Configuration(object):
             include_views=config.get('include_views', True),
             telemetry_id=config.get('telemetry', {}).get('id'),
             report_dir=config.get('report_dir', '.'),
+            run_format=config.get('run_format', 'json'),
+            report_layout=config.get('report_layout', 'inline'),
             dbt=dbt,
             cloud_config=config.get('cloud_config', {})
         )
@@ -168,6 +168,48 @@ class DuckDBDataSource(DataSource):
         return schema
 
 
+class LocalDuckDBDataSource(DuckDBDataSource):
+    """
+    The in-process DuckDB to profile the data pulled from the other data sources. The database is in memory, or in a
+    temporary file if the data is larger than the memory limit.
+    """
+
+    def __init__(self, name, path: str = None, memory_limit: str = None, **kwargs):
+        settings = dict()
+        if memory_limit:
+            settings['memory_limit'] = memory_limit
+        if path:
+            # spill to the directory of the database file
+            settings['temp_directory'] = os.path.join(os.path.dirname(path), 'tmp')
+        super().__init__(name, credential=dict(path=path, settings=settings), **kwargs)
+        self._connection = None
+
+    def to_database_url(self, database):
+        path = self.credential.get('path')
+        return f"duckdb:///{path}" if path else 'duckdb:///:memory:'
+
+    def create_engine(self, database=None):
+        if self.credential.get('path'):
+            return super().create_engine(database)
+
+        import duckdb
+        from duckdb_engine import ConnectionWrapper
+        from sqlalchemy import create_engine
+
+        # each connection to ':memory:' opens a new database, so the connections share the cursors of one database
+        self._connection = duckdb.connect(':memory:', config=dict(self.credential.get('settings', {})))
+        connection = self._connection
+        return create_engine(self.to_database_url(database), creator=lambda: ConnectionWrapper(connection.cursor()))
+
+    def close(self):
+        for engine in self._cached_engine.values():
+            engine.dispose()
+        self._cached_engine = {}
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
 class CsvDataSource(DuckDBDataSource):
     def __init__(self, name, **kwargs):
         super(DuckDBDataSource, self).__init__(name, 'csv', **kwargs)
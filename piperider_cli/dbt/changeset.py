@@ -1,8 +1,12 @@
+import hashlib
+import json
 import math
+import threading
 import urllib.parse
+from collections import OrderedDict
 from datetime import timedelta
 from io import StringIO
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional
 
 from dbt.contracts.graph.manifest import Manifest
 
@@ -35,14 +39,103 @@ except ImportError:
     embed_url = embed_url_cli
 
 
+# the number of parsed manifests and dbt list results kept in memory
+MANIFEST_MEMO_SIZE = 8
+
+
+class _ManifestMemo:
+    """
+    The least recently used parsed manifests and dbt list results, keyed by the checksums of the manifests.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, compute: Callable):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_manifest_memo = _ManifestMemo(MANIFEST_MEMO_SIZE)
+
+
+def _get_run_manifest(run: Dict) -> Dict:
+    manifest = run.get("dbt", {}).get("manifest", {})
+    if manifest == {}:
+        raise ValueError("Cannot find .dbt.manifest in run data")
+    return manifest
+
+
+def manifest_checksum(manifest: Dict) -> str:
+    """
+    The key to memoize the results of a manifest. The manifest generated by dbt is identified by the invocation id and
+    the generated time in its metadata, so the whole manifest is not serialized and hashed on every call. The manifests
+    without them are hashed by their contents.
+    """
+    metadata = manifest.get('metadata') or {}
+    invocation_id = metadata.get('invocation_id')
+    generated_at = metadata.get('generated_at')
+    if invocation_id and generated_at:
+        return f'{invocation_id}@{generated_at}'
+    return hashlib.sha1(json.dumps(manifest, separators=(',', ':'), default=str).encode('utf-8')).hexdigest()
+
+
+def _load_manifest_memoized(manifest: Dict, checksum: str) -> Manifest:
+    return _manifest_memo.get(('manifest', checksum), lambda: load_manifest(manifest))
+
+
+class ComparisonManifests:
+    """
+    The manifests of the base and target runs and the results of the dbt list tasks on them. The manifests are parsed
+    once and shared by the change sets, and both are memoized by the checksums of the manifests, so comparing the same
+    runs again doesn't parse the manifests or run the list tasks again.
+    """
+
+    def __init__(self, base: Dict, target: Dict):
+        base_manifest = _get_run_manifest(base)
+        target_manifest = _get_run_manifest(target)
+        self.base_checksum = manifest_checksum(base_manifest)
+        self.target_checksum = manifest_checksum(target_manifest)
+        self.base_manifest: Manifest = _load_manifest_memoized(base_manifest, self.base_checksum)
+        self.target_manifest: Manifest = _load_manifest_memoized(target_manifest, self.target_checksum)
+
+    def base_resources(self) -> List[Dict]:
+        return _manifest_memo.get(('resources', self.base_checksum),
+                                  lambda: list_resources_data_from_manifest(self.base_manifest))
+
+    def target_resources(self) -> List[Dict]:
+        return _manifest_memo.get(('resources', self.target_checksum),
+                                  lambda: list_resources_data_from_manifest(self.target_manifest))
+
+    def modified(self) -> List[Dict[str, str]]:
+        return _manifest_memo.get(('modified', self.base_checksum, self.target_checksum),
+                                  lambda: list_changes_in_unique_id(self.base_manifest, self.target_manifest, True))
+
+    def modified_with_downstream(self) -> List[Dict]:
+        return _manifest_memo.get(('modified_with_downstream', self.base_checksum, self.target_checksum),
+                                  lambda: list_modified_with_downstream(self.base_manifest, self.target_manifest))
+
+
 class DefaultChangeSetOpMixin:
     __slots__ = ()
 
     def load_run_as_manifest(self, run: Dict):
-        manifest = run.get("dbt", {}).get("manifest", {})
-        if manifest == {}:
-            raise ValueError("Cannot find .dbt.manifest in run data")
-        return load_manifest(manifest)
+        manifest = _get_run_manifest(run)
+        return _load_manifest_memoized(manifest, manifest_checksum(manifest))
 
     def resolve_unique_id(self, resource_name: str, resource_type: str):
         for entry in self.base_resources + self.target_resources:
@@ -315,21 +408,21 @@ class LookUpTable:
 
 
 class SummaryChangeSet(DefaultChangeSetOpMixin):
-    def __init__(self, base: Dict, target: Dict):
+    def __init__(self, base: Dict, target: Dict, manifests: Optional[ComparisonManifests] = None):
         self.base: Dict = base
         self.target: Dict = target
-        self.base_manifest: Manifest = self.load_run_as_manifest(base)
-        self.target_manifest: Manifest = self.load_run_as_manifest(target)
+        self.manifests = manifests if manifests is not None else ComparisonManifests(base, target)
+        self.base_manifest: Manifest = self.manifests.base_manifest
+        self.target_manifest: Manifest = self.manifests.target_manifest
         self.tables = JoinedTables(self.base, self.target)
 
         # resources in this format [{unique_id, name, resource_type}]
-        self.base_resources = list_resources_data_from_manifest(self.base_manifest)
-        self.target_resources = list_resources_data_from_manifest(self.target_manifest)
+        self.base_resources = self.manifests.base_resources()
+        self.target_resources = self.manifests.target_resources()
 
         self.mapper = LookUpTable(self)
 
-        self.modified_models_and_metrics_with_downstream = \
-            list_modified_with_downstream(self.base_manifest, self.target_manifest)
+        self.modified_models_and_metrics_with_downstream = self.manifests.modified_with_downstream()
 
         self.models = SummaryAggregate('Models')
         self.metrics = SummaryAggregate('Metrics')
@@ -374,12 +467,7 @@ class SummaryChangeSet(DefaultChangeSetOpMixin):
 
         resource_in_both = list(set(base_resources).intersection(target_resources))
         # exclude added and removed by intersection with common resources
-        modified = [
-            x.get("unique_id")
-            for x in list_changes_in_unique_id(
-                self.base_manifest, self.target_manifest, True
-            )
-        ]
+        modified = [x.get("unique_id") for x in self.manifests.modified()]
 
         def as_unit(unique_id: str, change_type: ChangeType):
             return ChangeUnit(unique_id=unique_id, change_type=change_type,
@@ -844,15 +932,16 @@ class SummaryChangeSet(DefaultChangeSetOpMixin):
 
 
 class GraphDataChangeSet(DefaultChangeSetOpMixin):
-    def __init__(self, base: Dict, target: Dict):
+    def __init__(self, base: Dict, target: Dict, manifests: Optional[ComparisonManifests] = None):
         self.base: Dict = base
         self.target: Dict = target
-        self.base_manifest: Manifest = self.load_run_as_manifest(base)
-        self.target_manifest: Manifest = self.load_run_as_manifest(target)
+        self.manifests = manifests if manifests is not None else ComparisonManifests(base, target)
+        self.base_manifest: Manifest = self.manifests.base_manifest
+        self.target_manifest: Manifest = self.manifests.target_manifest
 
         # resources in this format [{unique_id, name, resource_type}]
-        self.base_resources = list_resources_data_from_manifest(self.base_manifest)
-        self.target_resources = list_resources_data_from_manifest(self.target_manifest)
+        self.base_resources = self.manifests.base_resources()
+        self.target_resources = self.manifests.target_resources()
 
         self.explicit_changes = sorted(self._do_list_explicit_changes())
 
@@ -862,12 +951,7 @@ class GraphDataChangeSet(DefaultChangeSetOpMixin):
 
         resource_in_both = list(set(base_resources).intersection(target_resources))
         # exclude added and removed by intersection with common resources
-        output = [
-            x.get("unique_id")
-            for x in list_changes_in_unique_id(
-                self.base_manifest, self.target_manifest, True
-            )
-        ]
+        output = [x.get("unique_id") for x in self.manifests.modified()]
         output = list(set(output).intersection(resource_in_both))
 
         return [x for x in output if not x.startswith('test.')]
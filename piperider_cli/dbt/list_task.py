@@ -1,4 +1,5 @@
 import argparse
+import copy
 import json
 import re
 import tempfile
@@ -72,7 +73,8 @@ def get_manifest_schema_version(dct: dict) -> int:
 def _load_manifest_version_13(data: Dict):
     from dbt.contracts.util import upgrade_manifest_json
     if get_manifest_schema_version(data) <= 6:
-        data = upgrade_manifest_json(data)
+        # the manifest is upgraded in place, keep the given one unchanged
+        data = upgrade_manifest_json(copy.deepcopy(data))
 
     return WritableManifest.from_dict(data)  # type: ignore
 
@@ -80,7 +82,8 @@ def _load_manifest_version_13(data: Dict):
 def _load_manifest_version_14(data: Dict):
     from dbt.contracts.util import upgrade_manifest_json
     if get_manifest_schema_version(data) <= 7:
-        data = upgrade_manifest_json(data)
+        # the manifest is upgraded in place, keep the given one unchanged
+        data = upgrade_manifest_json(copy.deepcopy(data))
 
     return WritableManifest.from_dict(data)  # type: ignore
 
@@ -114,6 +117,11 @@ def _load_manifest_version_15(manifest: Dict):
             return int(match.group(1))
         raise ValueError("Manifest doesn't have schema version")
 
+    if hasattr(WritableManifest, "dbt_schema_version"):
+        if data.get("metadata", {}).get("dbt_schema_version") != str(WritableManifest.dbt_schema_version):
+            # the older manifest is upgraded in place, keep the given one unchanged
+            data = copy.deepcopy(data)
+
     result = WritableManifest.upgrade_schema_version(data)
     return result
 
@@ -124,7 +132,11 @@ def _load_manifest_version_16(manifest: Dict):
     data = m.__dict__
     all_fields = set([x.name for x in fields(Manifest)])
     new_data = {k: v for k, v in data.items() if k in all_fields}
-    return Manifest(**new_data)
+    result = Manifest(**new_data)
+    # keep the edges of the graph in the manifest file, as Manifest.build_parent_and_child_maps() does
+    result.child_map = m.child_map
+    result.parent_map = m.parent_map
+    return result
 
 
 class _Adapter(BaseAdapter):
@@ -287,6 +299,32 @@ def _configure_warn_error_options(flags):
         setattr(flags, "WARN_ERROR_OPTIONS", WarnErrorOptions([]))
 
 
+def warn_error_flags():
+    """
+    Set the global flags read by the warnings of dbt, e.g. the seed too large to compare, if no list task set them.
+    The original flags are restored on exit, so the global flags are unchanged after the context.
+    """
+
+    class context_class:
+
+        def __enter__(self):
+            self.original_flags = None
+            if dbt_version >= '1.5' and hasattr(flags_module, 'set_flags'):
+                dbt_flags = flags_module.get_flags()
+                if not hasattr(dbt_flags, 'WARN_ERROR') or not hasattr(dbt_flags, 'WARN_ERROR_OPTIONS'):
+                    self.original_flags = dbt_flags
+                    dbt_flags = make_flag()
+                    setattr(dbt_flags, "WARN_ERROR", False)
+                    _configure_warn_error_options(dbt_flags)
+                    flags_module.set_flags(dbt_flags)
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            if self.original_flags is not None:
+                flags_module.set_flags(self.original_flags)
+
+    return context_class()
+
+
 class _RuntimeConfig(RuntimeConfig):
     def __init__(self):
         from piperider_cli.configuration import FileSystem
@@ -432,11 +470,6 @@ class _DbtListTask(ListTask):
         return
 
 
-class _InMemoryPreviousState(PreviousState):
-    def __init__(self, manifest: Manifest):
-        self.manifest = manifest
-
-
 def list_resources_unique_id_from_manifest(manifest: Manifest, select: tuple = None, state: str = None) -> List[str]:
     result: List[Dict] = list_resources_data_from_manifest(manifest, select=select, state=state)
     return [x.get('unique_id') for x in result]
@@ -454,6 +487,8 @@ def list_resources_data_from_manifest(manifest: Manifest, select: tuple = None,
     setattr(dbt_flags, "state", Path(state) if state else None)
     setattr(dbt_flags, "models", None)
     setattr(dbt_flags, "project_target_path", create_temp_dir())
+    # the compiler writes the graph summary into the target path, keep it out of the project
+    task.config.target_path = dbt_flags.project_target_path
 
     if dbt_version < '1.5':
         flags_module.INDIRECT_SELECTION = 'eager'
@@ -483,122 +518,36 @@ def compare_models_between_manifests(
     altered_manifest: Manifest,
     include_downstream: bool = False,
 ):
-    task = _DbtListTask()
-    task.manifest = altered_manifest
-
-    if dbt_version < '1.5':
-        dbt_flags = task.args
-        flags_module.INDIRECT_SELECTION = 'eager'
-    else:
-        dbt_flags = flags_module.get_flags()
-
-    setattr(dbt_flags, "state", None)
-    setattr(dbt_flags, "project_target_path", create_temp_dir())
-    setattr(dbt_flags, "models", None)
-    setattr(dbt_flags, "selector_name", None)
-    setattr(dbt_flags, "output", "selector")
-    setattr(dbt_flags, "resource_types", {NodeType.Model})
-
-    setattr(dbt_flags, "selector", None)
+    from piperider_cli.dbtutil import ManifestGraph
 
-    task.previous_state = _InMemoryPreviousState(base_manifest)
-    if include_downstream:
-        setattr(dbt_flags, "select", ("state:modified+",))
-    else:
-        setattr(dbt_flags, "select", ("state:modified",))
+    nodes = ManifestGraph(altered_manifest).select_modified(base_manifest, include_downstream, [NodeType.Model])
+    return ['.'.join(node.fqn) for node in nodes]
 
-    if dbt_version >= '1.4':
-        from dbt.exceptions import EventCompilationError as DbtCompilationErr
-    else:
-        from dbt.exceptions import CompilationException as DbtCompilationErr
 
-    try:
-        with disable_dbt_compile_stats():
-            return task.run()
-    except DbtCompilationErr as e:
-        if "does not match any nodes" in e.msg:
-            return []
-        raise e
+def _node_data(node, keys: List[str]) -> Dict[str, str]:
+    # the same values as the json output of the list task
+    return {key: str(node.resource_type) if key == 'resource_type' else getattr(node, key) for key in keys}
 
 
 def list_modified_with_downstream(
     base_manifest: Manifest,
     altered_manifest: Manifest,
 ):
-    task = _DbtListTask()
-    task.manifest = altered_manifest
-
-    if dbt_version < '1.5':
-        dbt_flags = task.args
-        flags_module.INDIRECT_SELECTION = 'eager'
-    else:
-        dbt_flags = flags_module.get_flags()
-
-    setattr(dbt_flags, "state", None)
-    setattr(dbt_flags, "project_target_path", create_temp_dir())
-    setattr(dbt_flags, "models", None)
-    setattr(dbt_flags, "selector_name", None)
-    setattr(dbt_flags, "output", "json")
-    setattr(dbt_flags, "output_keys", "unique_id,name,resource_type,original_file_path")
-    setattr(dbt_flags, "resource_types", {NodeType.Model, NodeType.Metric, NodeType.Seed})
-    setattr(dbt_flags, "selector", None)
+    from piperider_cli.dbtutil import ManifestGraph
 
-    task.previous_state = _InMemoryPreviousState(base_manifest)
-    setattr(dbt_flags, "select", ("state:modified+",))
-
-    if dbt_version >= '1.4':
-        from dbt.exceptions import EventCompilationError as DbtCompilationErr
-    else:
-        from dbt.exceptions import CompilationException as DbtCompilationErr
-
-    try:
-        with disable_dbt_compile_stats():
-            return [json.loads(x) for x in task.run()]
-    except DbtCompilationErr as e:
-        if "does not match any nodes" in e.msg:
-            return []
-        raise e
+    nodes = ManifestGraph(altered_manifest).select_modified(base_manifest, True,
+                                                            [NodeType.Model, NodeType.Metric, NodeType.Seed])
+    return [_node_data(node, ['unique_id', 'name', 'resource_type', 'original_file_path']) for node in nodes]
 
 
 def list_changes_in_unique_id(
     base_manifest: Manifest,
     target_manifest: Manifest, show_modified_only=False) -> List[Dict[str, str]]:
-    task = _DbtListTask()
-    task.manifest = target_manifest
-
-    if dbt_version < '1.5':
-        dbt_flags = task.args
-        flags_module.INDIRECT_SELECTION = 'eager'
-    else:
-        dbt_flags = flags_module.get_flags()
-
-    setattr(dbt_flags, "project_target_path", create_temp_dir())
-    setattr(dbt_flags, "state", None)
-    setattr(dbt_flags, "models", None)
-    setattr(dbt_flags, "selector_name", None)
-    setattr(dbt_flags, "output", "json")
-    setattr(dbt_flags, "output_keys", "unique_id,name")
-    setattr(dbt_flags, "resource_types", None)
-    setattr(dbt_flags, "selector", None)
-
-    task.previous_state = _InMemoryPreviousState(base_manifest)
+    from piperider_cli.dbtutil import ManifestGraph
 
+    graph = ManifestGraph(target_manifest)
     if show_modified_only:
-        setattr(dbt_flags, "select", ("state:modified",))
-    else:
-        setattr(dbt_flags, "select", None)
-
-    if dbt_version >= '1.4':
-        from dbt.exceptions import EventCompilationError as DbtCompilationErr
+        nodes = graph.select_modified(base_manifest)
     else:
-        from dbt.exceptions import CompilationException as DbtCompilationErr
-
-    try:
-        with disable_dbt_compile_stats():
-            outputs = task.run()
-            outputs = [json.loads(x) for x in outputs]
-            return outputs
-    except DbtCompilationErr as e:
-        if "does not match any nodes" in e.msg:
-            return []
-        raise e
+        nodes = graph.select_all()
+    return [_node_data(node, ['unique_id', 'name']) for node in nodes]
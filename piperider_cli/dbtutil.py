@@ -1,19 +1,27 @@
+import hashlib
+import inspect
 import io
 import json
 import os
+import pickle
 import sys
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
 from glob import glob
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import inquirer
+from dbt.contracts.graph.manifest import Manifest
 from jinja2 import UndefinedError
 from rich.console import Console
 from rich.table import Table
 
 from piperider_cli import load_jinja_template, load_jinja_string_template
 from piperider_cli import yaml as pyml
-from piperider_cli.dbt.list_task import load_manifest, list_resources_unique_id_from_manifest, load_full_manifest
+from piperider_cli.dbt.list_task import load_manifest, list_resources_unique_id_from_manifest, load_full_manifest, \
+    warn_error_flags
 from piperider_cli.error import \
     DbtProjectInvalidError, \
     DbtProfileInvalidError, \
@@ -24,6 +32,25 @@ from piperider_cli.statistics import Statistics
 
 console = Console()
 
+# the directory to keep the parsed manifests across the commands, disabled if the environment variable is not set
+MANIFEST_STORE_DIR_ENV = 'PIPERIDER_MANIFEST_STORE_DIR'
+
+# the parsed manifest.json by the path, with the mtime and the size of the file
+_manifest_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+_manifest_cache_lock = threading.Lock()
+
+try:
+    import orjson
+
+    def _json_loads(content: bytes):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # e.g. NaN or the integers out of 64-bit
+            return json.loads(content)
+except ImportError:
+    _json_loads = json.loads
+
 
 def search_dbt_project_path() -> str:
     paths = list(Path.cwd().parents)
@@ -134,6 +161,105 @@ def _get_state_run_results(dbt_state_dir: str):
     return run_results
 
 
+def _get_generated_at(artifact: Optional[dict]) -> Optional[datetime]:
+    generated_at = ((artifact or {}).get('metadata') or {}).get('generated_at')
+    if not generated_at:
+        return None
+    try:
+        generated_at = datetime.fromisoformat(generated_at.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return generated_at if generated_at.tzinfo else generated_at.replace(tzinfo=timezone.utc)
+
+
+def get_dbt_state_catalog(dbt_state_dir: str, manifest: dict = None, run_results: dict = None) -> Optional[dict]:
+    """
+    Load catalog.json generated by 'dbt docs generate' if it is fresh. It is stale if the manifest or the run results
+    were generated after it, e.g. by 'dbt run' or 'dbt build'.
+
+    :return: the catalog or None if it doesn't exist or is stale
+    """
+    if not _is_dbt_file_existing(dbt_state_dir, 'catalog.json'):
+        return None
+    try:
+        with open(os.path.join(dbt_state_dir, 'catalog.json')) as f:
+            catalog = json.load(f)
+    except ValueError:
+        return None
+
+    catalog_generated_at = _get_generated_at(catalog)
+    if catalog_generated_at is None:
+        return None
+    for artifact in [manifest, run_results]:
+        generated_at = _get_generated_at(artifact)
+        if generated_at is not None and generated_at > catalog_generated_at:
+            return None
+    return catalog
+
+
+def _manifest_store_path(path: str) -> Optional[str]:
+    store_dir = os.environ.get(MANIFEST_STORE_DIR_ENV)
+    if not store_dir:
+        return None
+    return os.path.join(store_dir, f'manifest-{hashlib.sha1(path.encode("utf-8")).hexdigest()}.pickle')
+
+
+def _load_stored_manifest(path: str, key: Tuple[int, int]) -> Optional[Dict]:
+    store_path = _manifest_store_path(path)
+    if store_path is None or not os.path.exists(store_path):
+        return None
+    try:
+        with open(store_path, 'rb') as f:
+            stored = pickle.load(f)
+        if stored.get('path') != path or stored.get('key') != key:
+            return None
+        return stored.get('manifest')
+    except Exception:
+        return None
+
+
+def _store_manifest(path: str, key: Tuple[int, int], manifest: Dict):
+    store_path = _manifest_store_path(path)
+    if store_path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        tmp_path = f'{store_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(dict(path=path, key=key, manifest=manifest), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, store_path)
+    except Exception:
+        # the store is only a cache
+        pass
+
+
+def _load_manifest_file(path: str) -> Dict:
+    """
+    Load manifest.json once per process. The parsed manifest is reused until the file is changed, by its path, mtime
+    and size. It is shared by the callers, so it must not be modified.
+
+    If the environment variable PIPERIDER_MANIFEST_STORE_DIR is set, the parsed manifest is pickled to the directory as
+    well, so the later commands load it without parsing the JSON again.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _manifest_cache_lock:
+        cached = _manifest_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    manifest = _load_stored_manifest(path, key)
+    if manifest is None:
+        with open(path, 'rb') as f:
+            manifest = _json_loads(f.read())
+        _store_manifest(path, key, manifest)
+
+    with _manifest_cache_lock:
+        _manifest_cache[path] = (key, manifest)
+    return manifest
+
+
 def _get_state_manifest(dbt_state_dir: str, project_dir: str = None):
     path = os.path.join(dbt_state_dir, 'manifest.json')
     if project_dir is not None:
@@ -141,31 +267,41 @@ def _get_state_manifest(dbt_state_dir: str, project_dir: str = None):
     elif os.path.isabs(path) is False:
         from piperider_cli.configuration import FileSystem
         path = os.path.join(FileSystem.WORKING_DIRECTORY, path)
-    with open(path) as f:
-        manifest = json.load(f)
 
-    return manifest
+    return _load_manifest_file(path)
 
 
-def append_descriptions(profile_result, dbt_state_dir):
+def get_descriptions(dbt_state_dir) -> Dict[str, List[dict]]:
+    """
+    The nodes of the manifest by their names, to append their descriptions to the tables of the same names.
+    """
     manifest = _get_state_manifest(dbt_state_dir)
 
-    nodes = manifest.get('nodes')
-    for node in nodes.values():
-        model = node.get('name')
+    descriptions = {}
+    for node in manifest.get('nodes').values():
+        descriptions.setdefault(node.get('name'), []).append(node)
+    return descriptions
+
+
+def append_table_descriptions(table_result, nodes: List[dict]):
+    for node in nodes:
         model_desc = node.get('description')
-        if model not in profile_result['tables']:
-            continue
         if model_desc:
-            profile_result['tables'][model]['description'] = f"{model_desc}"
+            table_result['description'] = f"{model_desc}"
 
         columns = node.get('columns', {})
         for column, v in columns.items():
-            if column not in profile_result['tables'][model]['columns']:
+            if column not in table_result['columns']:
                 continue
             column_desc = v.get('description')
             if column_desc:
-                profile_result['tables'][model]['columns'][column]['description'] = f"{column_desc}"
+                table_result['columns'][column]['description'] = f"{column_desc}"
+
+
+def append_descriptions(profile_result, dbt_state_dir):
+    descriptions = get_descriptions(dbt_state_dir)
+    for model, table_result in profile_result['tables'].items():
+        append_table_descriptions(table_result, descriptions.get(model, []))
 
 
 def get_dbt_state_candidate(dbt_state_dir: str, options: dict, *, select_for_metadata: bool = False):
@@ -796,3 +932,148 @@ def prepare_topological_graph(manifest: Dict):
             graph[k] = v
 
     return graph
+
+
+def find_descendants(graph: Dict[str, List[str]], unique_ids: Iterable[str]) -> Set[str]:
+    """
+    :return: the nodes reachable from the given nodes in the graph of the children of each node
+    """
+    descendants = set()
+    pending = [child for unique_id in unique_ids for child in graph.get(unique_id, [])]
+    while pending:
+        unique_id = pending.pop()
+        if unique_id in descendants:
+            continue
+        descendants.add(unique_id)
+        pending.extend(graph.get(unique_id, []))
+    return descendants
+
+
+@lru_cache(maxsize=None)
+def _accepts_adapter_type(node_class) -> bool:
+    return 'adapter_type' in inspect.signature(node_class.same_contents).parameters
+
+
+class ManifestGraph:
+    """
+    The graph of the enabled nodes in a dbt manifest. The edges are the child_map of the manifest, or built from the
+    depends_on of the nodes if the manifest has no child_map. It selects the nodes as `dbt list --select state:modified`
+    and `state:modified+` do, by comparing the checksum and the config of the nodes with the previous manifest and
+    walking the children of the modified nodes, without compiling the manifest and running the list task.
+    """
+
+    # the resource types listed by dbt if no resource type is specified
+    DEFAULT_RESOURCE_TYPES = ('model', 'snapshot', 'seed', 'test', 'source', 'exposure', 'metric', 'semantic_model')
+
+    def __init__(self, manifest: Manifest):
+        self.manifest = manifest
+        self.nodes = {}
+        for resources in [manifest.nodes, manifest.sources, manifest.exposures, manifest.metrics,
+                          getattr(manifest, 'semantic_models', {})]:
+            for unique_id, node in resources.items():
+                config = getattr(node, 'config', None)
+                if unique_id not in self.nodes and getattr(config, 'enabled', True):
+                    self.nodes[unique_id] = node
+
+        child_map = getattr(manifest, 'child_map', None)
+        if child_map:
+            self.graph: Dict[str, List[str]] = {
+                unique_id: [child for child in child_map.get(unique_id, []) if child in self.nodes]
+                for unique_id in self.nodes
+            }
+        else:
+            self.graph: Dict[str, List[str]] = {unique_id: [] for unique_id in self.nodes}
+            for unique_id, node in self.nodes.items():
+                depends_on = getattr(node, 'depends_on', None)
+                for parent in getattr(depends_on, 'nodes', []):
+                    if parent in self.graph:
+                        self.graph[parent].append(unique_id)
+
+    def _modified_macros(self, previous: Manifest) -> Set[str]:
+        old_macros = previous.macros
+        new_macros = self.manifest.macros
+        modified = set(uid for uid, macro in new_macros.items()
+                       if uid not in old_macros or macro.macro_sql != old_macros[uid].macro_sql)
+        modified.update(uid for uid in old_macros if uid not in new_macros)
+        return modified
+
+    def _depends_on_macros(self, node, macros: Set[str]) -> bool:
+        visited = set()
+        pending = list(getattr(getattr(node, 'depends_on', None), 'macros', []))
+        while pending:
+            uid = pending.pop()
+            if uid in visited:
+                continue
+            visited.add(uid)
+            if uid in macros:
+                return True
+            macro = self.manifest.macros.get(uid)
+            if macro is not None:
+                pending.extend(macro.depends_on.macros)
+        return False
+
+    @staticmethod
+    def _is_modified(node, old, adapter_type) -> bool:
+        checksum = getattr(node, 'checksum', None)
+        if checksum is not None and hasattr(node, 'same_config'):
+            if old is None:
+                return True
+            if getattr(node, 'test_metadata', None) is not None:
+                # the checksum of a generic test is the checksum of the yaml file defining it
+                return not node.same_config(old) or not node.same_fqn(old)
+            # the body by the checksum of the file, and the config by the unrendered config as dbt does
+            return checksum != old.checksum or not node.same_config(old)
+        # the sources, exposures, metrics and semantic models have no checksum
+        if _accepts_adapter_type(type(node)):
+            return not node.same_contents(old, adapter_type)
+        return not node.same_contents(old)
+
+    def select_all(self, resource_types: Iterable[str] = None) -> List:
+        """
+        :return: the nodes of the resource types sorted by the unique id
+        """
+        return self._filter(self.nodes.keys(), resource_types)
+
+    def select_modified(self, previous: Manifest, include_downstream: bool = False,
+                        resource_types: Iterable[str] = None) -> List:
+        """
+        Select the nodes added or modified since the previous manifest, or depending on the modified macros. The tests
+        of the selected nodes are selected as well, as the eager indirect selection of dbt.
+
+        :param previous: the manifest to compare with
+        :param include_downstream: select the descendants of the modified nodes, as `state:modified+`
+        :param resource_types: the resource types to list, the default resource types of dbt if not specified
+        :return: the nodes sorted by the unique id
+        """
+        adapter_type = self.manifest.metadata.adapter_type
+        modified_macros = self._modified_macros(previous)
+
+        selected = set()
+        # the comparison of the seeds may fire the warnings reading the global flags of dbt
+        with warn_error_flags():
+            for unique_id, node in self.nodes.items():
+                # dbt doesn't look up the semantic models in the previous manifest
+                old = None
+                for resources in [previous.nodes, previous.sources, previous.exposures, previous.metrics]:
+                    if unique_id in resources:
+                        old = resources[unique_id]
+                        break
+
+                modified = self._is_modified(node, old, adapter_type)
+                if modified or (modified_macros and self._depends_on_macros(node, modified_macros)):
+                    selected.add(unique_id)
+
+        if include_downstream:
+            selected.update(find_descendants(self.graph, selected))
+
+        for unique_id in list(selected):
+            for child in self.graph[unique_id]:
+                if self.nodes[child].resource_type == 'test':
+                    selected.add(child)
+
+        return self._filter(selected, resource_types)
+
+    def _filter(self, unique_ids: Iterable[str], resource_types: Optional[Iterable[str]]) -> List:
+        resource_types = set(resource_types or self.DEFAULT_RESOURCE_TYPES)
+        return [self.nodes[unique_id] for unique_id in sorted(unique_ids)
+                if self.nodes[unique_id].resource_type in resource_types]
@@ -69,6 +69,12 @@ class PipeRiderConnectorError(PipeRiderError):
         self.hint = f'Please run \"pip install \'piperider[{datasource_name}]\'\" to get the {datasource_name} connector'
 
 
+class PipeRiderRunFormatError(PipeRiderError):
+    def __init__(self, err_msg, run_format):
+        self.message = err_msg
+        self.hint = f'Please run \"pip install \'piperider[{run_format}]\'\" to read and write the {run_format} run results'
+
+
 class PipeRiderConnectorUnsupportedError(PipeRiderError):
     def __init__(self, err_msg, datasource_type):
         self.message = err_msg
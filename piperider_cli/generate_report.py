@@ -1,16 +1,28 @@
+import functools
+import hashlib
 import json
 import os
 import re
 import shutil
 from base64 import b64encode
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from rich.console import Console
 
 from piperider_cli import __version__, open_report_in_browser, sentry_dns, sentry_env, event, get_run_json_path
-from piperider_cli import clone_directory, raise_exception_when_directory_not_writable
+from piperider_cli import raise_exception_when_directory_not_writable
 from piperider_cli.configuration import Configuration
 from piperider_cli.error import PipeRiderNoProfilingResultError
+from piperider_cli.runresult import load_run_result
+
+REPORT_SHARD_DIR = 'report-data'
+# the approximate size of the report data in a shard
+REPORT_SHARD_SIZE = 1 << 20
+
+_VARIABLES_PATTERN = re.compile(r'<script id="piperider-report-variables">.+?</script>')
+_APP_SCRIPT_PATTERN = re.compile(r'<script defer="defer" src="([^"]+)"></script>')
+# the size of the data encoded at a time, a multiple of 3 so that the encoded chunks have no padding
+_BASE64_CHUNK_SIZE = 3 << 16
 
 
 def prepare_piperider_metadata():
@@ -35,40 +47,238 @@ def _validate_input_result(result):
     return True
 
 
-def setup_report_variables(template_html: str, is_single: bool, data):
+def _split_template(template_html: str) -> Tuple[str, str]:
+    """
+    Split the template at the script of the report variables.
+    """
+    match = _VARIABLES_PATTERN.search(template_html)
+    return template_html[:match.start()], template_html[match.end():]
+
+
+def _report_variables(is_single: bool, data) -> Iterator[str]:
     if isinstance(data, dict):
         output = json.dumps(data)
     else:
         output = data
     metadata = json.dumps(prepare_piperider_metadata())
-    encoded_output = b64encode(bytes(output, "utf-8")).decode("ascii")
+    yield f'<script id="piperider-report-variables">\n' \
+          f'window.PIPERIDER_METADATA={metadata};'
+    if is_single:
+        yield 'window.PIPERIDER_SINGLE_REPORT_DATA=JSON.parse(atob("'
+    else:
+        yield 'window.PIPERIDER_SINGLE_REPORT_DATA="";' \
+              'window.PIPERIDER_COMPARISON_REPORT_DATA=JSON.parse(atob("'
+
+    # encode the data chunk by chunk instead of holding another encoded copy of the whole data
+    output = memoryview(output.encode('utf-8'))
+    for i in range(0, len(output), _BASE64_CHUNK_SIZE):
+        yield b64encode(output[i:i + _BASE64_CHUNK_SIZE]).decode('ascii')
+
     if is_single:
-        variables = f'<script id="piperider-report-variables">\n' \
-                    f'window.PIPERIDER_METADATA={metadata};' \
-                    f'window.PIPERIDER_SINGLE_REPORT_DATA=JSON.parse(atob("{encoded_output}"));' \
-                    f'window.PIPERIDER_COMPARISON_REPORT_DATA="";</script>'
+        yield '"));window.PIPERIDER_COMPARISON_REPORT_DATA="";</script>'
     else:
-        variables = f'<script id="piperider-report-variables">\n' \
-                    f'window.PIPERIDER_METADATA={metadata};' \
-                    f'window.PIPERIDER_SINGLE_REPORT_DATA="";' \
-                    f'window.PIPERIDER_COMPARISON_REPORT_DATA=JSON.parse(atob("{encoded_output}"));</script>'
-    html_parts = re.sub(r'<script id="piperider-report-variables">.+?</script>', '#PLACEHOLDER#', template_html).split(
-        '#PLACEHOLDER#')
-    html = html_parts[0] + variables + html_parts[1]
-    return html
+        yield '"));</script>'
+
+
+def setup_report_variables(template_html: str, is_single: bool, data):
+    head, tail = _split_template(template_html)
+    return head + ''.join(_report_variables(is_single, data)) + tail
+
+
+def _js_json(value) -> str:
+    # the JSON as a string literal, which the browser parses faster than the equivalent object literal. The '<' is
+    # escaped, so a '</script>' in the data doesn't end the script tag.
+    return json.dumps(json.dumps(value, separators=(',', ':'))).replace('<', '\\u003c')
+
+
+def _split_report_data(data: dict, is_single: bool):
+    """
+    Split the tables and the dbt artifacts of the runs out of the report data.
+
+    :return: the report data without them, and the list of (path, value) split out
+    """
+    summary = dict(data)
+    parts = []
+    for key in [None] if is_single else ['base', 'input']:
+        run = summary if key is None else dict(summary.get(key) or {})
+        tables = run.get('tables') or {}
+        # keep the order of the tables, the values are filled by the shards
+        run['tables'] = {name: None for name in tables.keys()}
+        prefix = [] if key is None else [key]
+        parts.extend((prefix + ['tables', name], table) for name, table in tables.items())
+        if run.get('dbt') is not None:
+            parts.append((prefix + ['dbt'], run['dbt']))
+            run['dbt'] = None
+        if key is not None and key in summary:
+            summary[key] = run
+    return summary, parts
+
+
+def _write_report_shards(output_path: str, parts) -> List[str]:
+    shard_dir = os.path.join(output_path, REPORT_SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards = []
+    entries = []
+    size = 0
+
+    def _flush():
+        filename = f'{REPORT_SHARD_DIR}/{len(shards)}.js'
+        with open(os.path.join(output_path, filename), 'w', encoding='utf-8') as f:
+            f.write(f'window.PIPERIDER_REPORT_SHARD(JSON.parse({_js_json(entries)}));')
+        shards.append(filename)
+
+    for path, value in parts:
+        entry = [path, value]
+        entries.append(entry)
+        size += len(json.dumps(entry, separators=(',', ':')))
+        if size >= REPORT_SHARD_SIZE:
+            _flush()
+            entries = []
+            size = 0
+    if entries:
+        _flush()
+    return shards
+
 
+def write_report_html(template_html: str, is_single: bool, data, output_path: str, layout: str = 'inline'):
+    """
+    Write index.html of the report to the output path.
 
-def _generate_static_html(result, html, output_path):
-    filename = os.path.join(output_path, "index.html")
-    with open(filename, 'w', encoding='utf-8') as f:
-        html = setup_report_variables(html, True, result)
-        f.write(html)
+    In the inline layout, the report data is embedded in index.html. In the sharded layout, index.html only embeds the
+    report data without the tables and the dbt artifacts, which are written to the script files in the report-data
+    directory, at most about REPORT_SHARD_SIZE each. The shards are loaded in parallel before the report app starts,
+    so the browser never decodes the whole report data at once. They are loaded by script tags instead of fetch, so the
+    report still works when it is opened as a local file.
+
+    :param template_html: the html of the report template
+    :param is_single: whether it is a single report or a comparison report
+    :param data: the report data in a dict or a json string
+    :param output_path: the directory of the report
+    :param layout: 'inline' or 'sharded'
+    """
+    shard_dir = os.path.join(output_path, REPORT_SHARD_DIR)
+    if os.path.isdir(shard_dir):
+        # the shards of the previous report
+        shutil.rmtree(shard_dir)
+
+    head, tail = _split_template(template_html)
+    if layout == 'sharded':
+        # the app reads the report data once it starts, so its scripts are loaded after the shards
+        app_scripts = _APP_SCRIPT_PATTERN.findall(head) + _APP_SCRIPT_PATTERN.findall(tail)
+        head = _APP_SCRIPT_PATTERN.sub('', head)
+        tail = _APP_SCRIPT_PATTERN.sub('', tail)
+        variables = _sharded_report_variables(is_single, data, output_path, app_scripts)
+    else:
+        variables = _report_variables(is_single, data)
+
+    with open(os.path.join(output_path, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(head)
+        for part in variables:
+            f.write(part)
+        f.write(tail)
+
+
+def _sharded_report_variables(is_single: bool, data, output_path: str, app_scripts: List[str]) -> Iterator[str]:
+    if not isinstance(data, dict):
+        data = json.loads(data)
+    summary, parts = _split_report_data(data, is_single)
+    shards = _write_report_shards(output_path, parts)
+
+    metadata = json.dumps(prepare_piperider_metadata())
+    data_variable = 'PIPERIDER_SINGLE_REPORT_DATA' if is_single else 'PIPERIDER_COMPARISON_REPORT_DATA'
+    yield f'<script id="piperider-report-variables">\n' \
+          f'window.PIPERIDER_METADATA={metadata};' \
+          f'window.PIPERIDER_SINGLE_REPORT_DATA="";' \
+          f'window.PIPERIDER_COMPARISON_REPORT_DATA="";' \
+          f'(function(){{' \
+          f'var data=JSON.parse({_js_json(summary)}),shards={json.dumps(shards)},' \
+          f'scripts={json.dumps(app_scripts)},pending=shards.length;' \
+          f'function load(src,onload){{var s=document.createElement("script");s.src=src;s.async=false;' \
+          f's.onload=onload;s.onerror=onload;document.body.appendChild(s);}}' \
+          f'function start(){{window.{data_variable}=data;scripts.forEach(function(src){{load(src);}});}}' \
+          f'function done(){{if(--pending===0)start();}}' \
+          f'window.PIPERIDER_REPORT_SHARD=function(entries){{entries.forEach(function(e){{' \
+          f'var o=data,p=e[0];for(var i=0;i<p.length-1;i++)o=o[p[i]];o[p[p.length-1]]=e[1];}});}};' \
+          f'if(pending===0)start();else shards.forEach(function(src){{load(src,done);}});' \
+          f'}})();</script>'
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def link_report_assets(template_dir: str, target_dir: str, asset_dir: Optional[str]):
+    """
+    Put the static assets of the report template, except index.html, into the target directory.
+
+    The assets are stored once in the asset directory by their content hashes, and the reports hardlink them instead of
+    copying them again. The assets already linked are skipped. If hardlinks are not supported, e.g. the target directory
+    is on another device, the assets are copied.
+
+    :param template_dir: the directory of the report template
+    :param target_dir: the directory of the report
+    :param asset_dir: the directory of the shared assets, the assets are copied if it is None
+    """
+    for root, _, files in os.walk(template_dir):
+        for name in files:
+            src = os.path.join(root, name)
+            rel_path = os.path.relpath(src, template_dir)
+            if rel_path == 'index.html':
+                continue
+            dst = os.path.join(target_dir, rel_path)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if asset_dir is None:
+                shutil.copy2(src, dst)
+                continue
+
+            stat = os.stat(src)
+            digest = _file_digest(src, stat.st_size, stat.st_mtime_ns)
+            blob = os.path.join(asset_dir, digest[:2], f'{digest}{os.path.splitext(name)[1]}')
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp_blob = f'{blob}.{os.getpid()}.tmp'
+                shutil.copy2(src, tmp_blob)
+                os.replace(tmp_blob, blob)
+
+            if os.path.exists(dst):
+                if os.path.samefile(blob, dst):
+                    continue
+                os.remove(dst)
+            try:
+                os.link(blob, dst)
+            except OSError:
+                shutil.copy2(blob, dst)
+
+
+def clone_report(template_dir: str, report_dir: str, target_dir: str, asset_dir: Optional[str]):
+    """
+    Clone the generated report to another directory, instead of generating it again.
+    """
+    link_report_assets(template_dir, target_dir, asset_dir)
+    shutil.copyfile(os.path.join(report_dir, 'index.html'), os.path.join(target_dir, 'index.html'))
+
+    shard_dir = os.path.join(target_dir, REPORT_SHARD_DIR)
+    if os.path.isdir(shard_dir):
+        shutil.rmtree(shard_dir)
+    if os.path.isdir(os.path.join(report_dir, REPORT_SHARD_DIR)):
+        shutil.copytree(os.path.join(report_dir, REPORT_SHARD_DIR), shard_dir)
+
+
+def _generate_static_html(result, html, output_path, layout='inline'):
+    write_report_html(html, True, result, output_path, layout=layout)
 
 
 class GenerateReport:
     @staticmethod
     def exec(input=None, report_dir=None, output=None, open_report=None, open_in_cloud=None):
-        filesystem = Configuration.instance().activate_report_directory(report_dir)
+        configuration = Configuration.instance()
+        filesystem = configuration.activate_report_directory(report_dir)
         raise_exception_when_directory_not_writable(output)
 
         console = Console()
@@ -85,8 +295,7 @@ class GenerateReport:
             print(os.path.abspath(run_json_path))
             raise PipeRiderNoProfilingResultError(run_json_path)
 
-        with open(run_json_path) as f:
-            result = json.loads(f.read())
+        result = load_run_result(run_json_path)
         if not _validate_input_result(result):
             console.print(f'[bold red]Error: {run_json_path} is invalid[/bold red]')
             return
@@ -94,16 +303,14 @@ class GenerateReport:
         console.print('')
         console.print(f'Generating reports from: {run_json_path}', soft_wrap=True)
 
-        def output_report(target_directory):
-            clone_directory(report_template_dir, target_directory)
-            _generate_static_html(result, report_template_html, target_directory)
-
         # output the report to the default directory (same with the run.json)
         default_output_directory = os.path.dirname(run_json_path)
-        output_report(default_output_directory)
+        link_report_assets(report_template_dir, default_output_directory, filesystem.get_asset_dir())
+        _generate_static_html(result, report_template_html, default_output_directory,
+                              layout=configuration.report_layout)
 
         if output:
-            output_report(output)
+            clone_report(report_template_dir, default_output_directory, output, filesystem.get_asset_dir())
             shutil.copyfile(run_json_path, os.path.join(output, os.path.basename(run_json_path)))
             console.print(
                 f"Report generated in: {os.path.join(output, 'index.html')}", soft_wrap=True)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# the default size cap of the cache file in megabytes
+DEFAULT_CACHE_MAX_SIZE = 256
+
+
+class ProfileCache:
+    """
+    A persistent cache of the column profiling results backed by a SQLite file.
+
+    The entries are keyed by the data source, table, column, column type, profiler config and the table fingerprint,
+    so that the runs against the same warehouse state reuse the results instead of querying the warehouse again. The
+    least recently used entries are evicted when the total size exceeds the cap.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_CACHE_MAX_SIZE * 1024 * 1024):
+        """
+        :param path: the path of the SQLite file
+        :param max_size: the maximum total size of the cached results in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS profile_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_accessed ON profile_cache (last_accessed)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(datasource: str, table: str, column: str, column_type: str, profiler_config: dict,
+                 fingerprint: str) -> str:
+        config_hash = hashlib.sha256(json.dumps(profiler_config, sort_keys=True, default=str).encode()).hexdigest()
+        payload = [datasource, table, column, column_type, config_hash, fingerprint]
+        return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM profile_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE profile_cache SET last_accessed = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict):
+        value = json.dumps(result, separators=(',', ':'))
+        size = len(value)
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO profile_cache (key, result, size, last_accessed) VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time()))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM profile_cache').fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        rows = self._conn.execute('SELECT key, size FROM profile_cache ORDER BY last_accessed').fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM profile_cache WHERE key = ?', evicted)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM profile_cache').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
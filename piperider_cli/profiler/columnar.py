@@ -0,0 +1,498 @@
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import Date
+from sqlalchemy.types import TypeEngine
+
+from .profiler import DEFAULT_PERCENTILES, TOPK_NUM, datetime_histogram_bins, dtof, histogram_bins, percentage, \
+    percentile_key
+
+# the number of rows in a record batch
+COLUMNAR_BATCH_SIZE = 65536
+# the number of value counts kept before they are merged
+VALUE_COUNTS_MERGE_SIZE = 1 << 20
+
+
+class ValueCounts:
+    """
+    The exact count of each distinct value. The counts of each batch are merged by the hash aggregation of Arrow
+    instead of a python dict.
+
+    The memory is bounded by the number of distinct values of the column rather than the number of rows, and the
+    exact counts are enough for the exact quantiles, histograms and top-k.
+    """
+
+    def __init__(self):
+        self._values: List[pa.Array] = []
+        self._counts: List[pa.Array] = []
+        self._size = 0
+        self._merge_size = VALUE_COUNTS_MERGE_SIZE
+
+    def update(self, array: pa.Array):
+        counts = pc.value_counts(array)
+        self._values.append(counts.field('values'))
+        self._counts.append(counts.field('counts'))
+        self._size += len(counts)
+        if self._size >= self._merge_size:
+            self._merge()
+            # avoid merging on every batch if the column has too many distinct values
+            self._merge_size = max(self._merge_size, self._size * 2)
+
+    def _merge(self):
+        if len(self._values) <= 1:
+            return
+        table = pa.table({
+            'v': pa.concat_arrays(self._values),
+            'c': pa.concat_arrays([c.cast(pa.int64()) for c in self._counts]),
+        })
+        merged = table.group_by('v').aggregate([('c', 'sum')])
+        self._values = [merged['v'].combine_chunks()]
+        self._counts = [merged['c_sum'].combine_chunks()]
+        self._size = len(merged)
+
+    def result(self) -> Tuple[Optional[pa.Array], np.ndarray]:
+        """
+        :return: the distinct values and their counts
+        """
+        self._merge()
+        if not self._values:
+            return None, np.empty(0, dtype=np.int64)
+        return self._values[0], self._counts[0].to_numpy(zero_copy_only=False).astype(np.int64)
+
+
+class _Moments:
+    """
+    The count, mean and sum of squared differences merged batch by batch (Chan et al.), so the variance is computed in
+    one pass without the loss of precision of sum(x^2) - sum(x)^2.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum = 0.0
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+        self.sum += float(values.sum())
+
+    @property
+    def avg(self) -> Optional[float]:
+        return self.mean if self.n > 0 else None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
+
+
+def _min_max(array: pa.Array, current_min, current_max):
+    result = pc.min_max(array)
+    _min = result['min'].as_py()
+    _max = result['max'].as_py()
+    if current_min is not None and (_min is None or current_min < _min):
+        _min = current_min
+    if current_max is not None and (_max is None or current_max > _max):
+        _max = current_max
+    return _min, _max
+
+
+def _topk(values: pa.Array, counts: np.ndarray, k: int = TOPK_NUM) -> dict:
+    order = np.argsort(-counts, kind='stable')[:k]
+    return {
+        "values": [str(v) for v in values.take(pa.array(order)).to_pylist()],
+        "counts": [int(c) for c in counts[order]],
+    }
+
+
+def _quantiles(values: np.ndarray, counts: np.ndarray, percentiles) -> Dict[float, float]:
+    # the same value as percentile_disc, i.e. the first value whose cumulative distribution reaches the percentile
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    cumulative = np.cumsum(counts[order])
+    total = int(cumulative[-1])
+    quantiles = {}
+    for percentile in percentiles:
+        rank = max(math.ceil(percentile * total / 100) - 1, 0)
+        quantiles[percentile] = float(values[np.searchsorted(cumulative, rank, side='right')])
+    return quantiles
+
+
+def _histogram(values: np.ndarray, counts: np.ndarray, min, max, is_integer: bool) -> dict:
+    interval, num_buckets, labels, bin_edges = histogram_bins(min, max, is_integer)
+    buckets = np.clip(np.floor((values - min) / interval), 0, num_buckets - 1).astype(np.int64)
+    histogram_counts = np.bincount(buckets, weights=counts, minlength=num_buckets)
+    return {
+        "labels": labels,
+        "counts": [int(c) for c in histogram_counts],
+        "bin_edges": bin_edges,
+    }
+
+
+class ColumnAccumulator:
+    """
+    The accumulator of the metrics of a column. It is updated by the batches of the column, and produces the same
+    result as the column profiler of the generic type.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.non_nulls = 0
+
+    def update(self, array: pa.Array):
+        self.total += len(array)
+        self.non_nulls += len(array) - array.null_count
+        valids = array.drop_null()
+        if len(valids) > 0:
+            self._update_valids(valids)
+
+    def _update_valids(self, valids: pa.Array):
+        pass
+
+    def result(self) -> dict:
+        _total = self.total
+        _non_nulls = self.non_nulls
+        _nulls = _total - _non_nulls
+        # the values of a file are typed, so all the non-null values are valid
+        return {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _non_nulls,
+            'valids_p': percentage(_non_nulls, _total),
+            'invalids': 0,
+            'invalids_p': 0 if _total else None,
+        }
+
+
+class _UniquenessAccumulator(ColumnAccumulator):
+    def __init__(self):
+        super().__init__()
+        self.value_counts = ValueCounts()
+
+    def _update_valids(self, valids: pa.Array):
+        self.value_counts.update(valids)
+
+    def _uniqueness(self) -> dict:
+        _, counts = self.value_counts.result()
+        _valids = self.non_nulls
+        _distinct = len(counts)
+        _non_duplicates = int(np.count_nonzero(counts == 1))
+        _duplicates = _valids - _non_duplicates
+        return {
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+            "duplicates": _duplicates,
+            "duplicates_p": percentage(_duplicates, _valids),
+            "non_duplicates": _non_duplicates,
+            "non_duplicates_p": percentage(_non_duplicates, _valids),
+        }
+
+
+class StringAccumulator(_UniquenessAccumulator):
+    def __init__(self):
+        super().__init__()
+        self.zero_length = 0
+        self.lengths = _Moments()
+        self.length_counts = ValueCounts()
+
+    def _update_valids(self, valids: pa.Array):
+        super()._update_valids(valids)
+        lengths = pc.utf8_length(valids)
+        self.length_counts.update(lengths)
+        lengths = lengths.to_numpy(zero_copy_only=False)
+        self.zero_length += int(np.count_nonzero(lengths == 0))
+        self.lengths.update(lengths.astype(np.float64))
+
+    def result(self) -> dict:
+        result = super().result()
+        _total = self.total
+        _valids = self.non_nulls
+        _zero_length = self.zero_length
+        _non_zero_length = _valids - _zero_length
+        lengths, length_counts = self.length_counts.result()
+        lengths = lengths.to_numpy(zero_copy_only=False) if lengths is not None else np.empty(0)
+        _min = int(lengths.min()) if len(lengths) else None
+        _max = int(lengths.max()) if len(lengths) else None
+        _avg = self.lengths.avg
+        _stddev = self.lengths.stddev
+
+        result.update({
+            'zero_length': _zero_length,
+            'zero_length_p': percentage(_zero_length, _total),
+            'non_zero_length': _non_zero_length,
+            'non_zero_length_p': percentage(_non_zero_length, _total),
+            'min': _min,
+            'min_length': _min,
+            'max': _max,
+            'max_length': _max,
+            'avg': _avg,
+            'avg_length': _avg,
+            'stddev': _stddev,
+            'stddev_length': _stddev,
+        })
+        result.update(self._uniqueness())
+
+        topk = None
+        histogram = None
+        if _valids > 0:
+            values, counts = self.value_counts.result()
+            topk = _topk(values, counts)
+            histogram = _histogram(lengths, length_counts, _min, _max, True)
+        result['topk'] = topk
+        result['histogram'] = histogram
+        result['histogram_length'] = histogram
+        return result
+
+
+class NumericAccumulator(_UniquenessAccumulator):
+    def __init__(self, is_integer: bool, percentiles: Optional[List[float]] = None):
+        super().__init__()
+        self.is_integer = is_integer
+        # the percentiles configured by users in addition to the default ones
+        self.percentiles = percentiles or []
+        self.zeros = 0
+        self.negatives = 0
+        self.min = None
+        self.max = None
+        self.moments = _Moments()
+
+    def _update_valids(self, valids: pa.Array):
+        super()._update_valids(valids)
+        self.min, self.max = _min_max(valids, self.min, self.max)
+        values = valids.to_numpy(zero_copy_only=False).astype(np.float64)
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.negatives += int(np.count_nonzero(values < 0))
+        self.moments.update(values)
+
+    def result(self) -> dict:
+        result = super().result()
+        _total = self.total
+        _valids = self.non_nulls
+        _zeros = self.zeros
+        _negatives = self.negatives
+        _positives = _valids - _zeros - _negatives
+        _min = dtof(self.min)
+        _max = dtof(self.max)
+
+        result.update({
+            'zeros': _zeros,
+            'zeros_p': percentage(_zeros, _total),
+            'negatives': _negatives,
+            'negatives_p': percentage(_negatives, _total),
+            'positives': _positives,
+            'positives_p': percentage(_positives, _total),
+            'min': _min,
+            'max': _max,
+            'sum': self.moments.sum if self.moments.n > 0 else None,
+            'avg': self.moments.avg,
+            'stddev': self.moments.stddev,
+        })
+        result.update(self._uniqueness())
+
+        histogram = None
+        quantile = {}
+        if _valids > 0 and math.isfinite(_min) and math.isfinite(_max):
+            values, counts = self.value_counts.result()
+            values = values.to_numpy(zero_copy_only=False).astype(np.float64)
+            histogram = _histogram(values, counts, _min, _max, self.is_integer)
+            for percentile, v in _quantiles(values, counts, set(DEFAULT_PERCENTILES + self.percentiles)).items():
+                quantile[percentile_key(percentile)] = int(v) if self.is_integer else v
+        result['histogram'] = histogram
+        for percentile in DEFAULT_PERCENTILES:
+            result[percentile_key(percentile)] = quantile.get(percentile_key(percentile))
+        if self.percentiles:
+            result['quantiles'] = {percentile_key(p): quantile.get(percentile_key(p))
+                                   for p in sorted(set(self.percentiles))}
+
+        if self.is_integer:
+            topk = None
+            if _valids > 0:
+                topk = _topk(*self.value_counts.result())
+            result["topk"] = topk
+        return result
+
+
+class DatetimeAccumulator(_UniquenessAccumulator):
+    def __init__(self):
+        super().__init__()
+        self.min = None
+        self.max = None
+
+    def _update_valids(self, valids: pa.Array):
+        super()._update_valids(valids)
+        self.min, self.max = _min_max(valids, self.min, self.max)
+
+    def result(self) -> dict:
+        result = super().result()
+        _min = self.min
+        _max = self.max
+        result.update({
+            'min': _min.isoformat() if _min is not None else None,
+            'max': _max.isoformat() if _max is not None else None,
+        })
+        result.update(self._uniqueness())
+
+        histogram = None
+        if _min and _max:
+            histogram = self._histogram(_min, _max)
+        result['histogram'] = histogram
+        return result
+
+    def _histogram(self, min, max) -> dict:
+        _type, dmin, interval, num_buckets, labels, bin_edges = datetime_histogram_bins(min, max)
+        values, counts = self.value_counts.result()
+        days = values.to_numpy(zero_copy_only=False).astype('datetime64[D]')
+
+        # the index of the bucket by the calendar arithmetic instead of comparing with each bin edge
+        if _type == 'yearly':
+            years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+            buckets = (years - dmin.year) // interval.years
+        elif _type == 'monthly':
+            months = days.astype('datetime64[M]').astype(np.int64)
+            buckets = months - ((dmin.year - 1970) * 12 + dmin.month - 1)
+        else:
+            buckets = (days - np.datetime64(dmin, 'D')).astype(np.int64)
+
+        in_range = (buckets >= 0) & (buckets < num_buckets)
+        histogram_counts = np.bincount(buckets[in_range], weights=counts[in_range], minlength=num_buckets)
+        return {
+            "labels": labels,
+            "counts": [int(c) for c in histogram_counts],
+            "bin_edges": bin_edges,
+        }
+
+
+class BooleanAccumulator(ColumnAccumulator):
+    def __init__(self):
+        super().__init__()
+        self.trues = 0
+
+    def _update_valids(self, valids: pa.Array):
+        self.trues += pc.sum(valids.cast(pa.int64())).as_py() or 0
+
+    def result(self) -> dict:
+        result = super().result()
+        _total = self.total
+        _valids = self.non_nulls
+        _trues = self.trues
+        _falses = _valids - _trues
+        _distinct = int(_trues > 0) + int(_falses > 0)
+        result.update({
+            'trues': _trues,
+            'trues_p': percentage(_trues, _total),
+            'falses': _falses,
+            'falses_p': percentage(_falses, _total),
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+        })
+        return result
+
+
+def _create_accumulator(generic_type: str, percentiles: Optional[List[float]]) -> ColumnAccumulator:
+    if generic_type == 'string':
+        return StringAccumulator()
+    elif generic_type == 'integer':
+        return NumericAccumulator(is_integer=True, percentiles=percentiles)
+    elif generic_type == 'numeric':
+        return NumericAccumulator(is_integer=False, percentiles=percentiles)
+    elif generic_type == 'datetime':
+        return DatetimeAccumulator()
+    elif generic_type == 'boolean':
+        return BooleanAccumulator()
+    return ColumnAccumulator()
+
+
+def _to_arrow_type(generic_type: str, column_type: TypeEngine) -> pa.DataType:
+    if generic_type == 'integer':
+        return pa.int64()
+    elif generic_type == 'numeric':
+        return pa.float64()
+    elif generic_type == 'datetime':
+        return pa.date32() if isinstance(column_type, Date) else pa.timestamp('us')
+    elif generic_type == 'boolean':
+        return pa.bool_()
+    return pa.string()
+
+
+class ColumnarProfiler:
+    """
+    Profile the columns of a local CSV or Parquet file in a single vectorized pass. The file is read by Arrow in
+    record batches (Parquet row groups or CSV blocks), so it is never loaded into memory all at once.
+
+    The result of each column has the same shape as the result of the column profiler of the same generic type. The
+    distinct values of each column are counted exactly, so the memory is bounded by the number of distinct values
+    instead of the number of rows, and the quantiles are exact.
+    """
+
+    def __init__(self, file_format: str, path: str, columns: List[Tuple[str, str, TypeEngine]], limit: int = 0,
+                 percentiles: Optional[List[float]] = None):
+        """
+        :param file_format: 'csv' or 'parquet'
+        :param path: the path of the file
+        :param columns: the list of (name, generic type, column type) to profile
+        :param limit: the maximum number of rows to profile, 0 for unlimited
+        :param percentiles: optional, the percentiles to profile in addition to the default ones
+        """
+        self.file_format = file_format
+        self.path = path
+        self.columns = columns
+        self.limit = limit
+        self.percentiles = percentiles
+
+    def _read_batches(self) -> Iterator[pa.RecordBatch]:
+        names = [name for name, _, _ in self.columns]
+        if self.file_format == 'parquet':
+            yield from pq.ParquetFile(self.path).iter_batches(batch_size=COLUMNAR_BATCH_SIZE, columns=names)
+        elif self.file_format == 'csv':
+            # follow the types inferred by DuckDB, and only the empty values are nulls like read_csv_auto
+            convert_options = pa_csv.ConvertOptions(
+                column_types={name: _to_arrow_type(generic_type, column_type)
+                              for name, generic_type, column_type in self.columns},
+                include_columns=names,
+                null_values=[''],
+                strings_can_be_null=True,
+            )
+            yield from pa_csv.open_csv(self.path, convert_options=convert_options)
+        else:
+            raise ValueError(f"unsupported file format '{self.file_format}'")
+
+    def _coerce(self, array: pa.Array, generic_type: str) -> pa.Array:
+        if generic_type == 'numeric' and not pa.types.is_floating(array.type):
+            return array.cast(pa.float64())
+        if generic_type == 'integer' and not pa.types.is_integer(array.type):
+            return array.cast(pa.int64())
+        return array
+
+    def profile(self) -> Dict[str, dict]:
+        accumulators = {name: _create_accumulator(generic_type, self.percentiles)
+                        for name, generic_type, _ in self.columns}
+        rows = 0
+        for batch in self._read_batches():
+            if self.limit > 0:
+                if rows >= self.limit:
+                    break
+                batch = batch.slice(0, self.limit - rows)
+            rows += batch.num_rows
+            for name, generic_type, _ in self.columns:
+                array = self._coerce(batch.column(name), generic_type)
+                accumulators[name].update(array)
+
+        return {name: accumulator.result() for name, accumulator in accumulators.items()}
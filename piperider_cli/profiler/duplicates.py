@@ -0,0 +1,206 @@
+import hashlib
+import os
+import struct
+import tempfile
+from typing import Dict, List, Optional
+
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.sql import FromClause
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..event import capture_exception
+
+# the number of rows fetched in a batch by the client-side counting
+DUPLICATE_ROWS_BATCH_SIZE = 10000
+# the maximum number of distinct row hashes kept in memory before they are spilled to the disk
+DUPLICATE_ROWS_MEMORY_LIMIT = 1 << 20
+# the number of partitions of the spilled row hashes, each partition is counted in memory separately
+DUPLICATE_ROWS_SPILL_PARTITIONS = 64
+# the in-process backends which count the rows on the client side without a limit. The rows of the other backends are
+# only streamed to the client if the profiling is limited to this number of rows.
+DUPLICATE_ROWS_CLIENT_BACKENDS = ['sqlite', 'duckdb']
+DUPLICATE_ROWS_CLIENT_MAX_ROWS = 1000000
+
+_SQLITE_ROW_HASH = 'piperider_row_hash'
+_DIGEST_SIZE = 16
+_RECORD = struct.Struct(f'>{_DIGEST_SIZE}sQ')
+
+
+def _row_digest(values) -> bytes:
+    return hashlib.blake2b(repr(tuple(values)).encode('utf-8'), digest_size=_DIGEST_SIZE).digest()
+
+
+def _sqlite_row_hash(*values) -> int:
+    return int.from_bytes(_row_digest(values)[:8], 'big', signed=True)
+
+
+def row_hash(conn: Connection, columns: List[ColumnElement]) -> Optional[ColumnElement]:
+    """
+    The hash of the whole row by the native function of the data source. The rows are counted by the hash instead of
+    grouping by all the columns, which is expensive for wide tables and fails on the types not groupable.
+
+    :return: the hash expression or None if the data source has no suitable function
+    """
+    backend = conn.engine.url.get_backend_name()
+    if backend in ['snowflake', 'duckdb']:
+        return func.hash(*columns)
+    elif backend == 'postgresql':
+        # the text of the row quotes the values and distinguishes nulls from empty strings
+        return func.md5(cast(func.row(*columns), Text))
+    elif backend == 'bigquery':
+        return func.farm_fingerprint(func.to_json_string(func.struct(*columns)))
+    elif backend == 'databricks':
+        return func.xxhash64(*columns)
+    elif backend == 'sqlite':
+        conn.connection.create_function(_SQLITE_ROW_HASH, -1, _sqlite_row_hash, deterministic=True)
+        return getattr(func, _SQLITE_ROW_HASH)(*columns)
+    return None
+
+
+class RowHashCounter:
+    """
+    Count the duplicate rows by the hashes of the rows on the client side. The counts are kept in memory up to the
+    limit, and then spilled to the partition files by the hash, so each partition fits in memory when it is counted.
+    """
+
+    def __init__(self, memory_limit: int = None, partitions: int = DUPLICATE_ROWS_SPILL_PARTITIONS):
+        self.memory_limit = memory_limit if memory_limit is not None else DUPLICATE_ROWS_MEMORY_LIMIT
+        self.partitions = partitions
+        self.counts: Dict[bytes, int] = {}
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+
+    def add(self, row):
+        digest = _row_digest(row)
+        self.counts[digest] = self.counts.get(digest, 0) + 1
+        if len(self.counts) >= self.memory_limit:
+            self._spill()
+
+    def _partition_path(self, i: int) -> str:
+        return os.path.join(self._tmpdir.name, f'{i}.bin')
+
+    def _spill(self):
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix='piperider-duplicates-')
+        buffers = [bytearray() for _ in range(self.partitions)]
+        for digest, count in self.counts.items():
+            buffers[digest[0] % self.partitions] += _RECORD.pack(digest, count)
+        for i, buffer in enumerate(buffers):
+            if buffer:
+                with open(self._partition_path(i), 'ab') as f:
+                    f.write(buffer)
+        self.counts = {}
+
+    @staticmethod
+    def _duplicates(counts: Dict[bytes, int]) -> int:
+        return sum(count for count in counts.values() if count > 1)
+
+    def duplicates(self) -> int:
+        """
+        :return: the number of rows which have identical rows
+        """
+        if self._tmpdir is None:
+            return self._duplicates(self.counts)
+
+        try:
+            self._spill()
+            duplicates = 0
+            for i in range(self.partitions):
+                path = self._partition_path(i)
+                if not os.path.exists(path):
+                    continue
+                counts = {}
+                with open(path, 'rb') as f:
+                    for digest, count in _RECORD.iter_unpack(f.read()):
+                        counts[digest] = counts.get(digest, 0) + count
+                duplicates += self._duplicates(counts)
+            return duplicates
+        finally:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+
+def _count_by_hash(conn: Connection, table: FromClause, limit: int, h: ColumnElement) -> int:
+    cte = select(h.label('h')).select_from(table)
+    if limit > 0:
+        cte = cte.limit(limit)
+    cte = cte.cte()
+    cte = select(
+        cte.c.h,
+        func.count().label('c')
+    ).select_from(cte).group_by(cte.c.h).having(func.count() > 1).cte()
+    duplicate_rows, = conn.execute(select(func.sum(cte.c.c)).select_from(cte)).fetchone()
+    return duplicate_rows
+
+
+def _count_by_columns(conn: Connection, table: FromClause, limit: int) -> int:
+    columns = [column.label(f'_{column.name}') for column in table.columns]
+    if limit <= 0:
+        cte = select(
+            *columns,
+            func.count().label('c')
+        ).select_from(table).group_by(*columns).having(func.count() > 1).cte()
+    else:
+        cte = select(*columns).select_from(table).limit(limit).cte()
+        columns = [column for column in cte.columns]
+        cte = select(
+            *columns,
+            func.count().label('c')
+        ).select_from(cte).group_by(*columns).having(func.count() > 1).cte()
+    duplicate_rows, = conn.execute(select(func.sum(cte.c.c)).select_from(cte)).fetchone()
+    return duplicate_rows
+
+
+def count_duplicate_rows_on_client(conn: Connection, table: FromClause, limit: int) -> int:
+    stmt = select(*table.columns).select_from(table)
+    if limit > 0:
+        stmt = stmt.limit(limit)
+
+    counter = RowHashCounter()
+    result = conn.execution_options(stream_results=True).execute(stmt)
+    for rows in result.partitions(DUPLICATE_ROWS_BATCH_SIZE):
+        for row in rows:
+            counter.add(row)
+    return counter.duplicates()
+
+
+def _is_query_error(e: Exception) -> bool:
+    # the errors of the query itself, e.g. the types are not groupable or the hash function is not supported. The
+    # operational errors, such as timeouts and dropped connections, are not solved by querying again.
+    return isinstance(e, DBAPIError) and not isinstance(e, OperationalError) and not e.connection_invalidated
+
+
+def _can_count_on_client(engine: Engine, limit: int) -> bool:
+    if engine.url.get_backend_name() in DUPLICATE_ROWS_CLIENT_BACKENDS:
+        return True
+    return 0 < limit <= DUPLICATE_ROWS_CLIENT_MAX_ROWS
+
+
+def count_duplicate_rows(engine: Engine, table: FromClause, limit: int = 0) -> int:
+    """
+    Count the rows which have identical rows in the table. The rows are counted by the hashes of the rows if the data
+    source provides a hash function, otherwise by grouping all the columns. If the query is rejected, e.g. some
+    columns are not groupable, the rows are streamed and counted on the client side. It is only done for the
+    in-process backends, or if the rows are limited, so a whole warehouse table is never pulled to the client.
+
+    :param engine: the engine to query the table
+    :param table: the table or the sample to count
+    :param limit: the maximum number of rows to count, 0 for unlimited
+    :return: the number of duplicate rows
+    """
+    try:
+        with engine.connect() as conn:
+            h = row_hash(conn, list(table.columns))
+            if h is not None:
+                duplicate_rows = _count_by_hash(conn, table, limit, h)
+            else:
+                duplicate_rows = _count_by_columns(conn, table, limit)
+    except Exception as e:
+        if not _is_query_error(e) or not _can_count_on_client(engine, limit):
+            raise
+        capture_exception(e)
+        # the connection may be unusable after the failed query
+        with engine.connect() as conn:
+            duplicate_rows = count_duplicate_rows_on_client(conn, table, limit)
+    return duplicate_rows if duplicate_rows is not None else 0
@@ -48,6 +48,10 @@ class DefaultProfilerEventHandler(ProfilerEventHandler):
     col_completed = 0
     col_total = 0
 
+    def __init__(self):
+        # the column progress of each table, since the tables may be profiled concurrently
+        self.col_progress = {}
+
     def handle_run_start(self, run_result):
         print("Start profiling")
 
@@ -82,6 +86,7 @@ class DefaultProfilerEventHandler(ProfilerEventHandler):
     def handle_table_progress(self, table_name, table_result, total, completed):
         self.col_total = total
         self.col_completed = completed
+        self.col_progress[table_name] = (total, completed)
         if completed == 0:
             print(
                 f"[{self.table_completed + 1}/{self.table_total}] profiling [{table_name}] rows={table_result['row_count']}")
@@ -93,5 +98,6 @@ class DefaultProfilerEventHandler(ProfilerEventHandler):
         pass
 
     def handle_column_end(self, table_name, column_name, column_result):
+        col_total, col_completed = self.col_progress.get(table_name, (self.col_total, self.col_completed))
         print(
-            f"    [{self.col_completed + 1}/{self.col_total}] profiling [{table_name}.{column_name}] type={column_result['schema_type']} [{column_result['elapsed_milli']}ms]")
+            f"    [{col_completed + 1}/{col_total}] profiling [{table_name}.{column_name}] type={column_result['schema_type']} [{column_result['elapsed_milli']}ms]")
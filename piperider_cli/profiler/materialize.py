@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, MetaData, Table, select, types
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import FromClause
+
+# the number of rows to copy in a batch
+MATERIALIZE_BATCH_SIZE = 10000
+MATERIALIZE_METHODS = ['table', 'duckdb']
+
+# the backends supporting the session-scoped temporary tables created by `CREATE TEMPORARY TABLE AS`
+_TEMPORARY_TABLE_BACKENDS = ['postgresql', 'redshift', 'snowflake', 'duckdb']
+_SAMPLE_TABLE_PREFIX = 'piperider_sample_'
+
+# the generic types supported by the local copy, the others are copied as strings
+_LOCAL_TYPES = (types.String, types.Integer, types.Numeric, types.Date, types.DateTime, types.Time, types.Boolean)
+
+
+class MaterializedSample:
+    """
+    The sample of a table materialized once and shared by all the column profilers.
+
+    :ivar engine: the engine to query the materialized table
+    :ivar table: the materialized table
+    """
+
+    def __init__(self, engine: Engine, table: Table, drop: Callable[[], None]):
+        self.engine = engine
+        self.table = table
+        self._drop = drop
+
+    def drop(self):
+        self._drop()
+
+
+def _to_local_type(column_type: types.TypeEngine) -> types.TypeEngine:
+    try:
+        generic = column_type.as_generic()
+    except NotImplementedError:
+        return types.String()
+
+    if isinstance(generic, types.Numeric) and not isinstance(generic, types.Float):
+        # the max precision of decimals in duckdb
+        if generic.precision is not None and generic.precision > 38:
+            return types.Float()
+    if isinstance(generic, _LOCAL_TYPES):
+        return generic
+    return types.String()
+
+
+def _to_local_value(value, local_type: types.TypeEngine):
+    if value is None or not isinstance(local_type, types.String) or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _sample_table_name() -> str:
+    return f'{_SAMPLE_TABLE_PREFIX}{uuid.uuid4().hex[:8]}'
+
+
+def _session_engine(engine: Engine) -> Engine:
+    # An engine over a single connection detached from the pool of the engine, so that the temporary table created in
+    # the session is visible to all the column profilers. The pool of one connection serializes their queries, and
+    # the session ends when the engine is disposed.
+    fairy = engine.raw_connection()
+    fairy.detach()
+    dbapi_connection = fairy.connection
+    pool = QueuePool(lambda: dbapi_connection, pool_size=1, max_overflow=0, timeout=None)
+    return Engine(pool, engine.dialect, engine.url)
+
+
+def _materialize_as_temporary_table(engine: Engine, source: Table, selectable) -> Optional[MaterializedSample]:
+    if engine.url.get_backend_name() not in _TEMPORARY_TABLE_BACKENDS:
+        # query the sample as a subquery instead
+        return None
+
+    session = _session_engine(engine)
+    name = _sample_table_name()
+    target = Table(name, MetaData())
+    quoted = session.dialect.identifier_preparer.format_table(target)
+    stmt = selectable.compile(dialect=session.dialect, compile_kwargs={'literal_binds': True})
+    try:
+        # commit the DDL explicitly, it is rolled back on the backends with the transactional DDL otherwise
+        with session.begin() as conn:
+            conn.exec_driver_sql(f'CREATE TEMPORARY TABLE {quoted} AS {stmt}')
+    except Exception:
+        session.dispose()
+        raise
+
+    # use the column types of the source table, since the types reflected from the created table may be lossy
+    table = Table(name, MetaData(), *[Column(column.name, column.type) for column in source.columns])
+
+    def _drop():
+        try:
+            with session.begin() as conn:
+                conn.exec_driver_sql(f'DROP TABLE {quoted}')
+        finally:
+            session.dispose()
+
+    return MaterializedSample(session, table, _drop)
+
+
+def _materialize_in_duckdb(engine: Engine, source: Table, selectable, memory_limit: Optional[int] = None,
+                           estimated_bytes: Optional[int] = None) -> MaterializedSample:
+    from piperider_cli.datasource.duckdb import LocalDuckDBDataSource
+
+    # keep the data in memory, or spill to a temporary database file if it is larger than the memory limit
+    tmpdir = None
+    path = None
+    if memory_limit is not None and estimated_bytes is not None and estimated_bytes > memory_limit:
+        tmpdir = tempfile.mkdtemp(prefix='piperider-')
+        path = os.path.join(tmpdir, 'local.duckdb')
+    data_source = LocalDuckDBDataSource('local', path=path,
+                                        memory_limit=f'{memory_limit // (1024 * 1024)}MB' if memory_limit else None)
+    local_engine = data_source.get_engine_by_database()
+
+    columns: List[Column] = [Column(column.name, _to_local_type(column.type)) for column in source.columns]
+    table = Table(source.name, MetaData(), *columns)
+    table.create(bind=local_engine)
+
+    local_types = [column.type for column in columns]
+    names = ', '.join([local_engine.dialect.identifier_preparer.quote(column.name) for column in columns])
+    placeholders = ', '.join(['?'] * len(columns))
+    insert = f'INSERT INTO {local_engine.dialect.identifier_preparer.format_table(table)} ({names}) ' \
+             f'VALUES ({placeholders})'
+
+    local = local_engine.raw_connection()
+    try:
+        cursor = local.cursor()
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(selectable)
+            for rows in result.partitions(MATERIALIZE_BATCH_SIZE):
+                cursor.executemany(insert, [[_to_local_value(v, t) for v, t in zip(row, local_types)] for row in rows])
+    finally:
+        local.close()
+
+    def _drop():
+        data_source.close()
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return MaterializedSample(local_engine, table, _drop)
+
+
+def materialize_sample(engine: Engine, source: Table, sample: Optional[FromClause], limit: int, method: str,
+                       memory_limit: Optional[int] = None, estimated_bytes: Optional[int] = None) \
+    -> Optional[MaterializedSample]:
+    """
+    Materialize the sample of the table, so that the sampling is evaluated once instead of once per query.
+
+    :param engine: the engine of the source table
+    :param source: the source table
+    :param sample: the sample of the source table, or None to take the first rows
+    :param limit: the maximum number of rows, 0 for unlimited
+    :param method: 'table' to create a temporary table in the data source, or 'duckdb' to copy into an in-process
+        DuckDB
+    :param memory_limit: optional, the memory limit in bytes of the in-process DuckDB
+    :param estimated_bytes: optional, the estimated size of the data to copy
+    :return: the materialized sample, or None if the data source has no temporary table
+    """
+    selectable = sample if sample is not None else source
+    stmt = select(*[selectable.c[column.name] for column in source.columns]).select_from(selectable)
+    if limit > 0:
+        stmt = stmt.limit(limit)
+
+    if method == 'table':
+        return _materialize_as_temporary_table(engine, source, stmt)
+    elif method == 'duckdb':
+        return _materialize_in_duckdb(engine, source, stmt, memory_limit=memory_limit,
+                                      estimated_bytes=estimated_bytes)
+    raise ValueError(f"unsupported materialize method '{method}'")
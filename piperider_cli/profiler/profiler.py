@@ -1,39 +1,79 @@
 import asyncio
+import copy
 import decimal
+import hashlib
+import json
 import math
+import os
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, date, timezone
-from typing import Dict, Optional, Union, List, Tuple
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Union, List, Tuple
 
 import sentry_sdk
 from dateutil.relativedelta import relativedelta
 from sqlalchemy import MetaData, Table, Column, String, Integer, Numeric, Date, DateTime, Boolean, ARRAY, select, func, \
-    distinct, case, text, literal_column, inspect, JSON
+    distinct, case, text, literal_column, inspect, JSON, null, tuple_
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.engine import Engine, Connection
 from sqlalchemy.sql import FromClause, Selectable
 from sqlalchemy.sql.elements import ColumnClause
 from sqlalchemy.sql.expression import CTE, false, true, table as table_clause, column as column_clause
 from sqlalchemy.types import Float
-from sqlalchemy.exc import NoSuchTableError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 
+from .cache import ProfileCache
+from .duplicates import count_duplicate_rows
 from .event import ProfilerEventHandler, DefaultProfilerEventHandler
+from .materialize import MaterializedSample, materialize_sample
+from .reflection import build_table_from_catalog, get_catalog_stats, is_bulk_reflection, reflect_tables
+from .sampling import SamplingConfig, estimate_sample_size, sample_table, scale_up
+from .sketch import HyperLogLog, KMinValues, SpaceSaving, hash64
+from .stats import query_table_stats
 from ..configuration import Configuration
 from ..datasource import DataSource
 from ..event import capture_exception
 
 HISTOGRAM_NUM_BUCKET = 50
+# the percentiles always profiled, the users can configure more
+DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+# the maximum number of columns to query in a single fused aggregate query
+FUSED_MAX_COLUMNS = 100
+TOPK_NUM = 50
+APPROX_TOP_K_COUNTERS = 10000
+SKETCH_STREAM_BATCH_SIZE = 10000
+# the client-side sketches stream the values of a column, so they are only used for the local backends, or for the
+# columns with at most this number of values. The others are profiled by the exact queries in the data source.
+SKETCH_MAX_VALUES = 1000000
+SKETCH_LOCAL_BACKENDS = ['sqlite']
+# the backends supporting width_bucket(value, low, high, count)
+WIDTH_BUCKET_BACKENDS = ['postgresql', 'snowflake', 'databricks', 'awsathena', 'trino']
+# the backends supporting GROUP BY ROLLUP, to query the histogram in the same scan as the base aggregates
+ROLLUP_BACKENDS = ['postgresql', 'duckdb', 'snowflake', 'bigquery', 'databricks', 'redshift', 'awsathena', 'trino']
+# the number of pending work items per thread in the shared work queue
+WORK_QUEUE_SIZE_PER_THREAD = 2
+# the count metrics of columns which are scaled up from the sample to the whole table
+SCALABLE_METRICS = ['non_nulls', 'nulls', 'valids', 'invalids', 'zeros', 'negatives', 'positives', 'zero_length',
+                    'trues', 'falses']
+# the default memory limit of the local engine in megabytes, and the estimated size of a cell to pull
+DEFAULT_LOCAL_MEMORY_LIMIT = 1024
+ESTIMATED_BYTES_PER_CELL = 16
 
 
 class ProfileSubject:
-    def __init__(self, table: str, schema: str = None, database: str = None, name: str = None, ref_id: str = None):
+    def __init__(self, table: str, schema: str = None, database: str = None, name: str = None, ref_id: str = None,
+                 checksum: str = None):
         self.table = table
         self.schema = schema
         self.database = database
         self.name = name if name else table
         self.ref_id = ref_id
+        # the checksum of the dbt node
+        self.checksum = checksum
 
 
 def dtof(value: Union[int, float, decimal.Decimal]) -> Union[int, float]:
@@ -48,6 +88,13 @@ def dtof(value: Union[int, float, decimal.Decimal]) -> Union[int, float]:
     return value
 
 
+def percentile_key(percentile: float) -> str:
+    """
+    The key of the quantile in the result, e.g. p5 or p99.9
+    """
+    return f"p{percentile:g}"
+
+
 def format_float(val: Union[int, float]) -> str:
     """
     from the float to human-readable format.
@@ -86,8 +133,30 @@ def percentage(number, total):
     return number / total
 
 
+class BoundedThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    A thread pool with a bounded work queue. The coroutines wait for a free slot before submitting the work, so that
+    the columns of the concurrently profiled tables are interleaved instead of queued table by table.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        super().__init__(max_workers=max_workers)
+        self.queue_size = queue_size
+        self._slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+    def slots(self) -> asyncio.Semaphore:
+        # the semaphore is bound to the event loop, and each profiler stage runs in its own event loop
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.queue_size))
+        return self._slots[1]
+
+
 async def _run_in_executor(executor, func, *args):
-    if executor:
+    if isinstance(executor, BoundedThreadPoolExecutor):
+        async with executor.slots():
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    elif executor:
         return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
     else:
         return func(*args)
@@ -101,6 +170,63 @@ class CollectedMetadata:
     subjects: List[ProfileSubject]
 
 
+def _qualified_name(subject: ProfileSubject) -> str:
+    """
+    The name of the subject qualified by the schema, the tables of the same name in different schemas are distinct.
+    """
+    return f'{subject.schema}.{subject.name}' if subject.schema else subject.name
+
+
+def _critical_path(timings: Dict[str, Tuple[int, int]]) -> List[dict]:
+    """
+    Find the chain of tables which determines the total elapsed time. It starts from the last finished table, and
+    walks back to the table whose end released the slot for it.
+
+    :param timings: the start and end time in milliseconds of each table
+    :return: the critical path from the first table
+    """
+    if not timings:
+        return []
+
+    path = []
+    name = max(timings, key=lambda x: timings[x][1])
+    visited = set()
+    while name is not None and name not in visited:
+        visited.add(name)
+        start, end = timings[name]
+        path.append(dict(name=name, start_milli=start, end_milli=end))
+        predecessors = [x for x in timings if x not in visited and timings[x][1] <= start]
+        name = max(predecessors, key=lambda x: timings[x][1]) if predecessors and start > 0 else None
+    return list(reversed(path))
+
+
+def _use_catalog_stats(catalog_stats: Optional[dict], config: Optional[Configuration],
+                       cache: Optional[ProfileCache]) -> bool:
+    """
+    Whether the statistics of dbt catalog.json are used instead of querying the warehouse.
+    """
+    if not catalog_stats or catalog_stats.get('row_count') is None:
+        return False
+    # the fingerprint of the incremental profiling and the profile cache needs the last altered time
+    if cache is not None:
+        return False
+    if config and config.profiler_config.get('incremental', False):
+        return False
+    return True
+
+
+def _get_file_source(data_source: DataSource) -> Optional[Tuple[str, str]]:
+    """
+    The format and the path of the data source if it is a local CSV or Parquet file.
+    """
+    if data_source.type_name not in ['csv', 'parquet']:
+        return None
+    path = data_source.credential.get('path')
+    if not path or not os.path.exists(path):
+        return None
+    return data_source.type_name, os.path.abspath(path)
+
+
 def transform_as_run(profiled_tables) -> Dict:
     from collections import Counter
 
@@ -137,19 +263,43 @@ class Profiler:
     def __init__(
         self,
         data_source: DataSource,
-        event_handler: ProfilerEventHandler = DefaultProfilerEventHandler(),
-        config: Configuration = None
+        event_handler: ProfilerEventHandler = None,
+        config: Configuration = None,
+        previous_run: dict = None,
+        cache: ProfileCache = None,
+        dbt_catalog: dict = None,
+        on_table_profiled: Callable[[str, dict], dict] = None
     ):
         self.data_source = data_source
-        self.event_handler = event_handler
+        self.event_handler = event_handler if event_handler is not None else DefaultProfilerEventHandler()
         self.config = config
+        self.cache = cache
+        # the fresh catalog.json of dbt to build the tables without reflecting them from the warehouse
+        self.dbt_catalog = dbt_catalog
+        # called with the name and the result of each table when it is profiled, and the result is replaced by the
+        # returned one, e.g. to write the table to run.json and only keep its summary
+        self.on_table_profiled = on_table_profiled
+        self.catalog_stats: Dict[str, dict] = {}
         self.collected_metadata: Optional[CollectedMetadata] = None
+        self.previous_run_id = previous_run.get('id') if previous_run else None
+        self.previous_tables = {}
+        if previous_run:
+            for t in previous_run.get('tables', {}).values():
+                if t:
+                    self.previous_tables[t.get('ref_id') or t.get('name')] = t
         if self.data_source.threads > 1:
-            self.executor = ThreadPoolExecutor(max_workers=self.data_source.threads)
+            threads = self.data_source.threads
+            self.executor = BoundedThreadPoolExecutor(max_workers=threads,
+                                                      queue_size=threads * WORK_QUEUE_SIZE_PER_THREAD)
         else:
             self.executor = None
 
     async def _fetch_metadata(self, subjects):
+        """
+        Reflect the tables of the subjects. The tables in the same schema are reflected in bulk. For the dialects
+        reflecting table by table, they are split into one chunk per thread to keep the threads busy, and the chunks
+        share one inspector, so the columns of the schema cached by the inspector are only queried once.
+        """
         futures = []
         map_name_tables = dict()
         total = len(subjects)
@@ -157,27 +307,41 @@ class Profiler:
 
         self.event_handler.handle_metadata_start()
         self.event_handler.handle_metadata_progress(total, completed)
-        for subject in subjects:
-            def _fetch_table_task(subject: ProfileSubject):
-                engine = self.data_source.get_engine_by_database(subject.database)
-                schema = subject.schema.lower() if subject.schema is not None else None
-                table = None
-                try:
-                    table = Table(subject.table, MetaData(), autoload_with=engine, schema=schema)
-                except NoSuchTableError:
-                    # ignore the table metadata fetch error
-                    pass
-                except Exception as e:
-                    capture_exception(e)
-                return subject, table
 
-            future = _run_in_executor(self.executor, _fetch_table_task, subject)
-            futures.append(future)
+        groups: Dict[tuple, List[ProfileSubject]] = {}
+        for subject in subjects:
+            schema = subject.schema.lower() if subject.schema is not None else None
+            groups.setdefault((subject.database, schema), []).append(subject)
+
+        inspectors = {}
+        inspectors_lock = threading.Lock()
+
+        def _get_inspector(database: str, schema: str):
+            with inspectors_lock:
+                if (database, schema) not in inspectors:
+                    inspectors[(database, schema)] = inspect(self.data_source.get_engine_by_database(database))
+                return inspectors[(database, schema)]
+
+        def _fetch_tables_task(database: str, schema: str, chunk: List[ProfileSubject]):
+            engine = self.data_source.get_engine_by_database(database)
+            tables = reflect_tables(engine, schema, list(dict.fromkeys(subject.table for subject in chunk)),
+                                    inspector=_get_inspector(database, schema))
+            return [(subject, tables.get(subject.table)) for subject in chunk]
+
+        threads = max(self.data_source.threads, 1)
+        for (database, schema), group in groups.items():
+            chunk_size = math.ceil(len(group) / threads)
+            if is_bulk_reflection(self.data_source.get_engine_by_database(database)):
+                chunk_size = len(group)
+            for i in range(0, len(group), chunk_size):
+                future = _run_in_executor(self.executor, _fetch_tables_task, database, schema,
+                                          group[i:i + chunk_size])
+                futures.append(future)
 
         for future in asyncio.as_completed(futures):
-            subject, table = await future
-            map_name_tables[subject.ref_id] = table
-            completed += 1
+            for subject, table in await future:
+                map_name_tables[subject.ref_id] = table
+                completed += 1
             self.event_handler.handle_metadata_progress(total, completed)
         self.event_handler.handle_metadata_end()
 
@@ -216,23 +380,200 @@ class Profiler:
             self.event_handler.handle_run_start(result)
             self.event_handler.handle_run_progress(result, table_count, table_index)
 
+            table_stats = await self._prefetch_table_stats(
+                [subject for subject in subjects if map_name_tables.get(subject.ref_id) is not None])
+
+            table_profilers = []
             for subject in subjects:
-                name = subject.name
                 table = map_name_tables.get(subject.ref_id)
                 if table is None:
                     continue
                 engine = self.data_source.get_engine_by_database(subject.database)
-                table_profiler = TableProfiler(engine, self.executor, subject, table, self.event_handler, self.config)
-                tresult = await table_profiler.profile()
-                profiled_tables[name] = tresult
+                table_profilers.append(TableProfiler(engine, self.executor, subject, table, self.event_handler,
+                                                     self.config, cache=self.cache,
+                                                     datasource_name=self.data_source.name,
+                                                     file_source=_get_file_source(self.data_source),
+                                                     previous=self.previous_tables.get(subject.ref_id or subject.name),
+                                                     catalog_stats=self.catalog_stats.get(subject.ref_id),
+                                                     table_stats=table_stats.get(subject.ref_id)))
+
+            # the tables are profiled concurrently up to the cap, and share the work queue of the executor
+            concurrency = self._get_concurrent_tables()
+            semaphore = asyncio.Semaphore(concurrency)
+            schedule = None
+            if concurrency > 1 and len(table_profilers) > 1:
+                # longest processing time first, so that the large tables don't start last
+                schedule = await self._estimate_costs(table_profilers)
+                estimates = schedule['estimates']
+                table_profilers.sort(key=lambda x: estimates[_qualified_name(x.subject)]['cost'], reverse=True)
+                schedule['concurrency'] = concurrency
+                schedule['order'] = [_qualified_name(x.subject) for x in table_profilers]
+
+            timings = {}
+            run_start = time.perf_counter()
+
+            async def _profile_subject(table_profiler: TableProfiler):
+                subject = table_profiler.subject
+                async with semaphore:
+                    start = time.perf_counter()
+                    tresult = None
+                    if self._is_incremental():
+                        previous = self.previous_tables.get(subject.ref_id or subject.name)
+                        tresult = await table_profiler.reuse(previous, self.previous_run_id)
+                    if tresult is None:
+                        tresult = await table_profiler.profile()
+                    end = time.perf_counter()
+                    timings[_qualified_name(subject)] = (int((start - run_start) * 1000),
+                                                         int((end - run_start) * 1000))
+                    if self.on_table_profiled is not None:
+                        tresult = self.on_table_profiled(subject.name, tresult)
+                    return _qualified_name(subject), tresult
+
+            # the semaphore is fair, so the tables start in the order of the tasks
+            futures = [asyncio.create_task(_profile_subject(table_profiler)) for table_profiler in table_profilers]
+
+            for future in asyncio.as_completed(futures):
+                await future
                 table_index = table_index + 1
                 self.event_handler.handle_run_progress(result, table_count, table_index)
+
+            # keep the results in the order of the subjects
+            names = {}
+            for future in futures:
+                name, tresult = future.result()
+                names[name] = tresult
+            for subject in subjects:
+                if _qualified_name(subject) in names:
+                    profiled_tables[subject.name] = names[_qualified_name(subject)]
+
+            if schedule is not None:
+                schedule['critical_path'] = _critical_path(timings)
+                schedule['makespan_milli'] = max([end for _, end in timings.values()], default=0)
+                result['schedule'] = schedule
             self.event_handler.handle_run_end(result)
         else:
             print("No models, seeds, sources to profile")
 
         return result
 
+    async def _prefetch_table_stats(self, subjects: List[ProfileSubject]) -> Dict[str, dict]:
+        """
+        Query the row count, size, created and last altered time of the tables by one query per schema, instead of
+        one query per table in the table profilers.
+
+        :return: the statistics by the ref_id of the subjects. The subjects absent are queried by the table profilers.
+        """
+        approximate = self.config.profiler_config.get('approximate', False) if self.config else False
+        groups: Dict[tuple, List[ProfileSubject]] = {}
+        for subject in subjects:
+            # the same predicate as the table profilers, the tables not using the catalog are prefetched
+            if _use_catalog_stats(self.catalog_stats.get(subject.ref_id), self.config, self.cache):
+                continue
+            schema = subject.schema.lower() if subject.schema is not None else None
+            groups.setdefault((subject.database, schema), []).append(subject)
+
+        def _query_table_stats_task(database: str, schema: str, group: List[ProfileSubject]):
+            engine = self.data_source.get_engine_by_database(database)
+            try:
+                stats = query_table_stats(engine, schema, list(dict.fromkeys(subject.table for subject in group)),
+                                          approximate=approximate)
+            except Exception as e:
+                # fallback to query the tables one by one
+                capture_exception(e)
+                stats = {}
+            return {subject.ref_id: stats[subject.table] for subject in group if subject.table in stats}
+
+        table_stats = {}
+        futures = [_run_in_executor(self.executor, _query_table_stats_task, database, schema, group)
+                   for (database, schema), group in groups.items()]
+        for stats in await asyncio.gather(*futures):
+            table_stats.update(stats)
+        return table_stats
+
+    async def _estimate_costs(self, table_profilers: List["TableProfiler"]) -> dict:
+        """
+        Estimate the profiling cost of each table. The elapsed time of the previous run is preferred. Otherwise, the
+        cost is estimated by the number of cells (rows x columns) from the table metadata, and scaled to milliseconds by
+        the tables with both of them.
+        """
+        await asyncio.gather(*[table_profiler.fetch_metadata() for table_profiler in table_profilers])
+
+        previous_elapsed = {}
+        cells = {}
+        for table_profiler in table_profilers:
+            subject = table_profiler.subject
+            previous = self.previous_tables.get(subject.ref_id or subject.name)
+            name = _qualified_name(subject)
+            if previous and previous.get('elapsed_milli') is not None:
+                previous_elapsed[name] = previous.get('elapsed_milli')
+
+            metadata = table_profiler._metadata or {}
+            col_count = max(len(table_profiler.table.columns), 1)
+            if metadata.get('row_count') is not None:
+                cells[name] = metadata.get('row_count') * col_count
+            elif metadata.get('bytes') is not None:
+                cells[name] = metadata.get('bytes')
+
+        # milliseconds per cell
+        scaled = [name for name in previous_elapsed if cells.get(name)]
+        ratio = None
+        if scaled:
+            ratio = sum([previous_elapsed[name] for name in scaled]) / sum([cells[name] for name in scaled])
+        if not previous_elapsed:
+            cost_unit = 'cells'
+        elif ratio is not None or len(previous_elapsed) == len(table_profilers):
+            cost_unit = 'milli'
+        else:
+            # not comparable, fallback to the cells
+            previous_elapsed = {}
+            cost_unit = 'cells'
+
+        estimates = {}
+        for table_profiler in table_profilers:
+            name = _qualified_name(table_profiler.subject)
+            if name in previous_elapsed:
+                estimates[name] = dict(cost=previous_elapsed[name], source='previous_run')
+            elif name in cells:
+                cost = cells[name] * ratio if cost_unit == 'milli' else cells[name]
+                estimates[name] = dict(cost=cost, source='metadata')
+            else:
+                estimates[name] = dict(cost=0, source='unknown')
+        return dict(cost_unit=cost_unit, estimates=estimates)
+
+    def _get_concurrent_tables(self) -> int:
+        if not self.config or not self.executor:
+            return 1
+        return max(self.config.profiler_config.get('concurrentTables', 1), 1)
+
+    def _is_incremental(self) -> bool:
+        if not self.config:
+            return False
+        return self.config.profiler_config.get('incremental', False)
+
+    def _get_catalog_tables(self, subjects: List[ProfileSubject]) -> Dict[str, Table]:
+        """
+        Build the tables of the subjects from dbt catalog.json, and keep their row count and size. The subjects not in
+        the catalog or with unrecognized column types are left for the reflection.
+        """
+        tables = {}
+        if not self.dbt_catalog:
+            return tables
+
+        for subject in subjects:
+            if not subject.ref_id:
+                continue
+            node = (self.dbt_catalog.get('nodes') or {}).get(subject.ref_id) or \
+                (self.dbt_catalog.get('sources') or {}).get(subject.ref_id)
+            if not node:
+                continue
+            engine = self.data_source.get_engine_by_database(subject.database)
+            schema = subject.schema.lower() if subject.schema is not None else None
+            table = build_table_from_catalog(engine.dialect, schema, subject.table, node)
+            if table is not None:
+                tables[subject.ref_id] = table
+                self.catalog_stats[subject.ref_id] = get_catalog_stats(node)
+        return tables
+
     async def _collect_metadata(self, subjects: List[ProfileSubject], metadata_subjects: List[ProfileSubject]):
         profiled_tables = {}
         if subjects is None:
@@ -242,8 +583,11 @@ class Profiler:
                 subject = ProfileSubject(table_name)
                 subjects.append(subject)
 
-        # Fetch schema data
-        map_name_tables = await self._fetch_metadata(metadata_subjects if metadata_subjects else subjects)
+        # Fetch schema data, the tables in the dbt catalog are not reflected from the warehouse
+        targets = metadata_subjects if metadata_subjects else subjects
+        map_name_tables = self._get_catalog_tables(targets)
+        map_name_tables.update(
+            await self._fetch_metadata([subject for subject in targets if subject.ref_id not in map_name_tables]))
 
         if metadata_subjects is None:
             # for compatible with non-dbt cases, we use subjects as the metadata_subjects
@@ -338,7 +682,13 @@ class TableProfiler:
         subject: ProfileSubject,
         table: Table,
         event_handler: ProfilerEventHandler,
-        config: Configuration
+        config: Configuration,
+        cache: ProfileCache = None,
+        datasource_name: str = None,
+        file_source: Tuple[str, str] = None,
+        previous: dict = None,
+        catalog_stats: dict = None,
+        table_stats: dict = None
     ):
         self.engine = engine
         self.executor = executor
@@ -346,11 +696,34 @@ class TableProfiler:
         self.table = table
         self.event_handler = event_handler
         self.config = config
+        self.cache = cache
+        self.datasource_name = datasource_name
+        # the format and the path of the local file to profile by the columnar engine
+        self.file_source = file_source
+        # the result of the table in the previous run
+        self.previous = previous
+        # the row count and size of the table in dbt catalog.json
+        self.catalog_stats = catalog_stats
+        # the statistics of the table prefetched with the other tables in the same schema
+        self.table_stats = table_stats
+        # the table metadata queried before profiling, e.g. to check the fingerprint
+        self._metadata: Optional[dict] = None
+        # the shared sample of all columns if the sampling is enabled
+        self.sample: Optional[FromClause] = None
+        # the engine to profile the columns, it is different from the engine of the table if the sample is
+        # materialized locally
+        self.profile_engine = engine
+
+    def _get_sampled_table(self) -> FromClause:
+        return self.sample if self.sample is not None else self.table
 
     def _get_candidate_columns(self) -> Tuple[Selectable, ColumnClause]:
         table = self.table
-        if self.engine.url.get_backend_name() == 'bigquery':
+        if self.profile_engine.url.get_backend_name() == 'bigquery':
             yield from self._get_candidate_columns_bigquery()
+        elif self.sample is not None:
+            for column in table.columns:
+                yield self.sample, self.sample.c[column.name]
         else:
             for column in table.columns:
                 yield table, column
@@ -371,7 +744,7 @@ class TableProfiler:
         cte_map[None] = select(
             text('*')
         ).select_from(
-            table
+            self._get_sampled_table()
         ).cte('t_')
 
         for column in table.columns:
@@ -417,66 +790,93 @@ class TableProfiler:
             else:
                 yield selectable, literal_column(f"`{selectable.name}`.`{name}`", column.type).label(column.name)
 
+    def _use_catalog_stats(self) -> bool:
+        return _use_catalog_stats(self.catalog_stats, self.config, self.cache)
+
+    def _query_table_metadata(self, conn: Connection) -> tuple:
+        """
+        Query the row count, created and last altered time and the size of the table by the metadata of the backend.
+
+        :return: the tuple of row_count, created, last_altered and size_bytes, None if unknown
+        """
+        table = self.table
+        row_count = created = last_altered = size_bytes = None
+        if self.engine.url.get_backend_name() == 'snowflake':
+            inspector = inspect(self.engine) if self.engine else None
+            default_schema = inspector.default_schema_name
+            metadata_table = table_clause('TABLES', column_clause("row_count"), column_clause("created"),
+                                          column_clause("last_altered"), column_clause("bytes"),
+                                          column_clause('table_schema'), column_clause('table_name'),
+                                          schema='INFORMATION_SCHEMA')
+            metadata_columns = {column.name: column for column in metadata_table.columns}
+            stmt = select(
+                metadata_columns['row_count'],
+                func.convert_timezone('UTC', metadata_columns['created']),
+                func.convert_timezone('UTC', metadata_columns['last_altered']),
+                metadata_columns['bytes']
+            ).select_from(metadata_table).where(metadata_columns['table_schema'] == str.upper(default_schema),
+                                                metadata_columns['table_name'] == str.upper(table.name))
+            row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
+            # datetime object transformation
+            created = created.isoformat()
+            last_altered = last_altered.isoformat()
+        elif self.engine.url.get_backend_name() == 'bigquery':
+            dataset = self.engine.url.database
+            metadata_table = table_clause(f'{dataset}.__TABLES__', column_clause("row_count"),
+                                          column_clause("creation_time"), column_clause("last_modified_time"),
+                                          column_clause("size_bytes"), column_clause('table_id'))
+            metadata_columns = {column.name: column for column in metadata_table.columns}
+            stmt = select(
+                metadata_columns['row_count'],
+                metadata_columns['creation_time'],
+                metadata_columns['last_modified_time'],
+                metadata_columns['size_bytes']
+            ).select_from(metadata_table).where(metadata_columns['table_id'] == table.name)
+            row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
+            # timestamp transformation
+            created = datetime.fromtimestamp(created / 1000.0, timezone.utc).isoformat()
+            last_altered = datetime.fromtimestamp(last_altered / 1000.0, timezone.utc).isoformat()
+        elif self.engine.url.get_backend_name() == 'redshift':
+            metadata_table = table_clause('SVV_TABLE_INFO', column_clause("tbl_rows"),
+                                          column_clause("size"), column_clause("table"))
+            metadata_columns = {column.name: column for column in metadata_table.columns}
+            stmt = select(
+                metadata_columns['tbl_rows'],
+                metadata_columns['size'],
+            ).select_from(metadata_table).where(metadata_columns['table'] == table.name)
+            row_count, size_mbytes = conn.execute(stmt).fetchone()
+            row_count = int(row_count)
+            size_bytes = size_mbytes * 1024
+        return row_count, created, last_altered, size_bytes
+
     def _profile_table_metadata(self, result: dict):
         table = self.table
         row_count = created = last_altered = size_bytes = None
-        with self.engine.connect() as conn:
-            try:
-                if self.engine.url.get_backend_name() == 'snowflake':
-                    inspector = inspect(self.engine) if self.engine else None
-                    default_schema = inspector.default_schema_name
-                    metadata_table = table_clause('TABLES', column_clause("row_count"), column_clause("created"),
-                                                  column_clause("last_altered"), column_clause("bytes"),
-                                                  column_clause('table_schema'), column_clause('table_name'),
-                                                  schema='INFORMATION_SCHEMA')
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['row_count'],
-                        func.convert_timezone('UTC', metadata_columns['created']),
-                        func.convert_timezone('UTC', metadata_columns['last_altered']),
-                        metadata_columns['bytes']
-                    ).select_from(metadata_table).where(metadata_columns['table_schema'] == str.upper(default_schema),
-                                                        metadata_columns['table_name'] == str.upper(table.name))
-                    row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
-                    # datetime object transformation
-                    created = created.isoformat()
-                    last_altered = last_altered.isoformat()
-                elif self.engine.url.get_backend_name() == 'bigquery':
-                    dataset = self.engine.url.database
-                    metadata_table = table_clause(f'{dataset}.__TABLES__', column_clause("row_count"),
-                                                  column_clause("creation_time"), column_clause("last_modified_time"),
-                                                  column_clause("size_bytes"), column_clause('table_id'))
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['row_count'],
-                        metadata_columns['creation_time'],
-                        metadata_columns['last_modified_time'],
-                        metadata_columns['size_bytes']
-                    ).select_from(metadata_table).where(metadata_columns['table_id'] == table.name)
-                    row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
-                    # timestamp transformation
-                    created = datetime.fromtimestamp(created / 1000.0, timezone.utc).isoformat()
-                    last_altered = datetime.fromtimestamp(last_altered / 1000.0, timezone.utc).isoformat()
-                elif self.engine.url.get_backend_name() == 'redshift':
-                    metadata_table = table_clause('SVV_TABLE_INFO', column_clause("tbl_rows"),
-                                                  column_clause("size"), column_clause("table"))
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['tbl_rows'],
-                        metadata_columns['size'],
-                    ).select_from(metadata_table).where(metadata_columns['table'] == table.name)
-                    row_count, size_mbytes = conn.execute(stmt).fetchone()
-                    row_count = int(row_count)
-                    size_bytes = size_mbytes * 1024
-            except Exception:
-                # table's metadata is optional except row_count
-                pass
-            finally:
-                if row_count is None:
-                    stmt = select(
-                        func.count(),
-                    ).select_from(table)
-                    row_count, = conn.execute(stmt).fetchone()
+        # the prefetched statistics don't need a connection
+        if self._use_catalog_stats():
+            row_count = self.catalog_stats['row_count']
+            size_bytes = self.catalog_stats.get('bytes')
+        elif self.table_stats is not None:
+            row_count = self.table_stats.get('row_count')
+            created = self.table_stats.get('created')
+            last_altered = self.table_stats.get('last_altered')
+            size_bytes = self.table_stats.get('bytes')
+            if row_count is not None and self.table_stats.get('approximate'):
+                result['approximates'] = dict(row_count=self.table_stats['approximate'])
+        elif self.engine.url.get_backend_name() in ['snowflake', 'bigquery', 'redshift']:
+            with self.engine.connect() as conn:
+                try:
+                    row_count, created, last_altered, size_bytes = self._query_table_metadata(conn)
+                except Exception:
+                    # table's metadata is optional except row_count
+                    pass
+
+        if row_count is None:
+            with self.engine.connect() as conn:
+                stmt = select(
+                    func.count(),
+                ).select_from(table)
+                row_count, = conn.execute(stmt).fetchone()
 
         result['row_count'] = result['samples'] = row_count
         result['samples_p'] = 1
@@ -487,6 +887,15 @@ class TableProfiler:
                 result['samples'] = limit
                 result['samples_p'] = percentage(limit, row_count)
 
+            # the estimation before profiling, it would be updated by the actual sample size
+            sampling = SamplingConfig.from_profiler_config(self.config.profiler_config)
+            if sampling is not None:
+                samples = estimate_sample_size(sampling, row_count)
+                if limit > 0:
+                    samples = min(samples, limit)
+                result['samples'] = samples
+                result['samples_p'] = percentage(samples, row_count)
+
         if created:
             result['created'] = created
         if last_altered:
@@ -497,63 +906,178 @@ class TableProfiler:
             result['bytes'] = size_bytes
 
     def _profile_table_duplicate_rows(self, result: dict):
-        table = self.table
         if not self.config:
             return
         if not self.config.profiler_config.get('table', {}).get('duplicateRows'):
             return
 
         limit = self.config.profiler_config.get('table', {}).get('limit', 0)
-        columns = [column.label(f'_{column.name}') for column in table.columns]
+        duplicate_rows = count_duplicate_rows(self.profile_engine, self._get_sampled_table(), limit)
 
-        with self.engine.connect() as conn:
-            if self.engine.url.get_backend_name() == 'snowflake':
-                if limit <= 0:
-                    cte = select(func.hash(*columns).label('h')).select_from(table).cte()
-                else:
-                    cte = select(func.hash(*columns).label('h')).select_from(table).limit(limit).cte()
-
-                cte = select(
-                    cte.c.h,
-                    func.count().label('c')
-                ).select_from(cte).group_by(cte.c.h).having(func.count() > 1).cte()
-                stmt = select(func.sum(cte.c.c)).select_from(cte)
-                duplicate_rows, = conn.execute(stmt).fetchone()
-            else:
-                if limit <= 0:
-                    cte = select(
-                        *columns,
-                        func.count().label('c')
-                    ).select_from(table).group_by(*columns).having(func.count() > 1).cte()
-                else:
-                    cte = select(*columns).select_from(table).limit(limit).cte()
-                    columns = [column for column in cte.columns]
-                    cte = select(
-                        *columns,
-                        func.count().label('c')
-                    ).select_from(cte).group_by(*columns).having(func.count() > 1).cte()
+        samples = result['samples']
+        result['duplicate_rows'] = duplicate_rows
+        result['duplicate_rows_p'] = percentage(duplicate_rows, samples)
 
-                stmt = select(func.sum(cte.c.c)).select_from(cte)
-                duplicate_rows, = conn.execute(stmt).fetchone()
+    async def _profile_table(self, result):
+        if self._metadata is not None:
+            result.update(self._metadata)
+        else:
+            await _run_in_executor(self.executor, self._profile_table_metadata, result)
+        await _run_in_executor(self.executor, self._profile_table_duplicate_rows, result)
 
-            samples = result['samples']
-            duplicate_rows = duplicate_rows if duplicate_rows is not None else 0
+    async def fetch_metadata(self) -> dict:
+        """
+        Query the table metadata before profiling, and keep it for the following profiling.
+        """
+        if self._metadata is None:
+            metadata = {}
+            await _run_in_executor(self.executor, self._profile_table_metadata, metadata)
+            self._metadata = metadata
+        return self._metadata
 
-            result['duplicate_rows'] = duplicate_rows
-            result['duplicate_rows_p'] = percentage(duplicate_rows, samples)
+    def _get_fingerprint(self, metadata: dict) -> Optional[str]:
+        """
+        The fingerprint identifies the state of the table. It consists of the table metadata, the dbt node checksum,
+        the column schema and the profiler configuration.
 
-    async def _profile_table(self, result):
-        await _run_in_executor(self.executor, self._profile_table_metadata, result)
-        await _run_in_executor(self.executor, self._profile_table_duplicate_rows, result)
+        The fingerprint is only available when the data source provides the last altered time of the table,
+        otherwise the unchanged row count doesn't imply the unchanged data.
+
+        :param metadata: the table metadata queried by _profile_table_metadata
+        :return: the fingerprint or None if not available
+        """
+        from piperider_cli.profiler.version import schema_version
+
+        if not metadata.get('last_altered'):
+            return None
+
+        profiler_config = self.config.profiler_config if self.config else {}
+        payload = dict(
+            row_count=metadata.get('row_count'),
+            bytes=metadata.get('bytes'),
+            last_altered=metadata.get('last_altered'),
+            checksum=self.subject.checksum,
+            columns=[[column.name, str(column.type)] for column in self.table.columns],
+            profiler={k: v for k, v in profiler_config.items() if k != 'incremental'},
+            schema_version=schema_version(),
+        )
+        m = hashlib.sha256()
+        m.update(json.dumps(payload, sort_keys=True, default=str).encode())
+        return m.hexdigest()
+
+    async def reuse(self, previous: Optional[dict], previous_run_id: str) -> Optional[dict]:
+        """
+        Reuse the profiling result of the previous run if the table fingerprint is unchanged.
+
+        :param previous: the table result of the previous run
+        :param previous_run_id: the id of the previous run
+        :return: the reused table result, or None if the table should be profiled
+        """
+        if not previous or not previous.get('fingerprint'):
+            return None
+
+        metadata = await self.fetch_metadata()
+        if self._get_fingerprint(metadata) != previous.get('fingerprint'):
+            return None
+
+        name = self.subject.name
+        self.event_handler.handle_table_start(name)
+        result = copy.deepcopy(previous)
+        result.update(metadata)
+        result['name'] = name
+        result['reused_from'] = previous.get('reused_from', previous_run_id)
+        self.event_handler.handle_table_end(name, result)
+        return result
+
+    def _get_cache_key(self, column_result: dict, fingerprint: Optional[str]) -> Optional[str]:
+        if self.cache is None or fingerprint is None:
+            return None
 
-    async def _profile_column(self, result, table_name, table: Table, column: Column) -> dict:
+        subject = self.subject
+        table = '.'.join([x for x in [subject.database, subject.schema, subject.table] if x])
+        profiler_config = self.config.profiler_config if self.config else {}
+        return ProfileCache.make_key(self.datasource_name, table, column_result['name'], column_result['schema_type'],
+                                     profiler_config, fingerprint)
+
+    def _is_fused_profiling(self) -> bool:
+        if not self.config:
+            return False
+        return self.config.profiler_config.get('fused', False)
+
+    def _profile_fused_aggregates(self, candidates: List[Tuple[Selectable, ColumnClause, "BaseColumnProfiler"]]) \
+        -> Dict[str, tuple]:
+        """
+        Query the base aggregates of all columns with one wide query per selectable, instead of one query per
+        column. The column profilers only run the follow-up queries (e.g. topk, histogram) with the prefetched result.
+
+        :param candidates: the list of (selectable, column, column profiler)
+        :return: the map of column name to the base aggregates
+        """
+        groups = {}
+        for selectable, column, profiler in candidates:
+            _, group = groups.setdefault(id(selectable), (selectable, []))
+            group.append((column, profiler))
+
+        aggregates = {}
+        for selectable, group in groups.values():
+            for i in range(0, len(group), FUSED_MAX_COLUMNS):
+                batch = group[i:i + FUSED_MAX_COLUMNS]
+                try:
+                    aggregates.update(self._query_fused_aggregates(selectable, batch))
+                except Exception as e:
+                    # fallback to query the base aggregates column by column
+                    capture_exception(e)
+        return aggregates
+
+    def _query_fused_aggregates(self, selectable: Selectable, batch: List[Tuple[ColumnClause, "BaseColumnProfiler"]]) \
+        -> Dict[str, tuple]:
+        limit = self.config.profiler_config.get('table', {}).get('limit', 0) if self.config else 0
+        refs = {column.name: column for column, _ in batch}
+        if limit > 0:
+            selectable = select(*refs.values()).select_from(selectable).limit(limit).cte()
+            refs = {name: selectable.c[name] for name in refs.keys()}
+
+        # with t as (
+        #   select <projections of column 0>, <projections of column 1>, ... from table
+        # )
+        # select <aggregates of column 0>, <aggregates of column 1>, ... from t
+        projections = []
+        for i, (column, profiler) in enumerate(batch):
+            for name, expr in profiler._get_column_projections(refs[column.name]).items():
+                projections.append(expr.label(f'_{i}_{name}'))
+        cte = select(*projections).select_from(selectable).cte()
+
+        selects = []
+        spans = []
+        for i, (column, profiler) in enumerate(batch):
+            names = profiler._get_column_projections(refs[column.name]).keys()
+            c = SimpleNamespace(**{name: cte.c[f'_{i}_{name}'] for name in names})
+            column_aggregates = profiler._get_aggregates(c)
+            spans.append((column.name, len(selects), len(column_aggregates)))
+            selects += [expr.label(f'_{i}_agg_{j}') for j, expr in enumerate(column_aggregates)]
+
+        with self.profile_engine.connect() as conn:
+            row = conn.execute(select(*selects)).fetchone()
+
+        return {name: tuple(row[start:start + n]) for name, start, n in spans}
+
+    async def _profile_column(self, result, table_name, column: Column, column_result: dict,
+                              profiler: "BaseColumnProfiler", aggregates: tuple = None, cache_key: str = None,
+                              profiled: dict = None) -> dict:
         column_name = column.name
-        column_result, profiler = await self._create_column_metadata_and_profiler(table, column)
 
         self.event_handler.handle_column_start(table_name, column_name)
 
         profile_start = time.perf_counter()
-        profile_result = await _run_in_executor(self.executor, profiler.profile)
+        if profiled is not None:
+            # the result from the cache or the columnar engine
+            profile_result = profiled
+        else:
+            profile_result = await _run_in_executor(self.executor, profiler.profile, aggregates)
+            if profiler.approximates:
+                profile_result["approximates"] = profiler.approximates
+            if cache_key is not None:
+                self.cache.put(cache_key, profile_result)
         profile_end = time.perf_counter()
         duration = profile_end - profile_start
 
@@ -577,47 +1101,210 @@ class TableProfiler:
             # TEXT
             # CLOB
             generic_type = "string"
-            profiler = StringColumnProfiler(self.engine, profiler_config, table, column)
+            profiler = StringColumnProfiler(self.profile_engine, profiler_config, table, column)
         elif isinstance(column_type, Integer):
             # INTEGER
             # BIGINT
             # SMALLINT
             generic_type = "integer"
-            profiler = NumericColumnProfiler(self.engine, profiler_config, table, column, is_integer=True)
+            profiler = NumericColumnProfiler(self.profile_engine, profiler_config, table, column, is_integer=True)
         elif isinstance(column_type, Numeric):
             # NUMERIC
             # DECIMAL
             # FLOAT
             generic_type = "numeric"
-            profiler = NumericColumnProfiler(self.engine, profiler_config, table, column, is_integer=False)
+            profiler = NumericColumnProfiler(self.profile_engine, profiler_config, table, column, is_integer=False)
         elif isinstance(column_type, Date) or isinstance(column_type, DateTime) or \
-            (self.engine.url.get_backend_name() == 'snowflake' and str(column_type).startswith('TIMESTAMP')):
+            (self.profile_engine.url.get_backend_name() == 'snowflake' and str(column_type).startswith('TIMESTAMP')):
             # DATE
             # DATETIME
             # TIMEZONE_NTZ
             generic_type = "datetime"
-            profiler = DatetimeColumnProfiler(self.engine, profiler_config, table, column)
+            profiler = DatetimeColumnProfiler(self.profile_engine, profiler_config, table, column)
         elif isinstance(column_type, Boolean):
             # BOOLEAN
             generic_type = "boolean"
-            profiler = BooleanColumnProfiler(self.engine, profiler_config, table, column)
+            profiler = BooleanColumnProfiler(self.profile_engine, profiler_config, table, column)
         elif isinstance(column_type, UUID):
             generic_type = "other"
-            profiler = UUIDColumnProfiler(self.engine, profiler_config, table, column)
+            profiler = UUIDColumnProfiler(self.profile_engine, profiler_config, table, column)
         else:
             generic_type = "other"
-            profiler = BaseColumnProfiler(self.engine, profiler_config, table, column)
+            profiler = BaseColumnProfiler(self.profile_engine, profiler_config, table, column)
         column_result = {
             "name": column.name,
             "type": generic_type,
             "schema_type": schema_type,
         }
+        profiler.histogram_bounds = self._get_histogram_bounds(column_result)
         return column_result, profiler
 
+    def _get_histogram_bounds(self, column_result: dict) -> Optional[tuple]:
+        """
+        The min and max of the column in the previous run. If they are still the same, the histogram is queried in
+        the same scan as the base aggregates. It is enabled by default, and disabled by `prefetchHistogram: false`.
+        """
+        if not self.previous:
+            return None
+        if self.config and not self.config.profiler_config.get('prefetchHistogram', True):
+            return None
+        previous = (self.previous.get('columns') or {}).get(column_result['name'])
+        if not previous or previous.get('schema_type') != column_result['schema_type']:
+            return None
+        if previous.get('type') not in ['integer', 'numeric', 'string', 'datetime'] or not previous.get('histogram'):
+            return None
+        _min, _max = previous.get('min'), previous.get('max')
+        if previous.get('type') == 'datetime':
+            try:
+                return datetime.fromisoformat(_min), datetime.fromisoformat(_max)
+            except (TypeError, ValueError):
+                return None
+        if not isinstance(_min, (int, float)) or not isinstance(_max, (int, float)):
+            return None
+        if not math.isfinite(_min) or not math.isfinite(_max):
+            return None
+        return _min, _max
+
+    def _get_sampling_config(self) -> Optional[SamplingConfig]:
+        if not self.config:
+            return None
+        return SamplingConfig.from_profiler_config(self.config.profiler_config)
+
+    def _update_sample_estimates(self, result: dict):
+        """
+        Update the table samples by the actual sample size, and scale the count metrics of columns up to the whole
+        table with the confidence intervals.
+        """
+        columns = [c for c in result['columns'].values() if c and c.get('samples') is not None]
+        if not columns:
+            return
+
+        row_count = result['row_count']
+        samples = columns[0]['samples']
+        result['samples'] = samples
+        result['samples_p'] = percentage(samples, row_count)
+        if result.get('duplicate_rows') is not None:
+            result['duplicate_rows_p'] = percentage(result['duplicate_rows'], samples)
+
+        for column_result in columns:
+            estimates = {}
+            for metric in SCALABLE_METRICS:
+                if column_result.get(metric) is None:
+                    continue
+                estimate = scale_up(column_result[metric], column_result['samples'], row_count)
+                if estimate is not None:
+                    estimates[metric] = estimate
+            if estimates:
+                column_result['sample_estimates'] = estimates
+
+    def _materialize_sample(self) -> Optional[MaterializedSample]:
+        """
+        Materialize the sample or the limited rows of the table once, so that the column profilers query the
+        materialized table instead of evaluating the sampling for each query.
+        """
+        profiler_config = self.config.profiler_config if self.config else {}
+        method = profiler_config.get('table', {}).get('materialize')
+        limit = profiler_config.get('table', {}).get('limit', 0)
+        memory_limit = None
+        estimated_bytes = None
+        if self._is_local_engine():
+            # pull the whole table (or its sample) into the local engine
+            method = 'duckdb'
+            memory_limit = profiler_config.get('local', {}).get('memoryLimit', DEFAULT_LOCAL_MEMORY_LIMIT)
+            memory_limit = memory_limit * 1024 * 1024
+            estimated_bytes = self._estimate_bytes()
+        elif not method or (self.sample is None and limit <= 0):
+            return None
+
+        try:
+            materialized = materialize_sample(self.engine, self.table, self.sample, limit, method,
+                                              memory_limit=memory_limit, estimated_bytes=estimated_bytes)
+        except Exception as e:
+            # fallback to query the table directly
+            capture_exception(e)
+            return None
+        if materialized is None:
+            return None
+
+        self.sample = materialized.table
+        self.profile_engine = materialized.engine
+        return materialized
+
+    def _is_local_engine(self) -> bool:
+        profiler_config = self.config.profiler_config if self.config else {}
+        if profiler_config.get('engine') != 'local':
+            return False
+        # the duckdb backend is already local
+        return self.engine.url.get_backend_name() != 'duckdb'
+
+    def _estimate_bytes(self) -> Optional[int]:
+        # the size of the rows to pull, by the table size or the number of cells
+        metadata = self._metadata or {}
+        row_count = metadata.get('row_count')
+        samples = metadata.get('samples')
+        if samples is None:
+            return None
+        if metadata.get('bytes') and row_count:
+            return int(metadata['bytes'] * samples / row_count)
+        return samples * len(self.table.columns) * ESTIMATED_BYTES_PER_CELL
+
+    def _is_columnar_engine(self) -> bool:
+        profiler_config = self.config.profiler_config if self.config else {}
+        if profiler_config.get('engine') != 'columnar' or self.file_source is None:
+            return False
+        # the sample is only supported by queries
+        return self.sample is None and self.profile_engine is self.engine
+
+    def _profile_columnar(self, columns: List[Tuple[Column, dict]]) -> Dict[str, dict]:
+        profiler_config = self.config.profiler_config if self.config else {}
+        limit = profiler_config.get('table', {}).get('limit', 0)
+        file_format, path = self.file_source
+        # pyarrow is checked when the configuration is loaded
+        from .columnar import ColumnarProfiler
+        try:
+            profiler = ColumnarProfiler(file_format, path,
+                                        [(column.name, column_result['type'], column.type)
+                                         for column, column_result in columns],
+                                        limit=limit, percentiles=profiler_config.get('percentiles'))
+            return profiler.profile()
+        except Exception as e:
+            # fallback to profile the columns by queries if the file is not readable by Arrow
+            capture_exception(e)
+            return {}
+
+    def _drop_materialized_sample(self, materialized: MaterializedSample):
+        try:
+            materialized.drop()
+        except Exception as e:
+            capture_exception(e)
+
     async def profile(self) -> dict:
         subject = self.subject
         name = subject.name
         self.event_handler.handle_table_start(name)
+        profile_start = time.perf_counter()
+
+        # The sample is shared by all the columns of the table
+        sampling = self._get_sampling_config()
+        sampling_info = None
+        if sampling is not None:
+            metadata = await self.fetch_metadata()
+            self.sample, sampling_info = sample_table(self.engine, self.table, sampling, metadata.get('row_count'))
+
+        if self._is_local_engine():
+            await self.fetch_metadata()
+        materialized = await _run_in_executor(self.executor, self._materialize_sample)
+        try:
+            return await self._profile(profile_start, sampling_info)
+        finally:
+            if materialized is not None:
+                await _run_in_executor(self.executor, self._drop_materialized_sample, materialized)
+                self.sample = None
+                self.profile_engine = self.engine
+
+    async def _profile(self, profile_start: float, sampling_info: Optional[dict]) -> dict:
+        subject = self.subject
+        name = subject.name
         candidate_columns = list(self._get_candidate_columns())
         col_index = 0
         col_count = len(candidate_columns)
@@ -634,19 +1321,61 @@ class TableProfiler:
         }
         if subject.ref_id:
             result['ref_id'] = subject.ref_id
+        if sampling_info is not None:
+            result['sampling'] = sampling_info
         futures = []
-        profile_start = time.perf_counter()
 
         self.event_handler.handle_table_progress(name, result, col_count, col_index)
 
+        # The cache is keyed by the table fingerprint, so the metadata is required before profiling columns
+        fingerprint = None
+        if self.cache is not None:
+            fingerprint = self._get_fingerprint(await self.fetch_metadata())
+
         # Profile table
         future = asyncio.create_task(self._profile_table(result))
         futures.append(future)
 
-        # Profile columns
+        # Prepare column profilers
+        prepared = []
         for selectable, column in candidate_columns:
             columns[column.name] = None
-            future = asyncio.create_task(self._profile_column(result, name, selectable, column))
+            column_result, profiler = await self._create_column_metadata_and_profiler(selectable, column)
+            if self.profile_engine is not self.engine:
+                # the local copy has the generic types, keep the schema type of the source table
+                source_type = self.table.columns[column.name].type
+                if isinstance(source_type, ARRAY) and source_type.item_type is not None:
+                    column_result['schema_type'] = f"ARRAY<{source_type.item_type}>"
+                else:
+                    column_result['schema_type'] = str(source_type)
+            cache_key = self._get_cache_key(column_result, fingerprint)
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            prepared.append((selectable, column, column_result, profiler, cache_key, cached))
+
+        # Profile the columns of the local file in one vectorized pass
+        if self._is_columnar_engine():
+            pending = [(column, column_result) for _, column, column_result, _, _, cached in prepared if cached is None]
+            profiled = await _run_in_executor(self.executor, self._profile_columnar, pending) if pending else {}
+            for i, (selectable, column, column_result, profiler, cache_key, cached) in enumerate(prepared):
+                if column.name not in profiled:
+                    continue
+                if cache_key is not None:
+                    self.cache.put(cache_key, profiled[column.name])
+                prepared[i] = (selectable, column, column_result, profiler, cache_key, profiled[column.name])
+
+        # Query the base aggregates of all columns in one scan
+        aggregates = {}
+        if self._is_fused_profiling():
+            candidates = [(selectable, column, profiler)
+                          for selectable, column, _, profiler, _, cached in prepared if cached is None]
+            if candidates:
+                aggregates = await _run_in_executor(self.executor, self._profile_fused_aggregates, candidates)
+
+        # Profile columns
+        for selectable, column, column_result, profiler, cache_key, cached in prepared:
+            future = asyncio.create_task(
+                self._profile_column(result, name, column, column_result, profiler, aggregates.get(column.name),
+                                     cache_key=cache_key, profiled=cached))
             futures.append(future)
 
         total = len(futures)
@@ -658,10 +1387,17 @@ class TableProfiler:
             completed += 1
             self.event_handler.handle_table_progress(name, result, total, completed)
 
+        if sampling_info is not None:
+            self._update_sample_estimates(result)
+
         for column_result in columns.values():
             column_result['total'] = result['row_count']
             column_result['samples_p'] = result['samples_p']
 
+        fingerprint = self._get_fingerprint(result)
+        if fingerprint:
+            result['fingerprint'] = fingerprint
+
         profile_end = time.perf_counter()
         duration = profile_end - profile_start
         result["profile_duration"] = f"{duration:.2f}"
@@ -709,6 +1445,12 @@ class BaseColumnProfiler:
         self.config = config
         self.table = table
         self.column = column
+        # the approximate metrics and their error bounds
+        self.approximates = {}
+        self._sketches: Optional["ColumnSketches"] = None
+        # the expected min and max of the histogram, and the histogram counts queried with the base aggregates
+        self.histogram_bounds: Optional[tuple] = None
+        self._prefetched_histogram: Optional[tuple] = None
 
     def _get_database_backend(self) -> str:
         """
@@ -717,6 +1459,107 @@ class BaseColumnProfiler:
         """
         return self.engine.url.get_backend_name()
 
+    def _is_approximate(self) -> bool:
+        if not self.config:
+            return False
+        return self.config.get('approximate', False)
+
+    def _count_distinct(self, expr: ColumnClause) -> ColumnClause:
+        """
+        The aggregate expression of the distinct count. In the approximate mode, it uses the native approximate
+        function of the backend, or a null placeholder which is estimated by the client-side sketches later.
+        """
+        if not self._is_approximate():
+            return func.count(distinct(expr))
+
+        backend = self._get_database_backend()
+        if backend in APPROX_COUNT_DISTINCT:
+            fn, _, _ = APPROX_COUNT_DISTINCT[backend]
+            return fn(expr)
+        return null()
+
+    def _use_sketches(self, valids: int) -> bool:
+        """
+        Whether to approximate the metrics by the client-side sketches. The backends with the native approximate
+        functions keep the computation in the data source, and the values of the other remote backends are only
+        streamed if the column is small.
+        """
+        backend = self._get_database_backend()
+        if backend in APPROX_COUNT_DISTINCT:
+            return False
+        return backend in SKETCH_LOCAL_BACKENDS or valids <= SKETCH_MAX_VALUES
+
+    def _get_sketches(self, conn: Connection, cte: CTE) -> "ColumnSketches":
+        """
+        Stream the valid values of the column and feed them to the client-side sketches. The values are only
+        streamed once per column profiler.
+        """
+        if self._sketches is None:
+            sketches = ColumnSketches()
+            stmt = select(cte.c.c).select_from(cte).where(cte.c.c.isnot(None))
+            result = conn.execution_options(stream_results=True).execute(stmt)
+            for rows in result.partitions(SKETCH_STREAM_BATCH_SIZE):
+                for v, in rows:
+                    sketches.add(v)
+            self._sketches = sketches
+        return self._sketches
+
+    def _profile_distinct(self, conn: Connection, cte: CTE, distinct_count: Optional[int], valids: int) -> int:
+        if not self._is_approximate():
+            return distinct_count
+
+        backend = self._get_database_backend()
+        if backend in APPROX_COUNT_DISTINCT:
+            _, method, relative_error = APPROX_COUNT_DISTINCT[backend]
+            self.approximates['distinct'] = dict(method=method, relative_error=relative_error)
+            return distinct_count
+
+        if valids == 0:
+            return 0
+        if not self._use_sketches(valids):
+            # the placeholder of the distinct count is not queried with the base aggregates
+            return conn.execute(select(func.count(distinct(cte.c.c))).select_from(cte)).scalar()
+        sketches = self._get_sketches(conn, cte)
+        if sketches.kmv.is_exact():
+            return sketches.kmv.distinct()
+        self.approximates['distinct'] = dict(method='hyperloglog', relative_error=sketches.hll.relative_error)
+        return min(sketches.hll.count(), valids)
+
+    def _profile_non_duplicate(self, conn: Connection, cte: CTE, column: ColumnClause, valids: int) -> int:
+        if not self._is_approximate() or not self._use_sketches(valids):
+            return profile_non_duplicate(conn, cte, column)
+
+        if valids == 0:
+            return 0
+        kmv = self._get_sketches(conn, cte).kmv
+        if not kmv.is_exact():
+            self.approximates['non_duplicates'] = dict(method='kmv', relative_error=kmv.relative_error)
+        return min(kmv.non_duplicates(), valids)
+
+    def _profile_topk(self, conn: Connection, cte: CTE, expr: ColumnClause, valids: int) -> dict:
+        if not self._is_approximate():
+            return profile_topk(conn, expr)
+
+        backend = self._get_database_backend()
+        if backend in APPROX_TOP_K:
+            method, relative_error = APPROX_TOP_K[backend]
+            self.approximates['topk'] = dict(method=method, relative_error=relative_error)
+            return profile_approx_topk(conn, backend, expr)
+        if not self._use_sketches(valids):
+            return profile_topk(conn, expr)
+
+        space_saving = self._get_sketches(conn, cte).space_saving
+        if space_saving.max_error > 0:
+            self.approximates['topk'] = dict(method='space_saving', relative_error=1 / space_saving.capacity)
+        topk = {
+            "values": [],
+            "counts": [],
+        }
+        for k, v in space_saving.topk(TOPK_NUM):
+            topk["values"].append(k)
+            topk["counts"].append(v)
+        return topk
+
     def _get_limited_table_cte(self):
         t = self.table
         c = self.column
@@ -730,6 +1573,18 @@ class BaseColumnProfiler:
             cte = select(c.label('c')).select_from(t).limit(limit).cte()
             return cte, cte.c.c
 
+    def _get_column_projections(self, c: ColumnClause) -> Dict[str, ColumnClause]:
+        """
+        Get the row-level expressions of the column to profile. Each key is the name of the projected column
+        in the table CTE and each value is an expression over the column "c".
+
+        :param c: the column to project
+        :return: the map of projection name to expression
+        """
+        return {
+            'c': c,
+        }
+
     def _get_table_cte(self) -> CTE:
         """
         Get the CTE to normalize the
@@ -752,23 +1607,110 @@ class BaseColumnProfiler:
         :return: CTE
         """
         t, c = self._get_limited_table_cte()
+        projections = self._get_column_projections(c)
+
+        return select(*[expr.label(name) for name, expr in projections.items()]).select_from(t).cte()
+
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        """
+        Get the aggregate expressions of the base query. The base query is the first query to profile a column,
+        its result would be passed to the following queries of the profiler.
+
+        :param c: the columns of the table CTE. Access the projected columns by attribute, e.g. c.orig
+        :return: the list of aggregate expressions
+        """
+        return [
+            func.count().label("_total"),
+            func.count(c.c).label("_non_nulls"),
+        ]
+
+    def _get_histogram_column(self, c) -> Optional[ColumnClause]:
+        """
+        The projected column of the histogram, or None if the profiler has no numeric histogram.
+
+        :param c: the columns of the table CTE
+        """
+        return None
+
+    def _is_histogram_integer(self) -> bool:
+        return True
+
+    def _query_aggregates(self, conn: Connection, cte: CTE, aggregates: Optional[tuple]) -> tuple:
+        """
+        Query the base aggregates of the column. If the aggregates were already queried by the table profiler
+        (fused profiling), they are returned without querying again.
+        """
+        if aggregates is not None:
+            return tuple(aggregates)
+
+        if self.histogram_bounds is not None and self._get_histogram_column(cte.c) is not None and \
+                self._get_database_backend() in ROLLUP_BACKENDS:
+            try:
+                return self._query_aggregates_with_histogram(conn, cte)
+            except Exception as e:
+                # fallback to query the histogram separately
+                capture_exception(e)
 
-        return select(c.label("c")).select_from(t).cte()
+        stmt = select(*self._get_aggregates(cte.c))
+        return tuple(conn.execute(stmt).fetchone())
 
-    def profile(self) -> dict:
+    def _query_aggregates_with_histogram(self, conn: Connection, cte: CTE) -> tuple:
+        """
+        Query the base aggregates and the histogram by the expected bounds in the same scan.
+
+        # with t as (
+        #   select *, coalesce(<bucket>, -1) as _bucket from cte
+        # )
+        # select _bucket, <base aggregates>, count(<histogram column>) from t group by rollup(_bucket)
+
+        The row of the grand total is the base aggregates, and the other rows are the counts of the buckets.
+        """
+        _min, _max = self.histogram_bounds
+        interval, num_buckets, _, _ = histogram_bins(_min, _max, self._is_histogram_integer())
+        bucket = histogram_bucket(self._get_database_backend(), self._get_histogram_column(cte.c), _min, interval,
+                                  num_buckets)
+        t = select(*cte.c, func.coalesce(bucket, -1).label('_bucket')).select_from(cte).cte()
+
+        stmt = select(
+            t.c._bucket,
+            *self._get_aggregates(t.c),
+            func.count(self._get_histogram_column(t.c)).label('_histogram')
+        ).group_by(func.rollup(t.c._bucket))
+
+        aggregates = None
+        counts = [0] * num_buckets
+        for row in conn.execute(stmt):
+            _bucket = row[0]
+            if _bucket is None:
+                aggregates = tuple(row[1:-1])
+            elif 0 <= _bucket < num_buckets:
+                counts[int(_bucket)] = row[-1]
+        self._prefetched_histogram = ((_min, _max), counts)
+        return aggregates
+
+    def _profile_histogram(self, conn: Connection, cte: CTE, column: ColumnClause, _min, _max) -> dict:
+        if self._prefetched_histogram is not None:
+            bounds, counts = self._prefetched_histogram
+            if bounds == (_min, _max):
+                _, _, labels, bin_edges = histogram_bins(_min, _max, self._is_histogram_integer())
+                return {
+                    "labels": labels,
+                    "counts": counts,
+                    "bin_edges": bin_edges,
+                }
+        return profile_histogram(conn, cte, column, _min, _max, self._is_histogram_integer())
+
+    def profile(self, aggregates: tuple = None) -> dict:
         """
         Profile a column
 
+        :param aggregates: optional, the prefetched result of the base aggregates
         :return: the profiling result. The result dict is json serializable
         """
 
         with self.engine.connect() as conn:
             cte = self._get_table_cte()
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.c).label("_non_nulls"),
-            )
-            result = conn.execute(stmt).fetchone()
+            result = self._query_aggregates(conn, cte, aggregates)
             _total, _non_nulls, = result
             _nulls = _total - _non_nulls
             _valid = _non_nulls
@@ -792,65 +1734,59 @@ class StringColumnProfiler(BaseColumnProfiler):
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
-    def _get_table_cte(self) -> CTE:
-        t, c = self._get_limited_table_cte()
-        if self._get_database_backend() != 'sqlite':
-            cte = select(
-                c.label("c"),
-                c.label("orig")
-            ).select_from(t).cte()
+    def _get_column_projections(self, c: ColumnClause) -> Dict[str, ColumnClause]:
+        if self._get_database_backend() == 'sqlite':
+            valid = case(
+                (func.typeof(c) == 'blob', None),
+                else_=c
+            )
         else:
-            cte = select(
-                case(
-                    (func.typeof(c) == 'blob', None),
-                    else_=c
-                ).label("c"),
-                c.label("orig"),
-            ).select_from(t).cte()
-        cte = select(
-            cte.c.c,
-            func.length(cte.c.c).label("len"),
-            cte.c.orig
-        ).select_from(cte).cte()
-        cte = select(
-            cte.c.c,
-            cte.c.len,
-            case((cte.c.len == 0, 1), else_=None).label("zero_length"),
-            cte.c.orig
-        ).select_from(cte).cte()
-        return cte
-
-    def profile(self):
+            valid = c
+        length = func.length(valid)
+        return {
+            'c': valid,
+            'len': length,
+            'zero_length': case((length == 0, 1), else_=None),
+            'orig': c,
+        }
+
+    def _get_histogram_column(self, c) -> Optional[ColumnClause]:
+        return c.len
+
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        columns = [
+            func.count().label("_total"),
+            func.count(c.orig).label("_non_nulls"),
+            func.count(c.c).label("_valids"),
+            func.count(c.zero_length).label("_zero_length"),
+            self._count_distinct(c.c).label("_distinct"),
+            func.avg(c.len).label("_avg"),
+            func.min(c.len).label("_min"),
+            func.max(c.len).label("_max"),
+        ]
+
+        if self._get_database_backend() == 'sqlite':
+            columns.append((func.count(c.len) * func.sum(
+                func.cast(c.len, Float) * func.cast(c.len, Float)) - func.sum(c.len) * func.sum(
+                c.len)) / ((func.count(c.len) - 1) * func.count(c.len)).label('_variance'))
+        else:
+            columns.append(func.stddev(c.len).label("_stddev"))
+        return columns
+
+    def profile(self, aggregates: tuple = None):
         with self.engine.connect() as conn:
             cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.zero_length).label("_zero_length"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.avg(cte.c.len).label("_avg"),
-                func.min(cte.c.len).label("_min"),
-                func.max(cte.c.len).label("_max"),
-            ]
+            result = self._query_aggregates(conn, cte, aggregates)
 
             if self._get_database_backend() == 'sqlite':
-                columns.append((func.count(cte.c.len) * func.sum(
-                    func.cast(cte.c.len, Float) * func.cast(cte.c.len, Float)) - func.sum(cte.c.len) * func.sum(
-                    cte.c.len)) / ((func.count(cte.c.len) - 1) * func.count(cte.c.len)).label('_variance'))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
                 _total, _non_nulls, _valids, _zero_length, _distinct, _avg, _min, _max, _variance = result
                 _stddev = None
                 if _variance is not None:
                     _stddev = math.sqrt(_variance)
             else:
-                columns.append(func.stddev(cte.c.len).label("_stddev"))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
                 _total, _non_nulls, _valids, _zero_length, _distinct, _avg, _min, _max, _stddev = result
 
+            _distinct = self._profile_distinct(conn, cte, _distinct, _valids)
             _nulls = _total - _non_nulls
             _invalids = _non_nulls - _valids
             _non_zero_length = _valids - _zero_length
@@ -889,7 +1825,7 @@ class StringColumnProfiler(BaseColumnProfiler):
             }
 
             # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+            _non_duplicates = self._profile_non_duplicate(conn, cte, cte.c.c, _valids)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -901,13 +1837,13 @@ class StringColumnProfiler(BaseColumnProfiler):
             # top k
             topk = None
             if _valids > 0:
-                topk = profile_topk(conn, cte.c.c)
+                topk = self._profile_topk(conn, cte, cte.c.c, _valids)
             result['topk'] = topk
 
             # histogram of string length
             histogram = None
             if _valids > 0:
-                histogram = profile_histogram(conn, cte, cte.c.len, _min, _max, True)
+                histogram = self._profile_histogram(conn, cte, cte.c.len, _min, _max)
             result['histogram'] = histogram
             result['histogram_length'] = histogram
 
@@ -921,63 +1857,64 @@ class NumericColumnProfiler(BaseColumnProfiler):
         super().__init__(engine, config, table, column)
         self.is_integer = is_integer
 
-    def _get_table_cte(self) -> CTE:
-        t, c = self._get_limited_table_cte()
-        if self._get_database_backend() != 'sqlite':
-            cte = select(
-                c.label("c"),
-                c.label("orig")
-            ).select_from(t).cte()
+    def _get_column_projections(self, c: ColumnClause) -> Dict[str, ColumnClause]:
+        if self._get_database_backend() == 'sqlite':
+            valid = case(
+                (func.typeof(c) == 'text', None),
+                (func.typeof(c) == 'blob', None),
+                else_=c
+            )
         else:
-            cte = select(
-                case(
-                    (func.typeof(c) == 'text', None),
-                    (func.typeof(c) == 'blob', None),
-                    else_=c
-                ).label("c"),
-                c.label("orig")
-            ).select_from(t).cte(name="T")
-        cte = select(
-            cte.c.c,
-            case((cte.c.c == 0, 1), else_=None).label("zero"),
-            case((cte.c.c < 0, 1), else_=None).label("negative"),
-            cte.c.orig
-        ).select_from(cte).cte()
-        return cte
-
-    def profile(self):
+            valid = c
+        return {
+            'c': valid,
+            'zero': case((valid == 0, 1), else_=None),
+            'negative': case((valid < 0, 1), else_=None),
+            'orig': c,
+        }
+
+    def _get_histogram_column(self, c) -> Optional[ColumnClause]:
+        return c.c
+
+    def _is_histogram_integer(self) -> bool:
+        return self.is_integer
+
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        columns = [
+            func.count().label("_total"),
+            func.count(c.orig).label("_non_nulls"),
+            func.count(c.c).label("_valids"),
+            func.count(c.zero).label("_zeros"),
+            func.count(c.negative).label("_negatives"),
+            self._count_distinct(c.c).label("_distinct"),
+            func.sum(func.cast(c.c, Float)).label("_sum"),
+            func.avg(c.c).label("_avg"),
+            func.min(c.c).label("_min"),
+            func.max(c.c).label("_max"),
+        ]
+
+        if self._get_database_backend() == 'sqlite':
+            columns.append((func.count(c.c) * func.sum(
+                func.cast(c.c, Float) * func.cast(c.c, Float)) - func.sum(c.c) * func.sum(c.c)) / (
+                               (func.count(c.c) - 1) * func.count(c.c)).label('_variance'))
+        else:
+            columns.append(func.stddev(func.cast(c.c, Float)).label("_stddev"))
+        return columns
+
+    def profile(self, aggregates: tuple = None):
         with self.engine.connect() as conn:
             cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.zero).label("_zeros"),
-                func.count(cte.c.negative).label("_negatives"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.sum(func.cast(cte.c.c, Float)).label("_sum"),
-                func.avg(cte.c.c).label("_avg"),
-                func.min(cte.c.c).label("_min"),
-                func.max(cte.c.c).label("_max"),
-            ]
+            result = self._query_aggregates(conn, cte, aggregates)
 
             if self._get_database_backend() == 'sqlite':
-                columns.append((func.count(cte.c.c) * func.sum(
-                    func.cast(cte.c.c, Float) * func.cast(cte.c.c, Float)) - func.sum(cte.c.c) * func.sum(cte.c.c)) / (
-                                   (func.count(cte.c.c) - 1) * func.count(cte.c.c)).label('_variance'))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
                 _total, _non_nulls, _valids, _zeros, _negatives, _distinct, _sum, _avg, _min, _max, _variance = result
                 _stddev = None
                 if _variance is not None:
                     _stddev = math.sqrt(_variance)
             else:
-                columns.append(func.stddev(func.cast(cte.c.c, Float)).label("_stddev"))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
                 _total, _non_nulls, _valids, _zeros, _negatives, _distinct, _sum, _avg, _min, _max, _stddev = result
 
+            _distinct = self._profile_distinct(conn, cte, _distinct, _valids)
             _nulls = _total - _non_nulls
             _invalids = _non_nulls - _valids
             _positives = _valids - _zeros - _negatives
@@ -1016,7 +1953,7 @@ class NumericColumnProfiler(BaseColumnProfiler):
             }
 
             # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+            _non_duplicates = self._profile_non_duplicate(conn, cte, cte.c.c, _valids)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -1028,7 +1965,7 @@ class NumericColumnProfiler(BaseColumnProfiler):
             # histogram
             histogram = None
             if _valids > 0 and math.isfinite(_min) and math.isfinite(_max):
-                histogram = profile_histogram(conn, cte, cte.c.c, _min, _max, self.is_integer)
+                histogram = self._profile_histogram(conn, cte, cte.c.c, _min, _max)
             result['histogram'] = histogram
 
             # quantile
@@ -1042,81 +1979,81 @@ class NumericColumnProfiler(BaseColumnProfiler):
                 'p75': quantile.get('p75'),
                 'p95': quantile.get('p95'),
             })
+            if self.config and self.config.get('percentiles'):
+                result['quantiles'] = {percentile_key(p): quantile.get(percentile_key(p))
+                                       for p in sorted(set(self.config.get('percentiles')))}
 
             # top k (integer only)
             if self.is_integer:
                 topk = None
                 if _valids > 0:
-                    topk = profile_topk(conn, cte.c.c)
+                    topk = self._profile_topk(conn, cte, cte.c.c, _valids)
                 result["topk"] = topk
 
             return result
 
+    def _get_percentiles(self) -> List[float]:
+        """
+        The default percentiles and the percentiles configured by users, in ascending order.
+        """
+        percentiles = set(DEFAULT_PERCENTILES)
+        if self.config:
+            percentiles.update(self.config.get('percentiles', []))
+        return sorted(percentiles)
+
     def _profile_quantile_via_window_function(
         self,
         conn: Connection,
         table: FromClause,
         column: ColumnClause,
-        total: int
-    ):
+        total: int,
+        percentiles: List[float]
+    ) -> dict:
+        # Sort once and pick the values of all the ranks
+        #
         # with t as (
         #   select
         #     column as c,
-        #     ntile(20) over (order by column) as n
+        #     row_number() over (order by column) - 1 as n
         #   from table
+        #   where column is not null
         # )
-        # select n, min(c) from t group by n order by n
-        n_bucket = total if total < 100 else 100
+        # select n, c from t where n in (<rank of each percentile>)
+        ranks = {percentile: min(int(percentile * total / 100), total - 1) for percentile in percentiles}
         t = select(
             column.label("c"),
-            func.ntile(n_bucket).over(order_by=column).label("n")
+            (func.row_number().over(order_by=column) - 1).label("n")
         ).where(column.isnot(None)).select_from(table).cte()
-        stmt = select(t.c.n, func.min(t.c.c)).group_by(t.c.n).order_by(t.c.n)
-        result = conn.execute(stmt)
-        quantile = []
-        for row in result:
-            n, v = row
-            quantile.append(v)
-        return {
-            'p5': dtof(quantile[5 * n_bucket // 100]),
-            'p25': dtof(quantile[25 * n_bucket // 100]),
-            'p50': dtof(quantile[50 * n_bucket // 100]),
-            'p75': dtof(quantile[75 * n_bucket // 100]),
-            'p95': dtof(quantile[95 * n_bucket // 100]),
-        }
+        stmt = select(t.c.n, t.c.c).where(t.c.n.in_(sorted(set(ranks.values()))))
+        values = {n: v for n, v in conn.execute(stmt)}
+        return {percentile_key(p): dtof(values.get(rank)) for p, rank in ranks.items()}
 
-    def _profile_quantile_via_query_one_by_one(
+    def _profile_quantile_via_sorted_scan(
         self,
         conn: Connection,
         table: FromClause,
         column: ColumnClause,
-        total: int
-    ):
-        # Query for each quantile
-        def ntile(n):
-            offset = n * total // 100
-
-            stmt = select(
-                column
-            ).select_from(
-                table
-            ).where(
-                column.isnot(None)
-            ).order_by(
-                column
-            ).offset(
-                offset
-            ).limit(1)
-            result, = conn.execute(stmt).fetchone()
-            return dtof(result)
-
-        return {
-            'p5': ntile(5),
-            'p25': ntile(25),
-            'p50': ntile(50),
-            'p75': ntile(75),
-            'p95': ntile(95),
-        }
+        total: int,
+        percentiles: List[float]
+    ) -> dict:
+        # Stream the sorted values once and pick the values of all the ranks, instead of one query per rank
+        ranks = {percentile: min(int(percentile * total / 100), total - 1) for percentile in percentiles}
+        wanted = sorted(set(ranks.values()))
+        values = {}
+        stmt = select(column).select_from(table).where(column.isnot(None)).order_by(column)
+        result = conn.execution_options(stream_results=True).execute(stmt)
+        n = 0
+        i = 0
+        for rows in result.partitions(SKETCH_STREAM_BATCH_SIZE):
+            for v, in rows:
+                while i < len(wanted) and wanted[i] == n:
+                    values[n] = v
+                    i += 1
+                n += 1
+            if i == len(wanted):
+                break
+        result.close()
+        return {percentile_key(p): dtof(values.get(rank)) for p, rank in ranks.items()}
 
     def _profile_quantile(
         self,
@@ -1126,14 +2063,17 @@ class NumericColumnProfiler(BaseColumnProfiler):
         total: int
     ) -> dict:
         """
+        Profile the quantiles of all the percentiles in one query.
 
         :param conn:
         :param table: a
         :param column:
         :param total:
-        :return:
+        :return: the map of percentile key (e.g. p5) to the quantile value
         """
         backend = self._get_database_backend()
+        percentiles = self._get_percentiles()
+        fractions = [percentile / 100 for percentile in percentiles]
 
         if backend == 'sqlite':
             import sqlite3
@@ -1146,30 +2086,27 @@ class NumericColumnProfiler(BaseColumnProfiler):
                 # use window function if sqlite version >= 3.25.0
                 # see https://www.sqlite.org/windowfunctions.html
 
-                return self._profile_quantile_via_window_function(conn, table, column, total)
+                return self._profile_quantile_via_window_function(conn, table, column, total, percentiles)
             else:
-                return self._profile_quantile_via_query_one_by_one(conn, table, column, total)
+                return self._profile_quantile_via_sorted_scan(conn, table, column, total, percentiles)
         elif backend == 'duckdb':
             selects = [
-                func.approx_quantile(column, literal_column(f"{percentile}")) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
+                func.approx_quantile(column, literal_column(f"{fraction}")) for fraction in fractions
             ]
         elif backend == 'bigquery':
             # BigQuery does not support WITHIN, change to use over
             #   Ref: https://github.com/great-expectations/great_expectations/blob/develop/great_expectations/dataset/sqlalchemy_dataset.py#L1019:9
             selects = [
-                func.percentile_disc(column, percentile).over() for percentile in [0.05, 0.25, 0.5, 0.75, 0.95]
+                func.percentile_disc(column, fraction).over() for fraction in fractions
             ]
         elif backend == 'redshift':
             # ref: https://docs.aws.amazon.com/redshift/latest/dg/r_APPROXIMATE_PERCENTILE_DISC.html
             selects = [
-                func.approximate_percentile_disc(percentile).within_group(column) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
+                func.approximate_percentile_disc(fraction).within_group(column) for fraction in fractions
             ]
         elif backend == 'awsathena':
             selects = [
-                func.approx_percentile(column, percentile) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
+                func.approx_percentile(column, fraction) for fraction in fractions
             ]
         else:
             # https://docs.sqlalchemy.org/en/14/core/functions.html#sqlalchemy.sql.functions.percentile_disc
@@ -1182,143 +2119,49 @@ class NumericColumnProfiler(BaseColumnProfiler):
             #     percentile_disc(0.95) within group (order by column)
             # from table
             selects = [
-                func.percentile_disc(percentile).within_group(column) for percentile in [0.05, 0.25, 0.5, 0.75, 0.95]
+                func.percentile_disc(fraction).within_group(column) for fraction in fractions
             ]
 
         stmt = select(*selects).select_from(table)
         result = conn.execute(stmt).fetchone()
-        return {
-            'p5': dtof(result[0]),
-            'p25': dtof(result[1]),
-            'p50': dtof(result[2]),
-            'p75': dtof(result[3]),
-            'p95': dtof(result[4]),
-        }
-
-    def _profile_histogram(
-        self,
-        conn: Connection,
-        table: FromClause,
-        column: ColumnClause,
-        min: Union[int, float],
-        max: Union[int, float],
-        is_integer: bool,
-        num_buckets: int = HISTOGRAM_NUM_BUCKET
-    ) -> dict:
-        if is_integer:
-            # min=0, max=50, num_buckets=50  => interval=1, num_buckets=51
-            # min=0, max=70, num_buckets=50  => interval=2, num_buckets=36
-            # min=0, max=100, num_buckets=50 => interval=2, num_buckets=51
-            interval = math.ceil((max - min) / num_buckets) if max > min else 1
-            num_buckets = math.ceil((max - min + 1) / interval)
-        else:
-            interval = (max - min) / num_buckets if max > min else 1
-
-        cases = []
-        for i in range(num_buckets):
-            bound = min + interval * (i + 1)
-            if i != num_buckets - 1:
-                cases += [(column < bound, i)]
-            else:
-                cases += [(column < bound + interval / 100, i)]
-
-        cte_with_bucket = select(
-            column.label("c"),
-            case(*cases, else_=None).label("bucket")
-        ).select_from(
-            table
-        ).where(
-            column.isnot(None)
-        ).cte()
-
-        stmt = select(
-            cte_with_bucket.c.bucket,
-            func.count().label("_count")
-        ).group_by(
-            cte_with_bucket.c.bucket
-        ).order_by(
-            cte_with_bucket.c.bucket
-        )
-
-        result = conn.execute(stmt)
-
-        counts = []
-        labels = []
-        bin_edges = []
-        for i in range(num_buckets):
-            if is_integer:
-                start = min + i * interval
-                end = min + (i + 1) * interval
-                if interval == 1:
-                    label = f"{start}"
-                else:
-                    label = f"{start} _ {end}"
-            else:
-                if interval >= 1:
-                    start = min + i * interval
-                    end = min + (i + 1) * interval
-                else:
-                    start = min + i / (1 / interval)
-                    end = min + (i + 1) / (1 / interval)
-
-                label = f"{format_float(start)} _ {format_float(end)}"
-
-            labels.append(label)
-            counts.append(0)
-            bin_edges.append(start)
-            if i == num_buckets - 1:
-                bin_edges.append(end)
-
-        for row in result:
-            _bucket, v = row
-            if _bucket is None:
-                continue
-            counts[int(_bucket)] = v
-        return {
-            "type": "histogram",
-            "labels": labels,
-            "counts": counts,
-            "bin_edges": bin_edges,
-        }
+        return {percentile_key(p): dtof(v) for p, v in zip(percentiles, result)}
 
 
 class DatetimeColumnProfiler(BaseColumnProfiler):
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
-    def _get_table_cte(self) -> CTE:
-        t, c = self._get_limited_table_cte()
-        if self._get_database_backend() != 'sqlite':
-            cte = select(
-                c.label("c"),
-                c.label("orig")
-            ).select_from(t).cte()
+    def _get_column_projections(self, c: ColumnClause) -> Dict[str, ColumnClause]:
+        if self._get_database_backend() == 'sqlite':
+            valid = case(
+                (func.typeof(c) == 'text', func.datetime(c)),
+                (func.typeof(c) == 'integer', func.datetime(c, 'unixepoch')),
+                (func.typeof(c) == 'real', func.datetime(c, 'unixepoch')),
+                else_=None
+            )
         else:
-            cte = select(
-                case(
-                    (func.typeof(c) == 'text', func.datetime(c)),
-                    (func.typeof(c) == 'integer', func.datetime(c, 'unixepoch')),
-                    (func.typeof(c) == 'real', func.datetime(c, 'unixepoch')),
-                    else_=None
-                ).label("c"),
-                c.label("orig"),
-            ).select_from(t).cte()
-        return cte
-
-    def profile(self):
+            valid = c
+        return {
+            'c': valid,
+            'orig': c,
+        }
+
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        return [
+            func.count().label("_total"),
+            func.count(c.orig).label("_non_nulls"),
+            func.count(c.c).label("_valids"),
+            self._count_distinct(c.c).label("_distinct"),
+            func.min(c.c).label("_min"),
+            func.max(c.c).label("_max"),
+        ]
+
+    def profile(self, aggregates: tuple = None):
         with self.engine.connect() as conn:
             cte = self._get_table_cte()
-
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.min(cte.c.c).label("_min"),
-                func.max(cte.c.c).label("_max"),
-            )
-            result = conn.execute(stmt).fetchone()
+            result = self._query_aggregates(conn, cte, aggregates)
             _total, _non_nulls, _valids, _distinct, _min, _max = result
+            _distinct = self._profile_distinct(conn, cte, _distinct, _valids)
             _nulls = _total - _non_nulls
             _invalids = _non_nulls - _valids
 
@@ -1349,7 +2192,7 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
             }
 
             # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+            _non_duplicates = self._profile_non_duplicate(conn, cte, cte.c.c, _valids)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -1367,6 +2210,54 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
 
             return result
 
+    def _get_histogram_column(self, c) -> Optional[ColumnClause]:
+        return c.c
+
+    def _date_trunc(self, _type: str, column: ColumnClause) -> ColumnClause:
+        part = {'yearly': 'YEAR', 'monthly': 'MONTH'}.get(_type, 'DAY')
+        backend = self._get_database_backend()
+        if backend == 'sqlite':
+            if part == "YEAR":
+                return func.strftime("%Y-01-01", column)
+            elif part == "MONTH":
+                return func.strftime("%Y-%m-01", column)
+            else:
+                return func.strftime("%Y-%m-%d", column)
+        elif backend == 'bigquery':
+            return func.date_trunc(column, text(part))
+        else:
+            return func.date_trunc(part, column)
+
+    def _query_aggregates_with_histogram(self, conn: Connection, cte: CTE) -> tuple:
+        """
+        Query the base aggregates and the counts of the truncated dates in the same scan. The truncation is decided by
+        the bounds of the previous run, and the counts are reused if the current bounds need the same truncation.
+
+        # with t as (
+        #   select *, date_trunc(<part>, c) as _d from cte
+        # )
+        # select _d, grouping(_d), <base aggregates>, count(_d) from t group by grouping sets ((_d), ())
+        """
+        _type = datetime_histogram_bins(*self.histogram_bounds)[0]
+        t = select(*cte.c, self._date_trunc(_type, cte.c.c).label('_d')).select_from(cte).cte()
+
+        stmt = select(
+            t.c._d,
+            func.grouping(t.c._d).label('_grouping'),
+            *self._get_aggregates(t.c),
+            func.count(t.c._d).label('_histogram')
+        ).group_by(func.grouping_sets(tuple_(t.c._d), tuple_()))
+
+        aggregates = None
+        rows = []
+        for row in conn.execute(stmt):
+            if row[1]:
+                aggregates = tuple(row[2:-1])
+            elif row[0] is not None:
+                rows.append((row[0], row[-1]))
+        self._prefetched_histogram = (_type, rows)
+        return aggregates
+
     def _profile_histogram(
         self,
         conn: Connection,
@@ -1376,158 +2267,148 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
         max: Union[date, datetime]
     ) -> Tuple[dict, str]:
         """
-        Profile the histogram of a datetime column. There are three way to create bins of the histogram
-
+        Profile the histogram of a datetime column. The buckets are yearly, monthly or daily by the range of the
+        values, and the counts are grouped by the date truncated to the same part.
 
         :param conn:
         :param table:
         :param column:
         :param min:
         :param max:
-        :return:
+        :return: the histogram and its type
         """
+        _type, dmin, interval, num_buckets, labels, bin_edges = datetime_histogram_bins(min, max)
 
-        # if self._get_database_backend() == 'sqlite':
-        #     min = datetime.fromisoformat(min).date() if min is not None else min
-        #     max = datetime.fromisoformat(max).date() if max is not None else max
-        # else:
-        #     if isinstance(min, datetime):
-        #         min = min.date()
-        #     if isinstance(max, datetime):
-        #         max = max.date()
+        if self._prefetched_histogram is not None and self._prefetched_histogram[0] == _type:
+            rows = self._prefetched_histogram[1]
+        else:
+            cte = select(self._date_trunc(_type, column).label("d")).select_from(table).cte()
+            stmt = select(
+                cte.c.d,
+                func.count(cte.c.d).label("_count")
+            ).group_by(
+                cte.c.d
+            )
+            rows = conn.execute(stmt)
 
-        _type = None
+        counts = datetime_histogram_counts(rows, _type, dmin, interval, num_buckets)
         histogram = {
-            "labels": [],
-            "counts": [],
-            "bin_edges": [],
+            "labels": labels,
+            "counts": counts,
+            "bin_edges": bin_edges,
         }
+        return histogram, _type
 
-        def date_trunc(*args):
-            if self._get_database_backend() == 'sqlite':
-                if args[0] == "YEAR":
-                    return func.strftime("%Y-01-01", args[1])
-                elif args[0] == "MONTH":
-                    return func.strftime("%Y-%m-01", args[1])
-                else:
-                    return func.strftime("%Y-%m-%d", args[1])
-            elif self._get_database_backend() == 'bigquery':
-                date_expression = args[1]
-                date_part = args[0]
-                return func.date_trunc(date_expression, text(date_part))
-            else:
-                return func.date_trunc(*args)
-
-        days_delta = (max - min).days
-        if days_delta > 365 * 4:
-            _type = "yearly"
-            dmin = date(min.year, 1, 1)
-            if max.year < 3000:
-                dmax = date(max.year, 1, 1) + relativedelta(years=+1)
-            else:
-                dmax = date(3000, 1, 1)
-            interval_years = math.ceil((dmax.year - dmin.year) / 50)
-            interval = relativedelta(years=+interval_years)
-            num_buckets = math.ceil((dmax.year - dmin.year) / interval.years)
-
-            cte = select(date_trunc("YEAR", column).label("d")).select_from(table).cte()
-        elif days_delta > 60:
-            _type = "monthly"
-            interval = relativedelta(months=+1)
-            dmin = date(min.year, min.month, 1)
-            if max.year < 3000:
-                dmax = date(max.year, max.month, 1) + interval
-            else:
-                dmax = date(3000, 1, 1)
-            period = relativedelta(dmax, dmin)
-            num_buckets = (period.years * 12 + period.months)
-            cte = select(date_trunc("MONTH", column).label("d")).select_from(table).cte()
-        else:
-            _type = "daily"
-            interval = relativedelta(days=+1)
-            dmin = date(min.year, min.month, min.day)
-            if max.year < 3000:
-                dmax = date(max.year, max.month, max.day) + interval
-            else:
-                dmax = date(3000, 1, 1)
-            num_buckets = (dmax - dmin).days
-            cte = select(date_trunc("DAY", column).label("d")).select_from(table).cte()
 
-        stmt = select(
-            cte.c.d,
-            func.count(cte.c.d).label("_count")
-        ).group_by(
-            cte.c.d
-        ).order_by(
-            cte.c.d
-        )
+def datetime_histogram_counts(rows, _type: str, dmin: date, interval: relativedelta, num_buckets: int) -> List[int]:
+    """
+    Sum up the counts of the truncated dates into the buckets. The index of the bucket is computed by the calendar
+    arithmetic, so it takes constant time for each date instead of comparing it with every bin edge.
 
-        result = conn.execute(stmt)
+    :param rows: the (truncated date, count) pairs
+    :return: the counts of the buckets
+    """
+    counts = [0] * num_buckets
+    for date_truncated, v in rows:
+        if date_truncated is None:
+            continue
+        elif isinstance(date_truncated, str):
+            date_truncated = date.fromisoformat(date_truncated[:10])
+        elif isinstance(date_truncated, datetime):
+            date_truncated = date_truncated.date()
+
+        if _type == "yearly":
+            i = (date_truncated.year - dmin.year) // interval.years
+        elif _type == "monthly":
+            i = (date_truncated.year - dmin.year) * 12 + date_truncated.month - dmin.month
+        else:
+            i = (date_truncated - dmin).days
+        if 0 <= i < num_buckets:
+            counts[i] += v
+    return counts
 
-        for i in range(num_buckets):
-            label = f"{dmin + i * interval} - {dmin + (i + 1) * interval}"
-            histogram["labels"].append(label)
-            histogram["bin_edges"].append(str(dmin + i * interval))
-            histogram["counts"].append(0)
-        histogram["bin_edges"].append(str(dmin + num_buckets * interval))
 
-        for row in result:
-            date_truncated, v = row
-            if date_truncated is None:
-                continue
-            elif isinstance(date_truncated, str):
-                date_truncated = date.fromisoformat(date_truncated)
-            elif isinstance(date_truncated, datetime):
-                date_truncated = date_truncated.date()
+def datetime_histogram_bins(min: Union[date, datetime], max: Union[date, datetime]) \
+    -> Tuple[str, date, relativedelta, int, List[str], List[str]]:
+    """
+    The buckets of the datetime histogram. The buckets are yearly, monthly or daily by the range of the values.
 
-            for i in range(num_buckets):
-                date_edge = date.fromisoformat(histogram["bin_edges"][i + 1])
-                if date_truncated < date_edge:
-                    histogram["counts"][i] += v
-                    break
+    :return: the type of the histogram, the start date, the interval, the number of buckets, the labels and the bin
+        edges
+    """
+    days_delta = (max - min).days
+    if days_delta > 365 * 4:
+        _type = "yearly"
+        dmin = date(min.year, 1, 1)
+        if max.year < 3000:
+            dmax = date(max.year, 1, 1) + relativedelta(years=+1)
+        else:
+            dmax = date(3000, 1, 1)
+        interval_years = math.ceil((dmax.year - dmin.year) / 50)
+        interval = relativedelta(years=+interval_years)
+        num_buckets = math.ceil((dmax.year - dmin.year) / interval.years)
+    elif days_delta > 60:
+        _type = "monthly"
+        interval = relativedelta(months=+1)
+        dmin = date(min.year, min.month, 1)
+        if max.year < 3000:
+            dmax = date(max.year, max.month, 1) + interval
+        else:
+            dmax = date(3000, 1, 1)
+        period = relativedelta(dmax, dmin)
+        num_buckets = (period.years * 12 + period.months)
+    else:
+        _type = "daily"
+        interval = relativedelta(days=+1)
+        dmin = date(min.year, min.month, min.day)
+        if max.year < 3000:
+            dmax = date(max.year, max.month, max.day) + interval
+        else:
+            dmax = date(3000, 1, 1)
+        num_buckets = (dmax - dmin).days
 
-        return histogram, _type
+    labels = []
+    bin_edges = []
+    for i in range(num_buckets):
+        labels.append(f"{dmin + i * interval} - {dmin + (i + 1) * interval}")
+        bin_edges.append(str(dmin + i * interval))
+    bin_edges.append(str(dmin + num_buckets * interval))
+    return _type, dmin, interval, num_buckets, labels, bin_edges
 
 
 class BooleanColumnProfiler(BaseColumnProfiler):
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
-    def _get_table_cte(self) -> CTE:
-        t, c = self._get_limited_table_cte()
-        if self._get_database_backend() != 'sqlite':
-            cte = select(
-                c.label("c"),
-                c.label("orig")
-            ).select_from(t).cte()
+    def _get_column_projections(self, c: ColumnClause) -> Dict[str, ColumnClause]:
+        if self._get_database_backend() == 'sqlite':
+            valid = case(
+                (c == true(), c),
+                (c == false(), c),
+                else_=None
+            )
         else:
-            cte = select(
-                case(
-                    (c == true(), c),
-                    (c == false(), c),
-                    else_=None
-                ).label("c"),
-                c.label("orig"),
-            ).cte()
-        cte = select(
-            cte.c.c,
-            case((cte.c.c == true(), 1), else_=None).label("true_count"),
-            cte.c.orig
-        ).select_from(cte).cte()
-        return cte
-
-    def profile(self):
+            valid = c
+        return {
+            'c': valid,
+            'true_count': case((valid == true(), 1), else_=None),
+            'orig': c,
+        }
+
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        return [
+            func.count().label("_total"),
+            func.count(c.orig).label("_non_nulls"),
+            func.count(c.c).label("_valids"),
+            func.count(c.true_count).label("_trues"),
+            func.count(distinct(c.c)).label("_distinct"),
+        ]
+
+    def profile(self, aggregates: tuple = None):
         cte = self._get_table_cte()
 
         with self.engine.connect() as conn:
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.true_count).label("_trues"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-            ).select_from(cte)
-            result = conn.execute(stmt).fetchone()
+            result = self._query_aggregates(conn, cte, aggregates)
             _total, _non_nulls, _valids, _trues, _distinct = result
             _nulls = _total - _non_nulls
             _invalids = _non_nulls - _valids
@@ -1560,27 +2441,23 @@ class UUIDColumnProfiler(BaseColumnProfiler):
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
-    def _get_table_cte(self) -> CTE:
-        t, c = self._get_limited_table_cte()
-        return select(c.label("c")).select_from(t).cte()
+    def _get_aggregates(self, c) -> List[ColumnClause]:
+        return [
+            func.count().label("_total"),
+            func.count(c.c).label("_non_nulls"),
+            self._count_distinct(c.c).label("_distinct"),
+        ]
 
-    def profile(self):
+    def profile(self, aggregates: tuple = None):
         with self.engine.connect() as conn:
             cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.c).label("_non_nulls"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-            ]
-
-            stmt = select(*columns)
-            result = conn.execute(stmt).fetchone()
+            result = self._query_aggregates(conn, cte, aggregates)
             _total, _non_nulls, _distinct = result
 
             _nulls = _total - _non_nulls
             _valids = _non_nulls
             _invalids = _non_nulls - _valids
+            _distinct = self._profile_distinct(conn, cte, _distinct, _valids)
 
             result = {
                 'total': None,
@@ -1599,7 +2476,7 @@ class UUIDColumnProfiler(BaseColumnProfiler):
             }
 
             # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+            _non_duplicates = self._profile_non_duplicate(conn, cte, cte.c.c, _valids)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -1611,13 +2488,91 @@ class UUIDColumnProfiler(BaseColumnProfiler):
             # top k
             topk = None
             if _valids > 0:
-                topk = profile_topk(conn, func.cast(cte.c.c, String))
+                topk = self._profile_topk(conn, cte, func.cast(cte.c.c, String), _valids)
             result['topk'] = topk
 
             return result
 
 
-def profile_topk(conn, expr, k=50) -> dict:
+class _RedshiftApproximateCountDistinct(FunctionElement):
+    name = 'approximate_count_distinct'
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(_RedshiftApproximateCountDistinct)
+def _compile_redshift_approximate_count_distinct(element, compiler, **kw):
+    return f"APPROXIMATE COUNT(DISTINCT {compiler.process(element.clauses, **kw)})"
+
+
+# backend => (function, method, relative error)
+#   snowflake: https://docs.snowflake.com/en/sql-reference/functions/approx_count_distinct
+#   bigquery: HyperLogLog++ with the default precision 15
+#   redshift: https://docs.aws.amazon.com/redshift/latest/dg/r_COUNT.html
+#   databricks: the default relativeSD of approx_count_distinct
+#   duckdb: HyperLogLog with 2^14 registers
+#   awsathena: https://trino.io/docs/current/functions/aggregate.html#approx_distinct
+APPROX_COUNT_DISTINCT = {
+    'snowflake': (func.approx_count_distinct, 'APPROX_COUNT_DISTINCT', 0.0162),
+    'bigquery': (func.approx_count_distinct, 'APPROX_COUNT_DISTINCT', 0.0057),
+    'redshift': (_RedshiftApproximateCountDistinct, 'APPROXIMATE COUNT(DISTINCT)', 0.02),
+    'databricks': (func.approx_count_distinct, 'approx_count_distinct', 0.05),
+    'duckdb': (func.approx_count_distinct, 'approx_count_distinct', 0.0081),
+    'awsathena': (func.approx_distinct, 'approx_distinct', 0.023),
+}
+
+# backend => (method, relative error of the counts)
+APPROX_TOP_K = {
+    'snowflake': ('APPROX_TOP_K', 1 / APPROX_TOP_K_COUNTERS),
+    'bigquery': ('APPROX_TOP_COUNT', None),
+}
+
+
+@dataclass
+class ColumnSketches:
+    """
+    The client-side sketches of a column to approximate the metrics without the exact GROUP BY queries.
+    """
+    hll: HyperLogLog = field(default_factory=HyperLogLog)
+    kmv: KMinValues = field(default_factory=KMinValues)
+    space_saving: SpaceSaving = field(default_factory=SpaceSaving)
+
+    def add(self, value):
+        h = hash64(value)
+        self.hll.add_hash(h)
+        self.kmv.add_hash(h)
+        self.space_saving.add(str(value))
+
+
+def profile_approx_topk(conn, backend, expr, k=TOPK_NUM) -> dict:
+    if backend == 'snowflake':
+        stmt = select(func.approx_top_k(expr, k, APPROX_TOP_K_COUNTERS))
+    else:
+        stmt = select(func.approx_top_count(expr, k))
+    items, = conn.execute(stmt).fetchone()
+
+    # snowflake returns the json string of [[value, count], ...]
+    # bigquery returns the list of {value, count}
+    if isinstance(items, str):
+        items = json.loads(items)
+
+    topk = {
+        "values": [],
+        "counts": [],
+    }
+    for item in items or []:
+        if isinstance(item, dict):
+            k, v = item.get('value'), item.get('count')
+        else:
+            k, v = item
+        if k is None:
+            continue
+        topk["values"].append(str(k))
+        topk["counts"].append(int(v))
+    return topk
+
+
+def profile_topk(conn, expr, k=TOPK_NUM) -> dict:
     stmt = select(
         expr,
         func.count().label("_count")
@@ -1643,15 +2598,17 @@ def profile_topk(conn, expr, k=50) -> dict:
     return topk
 
 
-def profile_histogram(
-    conn: Connection,
-    table: FromClause,
-    column: ColumnClause,
+def histogram_bins(
     min: Union[int, float],
     max: Union[int, float],
     is_integer: bool,
     num_buckets: int = HISTOGRAM_NUM_BUCKET
-) -> dict:
+) -> Tuple[Union[int, float], int, List[str], List[Union[int, float]]]:
+    """
+    The buckets of the numeric histogram.
+
+    :return: the interval, the number of buckets, the labels and the bin edges
+    """
     if is_integer:
         # min=0, max=50, num_buckets=50  => interval=1, num_buckets=51
         # min=0, max=70, num_buckets=50  => interval=2, num_buckets=36
@@ -1661,6 +2618,43 @@ def profile_histogram(
     else:
         interval = (max - min) / num_buckets if max > min else 1
 
+    labels = []
+    bin_edges = []
+    for i in range(num_buckets):
+        if is_integer:
+            start = min + i * interval
+            end = min + (i + 1) * interval
+            if interval == 1:
+                label = f"{start}"
+            else:
+                label = f"{start} _ {end}"
+        else:
+            if interval >= 1:
+                start = min + i * interval
+                end = min + (i + 1) * interval
+            else:
+                start = min + i / (1 / interval)
+                end = min + (i + 1) / (1 / interval)
+
+            label = f"{format_float(start)} _ {format_float(end)}"
+
+        labels.append(label)
+        bin_edges.append(start)
+        if i == num_buckets - 1:
+            bin_edges.append(end)
+    return interval, num_buckets, labels, bin_edges
+
+
+def histogram_bucket_case(
+    column: ColumnClause,
+    min: Union[int, float],
+    interval: Union[int, float],
+    num_buckets: int
+) -> ColumnClause:
+    """
+    The bucket of each value by a CASE expression with one WHEN clause per bucket. It is evaluated for every row, so
+    it is only kept for the comparison with the arithmetic bucket.
+    """
     cases = []
     for i in range(num_buckets):
         bound = min + interval * (i + 1)
@@ -1668,10 +2662,40 @@ def profile_histogram(
             cases += [(column < bound, i)]
         else:
             cases += [(column < bound + interval / 100, i)]
+    return case(*cases, else_=None)
+
+
+def histogram_bucket(
+    backend: str,
+    column: ColumnClause,
+    min: Union[int, float],
+    interval: Union[int, float],
+    num_buckets: int
+) -> ColumnClause:
+    """
+    The bucket of each value by the arithmetic floor((c - min) / interval), or the native width_bucket function of
+    the backend. The values at the upper bound fall into the last bucket.
+    """
+    if backend in WIDTH_BUCKET_BACKENDS:
+        bucket = func.width_bucket(column, min, min + interval * num_buckets, num_buckets) - 1
+    elif backend == 'sqlite':
+        # the math functions are optional in sqlite, the cast truncates the non-negative value like floor
+        bucket = func.cast((column - min) / interval, Integer)
+    else:
+        bucket = func.floor((column - min) / interval)
+    return case((bucket >= num_buckets - 1, num_buckets - 1), else_=bucket)
 
+
+def query_histogram_counts(
+    conn: Connection,
+    table: FromClause,
+    column: ColumnClause,
+    bucket: ColumnClause,
+    num_buckets: int
+) -> List[int]:
     cte_with_bucket = select(
         column.label("c"),
-        case(*cases, else_=None).label("bucket")
+        bucket.label("bucket")
     ).select_from(
         table
     ).where(
@@ -1689,38 +2713,27 @@ def profile_histogram(
 
     result = conn.execute(stmt)
 
-    counts = []
-    labels = []
-    bin_edges = []
-    for i in range(num_buckets):
-        if is_integer:
-            start = min + i * interval
-            end = min + (i + 1) * interval
-            if interval == 1:
-                label = f"{start}"
-            else:
-                label = f"{start} _ {end}"
-        else:
-            if interval >= 1:
-                start = min + i * interval
-                end = min + (i + 1) * interval
-            else:
-                start = min + i / (1 / interval)
-                end = min + (i + 1) / (1 / interval)
-
-            label = f"{format_float(start)} _ {format_float(end)}"
-
-        labels.append(label)
-        counts.append(0)
-        bin_edges.append(start)
-        if i == num_buckets - 1:
-            bin_edges.append(end)
-
+    counts = [0] * num_buckets
     for row in result:
         _bucket, v = row
         if _bucket is None:
             continue
         counts[int(_bucket)] = v
+    return counts
+
+
+def profile_histogram(
+    conn: Connection,
+    table: FromClause,
+    column: ColumnClause,
+    min: Union[int, float],
+    max: Union[int, float],
+    is_integer: bool,
+    num_buckets: int = HISTOGRAM_NUM_BUCKET
+) -> dict:
+    interval, num_buckets, labels, bin_edges = histogram_bins(min, max, is_integer, num_buckets)
+    bucket = histogram_bucket(conn.dialect.name, column, min, interval, num_buckets)
+    counts = query_histogram_counts(conn, table, column, bucket, num_buckets)
     return {
         "labels": labels,
         "counts": counts,
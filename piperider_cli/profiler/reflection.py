@@ -0,0 +1,230 @@
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, MetaData, Table, bindparam, inspect, text, types
+from sqlalchemy.engine import Connection, Dialect, Engine
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.exc import NoSuchTableError
+
+from ..event import capture_exception
+
+# the type names in dbt catalog.json which are spelled differently in the dialects
+_CATALOG_TYPE_ALIASES = {
+    'double': 'double precision',
+    'int': 'integer',
+}
+
+# the backends reflecting the columns from pg_catalog, the columns of all the tables in a schema are queried at once
+_PG_CATALOG_BACKENDS = ['postgresql', 'duckdb']
+
+_PG_CATALOG_COLUMNS = """
+SELECT c.relname, a.attname, pg_catalog.format_type(a.atttypid, a.atttypmod), a.attnotnull, pgd.description
+FROM pg_catalog.pg_attribute a
+JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_catalog.pg_description pgd ON pgd.objoid = a.attrelid AND pgd.objsubid = a.attnum
+WHERE {schema_clause} AND c.relname IN :names AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY c.relname, a.attnum
+"""
+
+
+def reflect_table(engine: Engine, schema: Optional[str], name: str) -> Optional[Table]:
+    """
+    Reflect a table by the dialect of the engine.
+
+    :return: the table or None if it doesn't exist
+    """
+    try:
+        return Table(name, MetaData(), autoload_with=engine, schema=schema)
+    except NoSuchTableError:
+        # ignore the table metadata fetch error
+        pass
+    except Exception as e:
+        capture_exception(e)
+    return None
+
+
+def is_bulk_reflection(engine: Engine) -> bool:
+    """
+    Whether the columns of the tables in a schema are reflected by one query, so the tables are not split into chunks.
+    """
+    return engine.url.get_backend_name() in _PG_CATALOG_BACKENDS
+
+
+def _get_pg_catalog_columns(conn: Connection, schema: Optional[str], names: List[str]) -> Dict[str, List[dict]]:
+    """
+    Query the columns of the tables in the schema from pg_catalog in one query, instead of the 4 queries per table of
+    the dialect. The column types are parsed by the dialect the same as the table reflection.
+    """
+    dialect = conn.dialect
+    schema_clause = 'n.nspname = :schema' if schema is not None else 'pg_catalog.pg_table_is_visible(c.oid)'
+    stmt = text(_PG_CATALOG_COLUMNS.format(schema_clause=schema_clause)).bindparams(
+        bindparam('names', expanding=True))
+    params = dict(names=names)
+    if schema is not None:
+        params['schema'] = schema
+    rows = conn.execute(stmt, params).fetchall()
+
+    domains = dialect._load_domains(conn)
+    enums = dict(((rec['name'],), rec) if rec['visible'] else ((rec['schema'], rec['name']), rec)
+                 for rec in dialect._load_enums(conn, schema='*'))
+
+    result = {}
+    for table_name, name, format_type, notnull, comment in rows:
+        column = dialect._get_column_info(name, format_type, None, notnull, domains, enums, schema, comment, None,
+                                          None)
+        result.setdefault(table_name, []).append(column)
+    return result
+
+
+def _get_multi_columns(engine: Engine, schema: Optional[str], names: List[str],
+                       inspector: Inspector = None) -> Dict[str, Optional[List[dict]]]:
+    """
+    Get the columns of the tables in the same schema in bulk.
+
+    With SQLAlchemy 2.0, the columns are queried in bulk by the dialect. With SQLAlchemy 1.4, the columns of the
+    Postgres and DuckDB tables are queried from pg_catalog in one query, and the others are queried table by table
+    through the inspector. The dialects caching the columns of the whole schema in the inspector (e.g. Snowflake and
+    Redshift) query the information schema only once per inspector, so the inspector is shared by the callers
+    reflecting the same schema. Either way, the constraints and indexes are not reflected, since the profiler only
+    needs the columns.
+
+    :return: the columns by the table name, None if the table doesn't exist. The tables failed to reflect are absent.
+    """
+    inspector = inspector if inspector is not None else inspect(engine)
+    if hasattr(inspector, 'get_multi_columns'):
+        from sqlalchemy.engine.reflection import ObjectKind
+
+        multi_columns = inspector.get_multi_columns(schema=schema, filter_names=names, kind=ObjectKind.ANY)
+        return {name: columns for (_, name), columns in multi_columns.items()}
+
+    if engine.url.get_backend_name() in _PG_CATALOG_BACKENDS:
+        with engine.connect() as conn:
+            multi_columns = _get_pg_catalog_columns(conn, schema, names)
+        return {name: multi_columns.get(name) for name in names}
+
+    result = {}
+    for name in names:
+        try:
+            result[name] = inspector.get_columns(name, schema=schema)
+        except NoSuchTableError:
+            result[name] = None
+        except Exception as e:
+            capture_exception(e)
+    return result
+
+
+def _build_table(schema: Optional[str], name: str, columns: List[dict]) -> Table:
+    return Table(name, MetaData(),
+                 *[Column(c['name'], c['type'], nullable=c.get('nullable', True), comment=c.get('comment'))
+                   for c in columns],
+                 schema=schema)
+
+
+def reflect_tables(engine: Engine, schema: Optional[str], names: List[str],
+                   inspector: Inspector = None) -> Dict[str, Optional[Table]]:
+    """
+    Reflect the tables in the same schema in bulk. The tables which are not found in bulk are reflected one by one, so
+    the dialects with different naming rules or without the bulk reflection still work.
+
+    :param engine: the engine of the database
+    :param schema: the schema of the tables
+    :param names: the names of the tables
+    :param inspector: optional, the inspector shared by the calls reflecting the same schema
+    :return: the tables by the name, None if the table doesn't exist
+    """
+    try:
+        multi_columns = _get_multi_columns(engine, schema, names, inspector=inspector)
+    except Exception as e:
+        capture_exception(e)
+        multi_columns = {}
+
+    tables = {}
+    for name in names:
+        if name not in multi_columns:
+            tables[name] = reflect_table(engine, schema, name)
+        elif not multi_columns[name]:
+            # a table without any column is not found, the same as the table reflection
+            tables[name] = None
+        else:
+            tables[name] = _build_table(schema, name, multi_columns[name])
+    return tables
+
+
+def parse_catalog_type(dialect: Dialect, type_string: str) -> Optional[types.TypeEngine]:
+    """
+    Parse the column type in dbt catalog.json, e.g. 'character varying(32)' or 'NUMBER(38,0)', by the type names of the
+    dialect.
+
+    :return: the column type or None if the type is not recognized, e.g. the nested types
+    """
+    match = re.match(r'^\s*([A-Za-z_][\w ]*?)\s*(?:\(([\d\s,]*)\))?\s*$', type_string or '')
+    if not match:
+        return None
+    base, args = match.group(1), match.group(2)
+
+    ischema_names = getattr(dialect, 'ischema_names', None) or {}
+    type_ = ischema_names.get(base.lower()) or ischema_names.get(base.upper()) or ischema_names.get(base)
+    if type_ is None and base.lower() in _CATALOG_TYPE_ALIASES:
+        type_ = ischema_names.get(_CATALOG_TYPE_ALIASES[base.lower()])
+    if type_ is None:
+        type_ = getattr(types, base.upper().replace(' ', '_'), None)
+        if not isinstance(type_, type) or not issubclass(type_, types.TypeEngine):
+            return None
+    if isinstance(type_, types.TypeEngine):
+        return type_
+
+    args = [int(arg) for arg in args.split(',') if arg.strip()] if args else []
+    try:
+        return type_(*args)
+    except TypeError:
+        return type_()
+
+
+def build_table_from_catalog(dialect: Dialect, schema: Optional[str], name: str, node: dict) -> Optional[Table]:
+    """
+    Build the table by the columns of the node in dbt catalog.json instead of reflecting it from the warehouse.
+
+    :param dialect: the dialect to parse the column types
+    :param schema: the schema of the table
+    :param name: the name of the table
+    :param node: the node or source in catalog.json
+    :return: the table or None if any column type is not recognized
+    """
+    catalog_columns = sorted((node.get('columns') or {}).values(), key=lambda c: c.get('index') or 0)
+    if not catalog_columns:
+        return None
+
+    columns = []
+    for c in catalog_columns:
+        column_type = parse_catalog_type(dialect, c.get('type'))
+        if column_type is None:
+            return None
+        column_name = c.get('name')
+        if getattr(dialect, 'requires_name_normalize', False):
+            column_name = dialect.normalize_name(column_name)
+        columns.append(Column(column_name, column_type, comment=c.get('comment')))
+    return Table(name, MetaData(), *columns, schema=schema)
+
+
+def get_catalog_stats(node: dict) -> dict:
+    """
+    The row count and the size in bytes of the node in dbt catalog.json. Only some adapters provide them.
+    """
+    stats = node.get('stats') or {}
+
+    def _value(*keys):
+        for key in keys:
+            stat = stats.get(key) or {}
+            if stat.get('include', True) and stat.get('value') is not None:
+                return stat.get('value')
+        return None
+
+    result = {}
+    row_count = _value('row_count', 'num_rows')
+    if row_count is not None:
+        result['row_count'] = int(row_count)
+    size_bytes = _value('bytes', 'num_bytes')
+    if size_bytes is not None:
+        result['bytes'] = int(size_bytes)
+    return result
@@ -0,0 +1,215 @@
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import Table, event, select, func, literal
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import FromClause
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.selectable import Alias
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# the resolution of the hash-based sampling
+SAMPLE_BUCKETS = 10000
+DEFAULT_SAMPLE_SEED = 1
+SAMPLE_ALIAS = '_sample'
+_SQLITE_SAMPLE_HASH = 'piperider_sample_hash'
+# the z-score of the 95% confidence interval
+CONFIDENCE_Z = 1.96
+
+# the backends supporting the native sampling, and whether the fixed-size (rows) sampling is supported
+NATIVE_SAMPLING = {
+    'postgresql': False,
+    'duckdb': True,
+    'snowflake': True,
+    'bigquery': False,
+    'databricks': True,
+    'awsathena': False,
+    'trino': False,
+}
+
+
+@dataclass
+class SamplingConfig:
+    percent: Optional[float] = None
+    rows: Optional[int] = None
+    seed: int = DEFAULT_SAMPLE_SEED
+
+    @staticmethod
+    def from_profiler_config(profiler_config: Optional[dict]) -> Optional['SamplingConfig']:
+        sample = (profiler_config or {}).get('table', {}).get('sample')
+        if not sample:
+            return None
+        percent = sample.get('percent')
+        rows = sample.get('rows')
+        if rows is None and (percent is None or percent >= 100):
+            return None
+        return SamplingConfig(percent=percent, rows=rows, seed=sample.get('seed', DEFAULT_SAMPLE_SEED))
+
+
+class NativeSample(Alias):
+    """
+    The table with the native sampling clause of the dialect, e.g.
+
+    - postgresql: t AS _sample TABLESAMPLE BERNOULLI (10) REPEATABLE (1)
+    - duckdb: t AS _sample TABLESAMPLE 10% (bernoulli, 1)
+    - snowflake: t AS _sample SAMPLE BERNOULLI (10) SEED (1)
+    - bigquery: t AS _sample TABLESAMPLE SYSTEM (10 PERCENT)
+    - databricks: t TABLESAMPLE (10 PERCENT) REPEATABLE (1) AS _sample
+    """
+
+    _traverse_internals = Alias._traverse_internals + [
+        ('percent', InternalTraversal.dp_plain_obj),
+        ('rows', InternalTraversal.dp_plain_obj),
+        ('seed', InternalTraversal.dp_plain_obj),
+    ]
+    inherit_cache = True
+
+    @classmethod
+    def create(cls, table: FromClause, percent: Optional[float], rows: Optional[int], seed: int,
+               name: str = SAMPLE_ALIAS) -> 'NativeSample':
+        sample = cls._construct(table, name=name)
+        sample.percent = percent
+        sample.rows = rows
+        sample.seed = seed
+        return sample
+
+
+def _format_number(value: float) -> str:
+    return ('%f' % value).rstrip('0').rstrip('.')
+
+
+@compiles(NativeSample)
+def _compile_native_sample(element: NativeSample, compiler, **kw):
+    kw.pop('asfrom', None)
+    table = compiler.process(element.element, asfrom=True, **kw)
+    alias = compiler.preparer.format_alias(element, element.name)
+    percent = _format_number(element.percent) if element.percent is not None else None
+    rows = element.rows
+    seed = int(element.seed)
+
+    dialect = compiler.dialect.name
+    if dialect == 'duckdb':
+        if rows is not None:
+            return f'{table} AS {alias} TABLESAMPLE {rows} ROWS (reservoir, {seed})'
+        return f'{table} AS {alias} TABLESAMPLE {percent}% (bernoulli, {seed})'
+    elif dialect == 'snowflake':
+        if rows is not None:
+            return f'{table} AS {alias} SAMPLE ({rows} ROWS)'
+        return f'{table} AS {alias} SAMPLE BERNOULLI ({percent}) SEED ({seed})'
+    elif dialect == 'bigquery':
+        return f'{table} AS {alias} TABLESAMPLE SYSTEM ({percent} PERCENT)'
+    elif dialect == 'databricks':
+        size = f'{rows} ROWS' if rows is not None else f'{percent} PERCENT'
+        return f'{table} TABLESAMPLE ({size}) REPEATABLE ({seed}) AS {alias}'
+    elif dialect in ['awsathena', 'trino']:
+        return f'{table} AS {alias} TABLESAMPLE BERNOULLI ({percent})'
+    return f'{table} AS {alias} TABLESAMPLE BERNOULLI ({percent}) REPEATABLE ({seed})'
+
+
+def _sqlite_sample_hash(seed, *values) -> int:
+    digest = hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8, salt=str(seed).encode('utf-8')[:16])
+    return int.from_bytes(digest.digest(), 'big') % SAMPLE_BUCKETS
+
+
+def _create_sqlite_sample_hash(dbapi_connection, connection_record, connection_proxy):
+    dbapi_connection.create_function(_SQLITE_SAMPLE_HASH, -1, _sqlite_sample_hash, deterministic=True)
+
+
+def _hash_bucket(engine: Engine, table: Table, seed: int) -> Optional[ColumnElement]:
+    """
+    The deterministic bucket in [0, SAMPLE_BUCKETS) of each row by the hash of its values. Because it only depends on
+    the row, all the queries of a table share the same sample.
+    """
+    backend = engine.url.get_backend_name()
+    if backend == 'sqlite':
+        # the function is registered to the connections when they are checked out to query the sample
+        if not event.contains(engine, 'checkout', _create_sqlite_sample_hash):
+            event.listen(engine, 'checkout', _create_sqlite_sample_hash)
+        return getattr(func, _SQLITE_SAMPLE_HASH)(literal(seed), *table.columns)
+    elif backend == 'mysql':
+        return func.crc32(func.concat_ws('|', literal(seed), *table.columns)) % SAMPLE_BUCKETS
+    elif backend == 'redshift':
+        h = literal(seed)
+        for column in table.columns:
+            h = func.fnv_hash(column, h)
+        return func.abs(h % SAMPLE_BUCKETS)
+    return None
+
+
+def sample_table(engine: Engine, table: Table, sampling: SamplingConfig, row_count: Optional[int]) \
+    -> Tuple[Optional[FromClause], Optional[dict]]:
+    """
+    Build the sample of the table. The sample is a selectable with the same columns as the table, so that all the
+    columns of the table are profiled with the same sample.
+
+    The native sampling of the backend is preferred. Otherwise, the rows are sampled by the hash of the values of each
+    row. If neither is supported, it falls back to the first rows. Without the row count, the table is not sampled by
+    the first rows.
+
+    :return: the sample and the sampling information, or (None, None) if the table is not sampled
+    """
+    backend = engine.url.get_backend_name()
+    percent = sampling.percent
+    rows = sampling.rows
+
+    if rows is not None:
+        if row_count is not None and rows >= row_count:
+            return None, None
+        if backend not in NATIVE_SAMPLING or not NATIVE_SAMPLING[backend]:
+            # convert the fixed-size sampling to the percentage
+            percent = min(rows * 100 / row_count, 100) if row_count else 100
+            rows = None
+    if rows is None and percent >= 100:
+        return None, None
+
+    info = dict(percent=percent, rows=rows, seed=sampling.seed)
+    if backend in NATIVE_SAMPLING:
+        sample = NativeSample.create(table, percent, rows, sampling.seed)
+        info['method'] = 'reservoir' if rows is not None else 'system' if backend == 'bigquery' else 'bernoulli'
+        return sample, info
+
+    bucket = _hash_bucket(engine, table, sampling.seed)
+    if bucket is not None:
+        threshold = int(round(percent * SAMPLE_BUCKETS / 100))
+        sample = select(*table.columns).select_from(table).where(bucket < threshold).subquery(SAMPLE_ALIAS)
+        info['method'] = 'hash'
+        return sample, info
+
+    if not row_count:
+        # the first rows can't be limited by the percentage without the row count
+        return None, None
+    limit = int(round(row_count * percent / 100))
+    sample = select(*table.columns).select_from(table).limit(limit).subquery(SAMPLE_ALIAS)
+    info['method'] = 'limit'
+    return sample, info
+
+
+def estimate_sample_size(sampling: SamplingConfig, row_count: int) -> int:
+    if sampling.rows is not None:
+        return min(sampling.rows, row_count)
+    return int(round(row_count * sampling.percent / 100))
+
+
+def scale_up(count: int, samples: int, total: int, z: float = CONFIDENCE_Z) -> Optional[dict]:
+    """
+    Scale the count in the sample up to the whole table, with the confidence interval of the proportion. The finite
+    population correction is applied, so the interval is narrower for larger samples.
+
+    :param count: the count in the sample
+    :param samples: the number of sampled rows
+    :param total: the number of rows in the table
+    :return: the estimated value and its lower and upper bound
+    """
+    if not samples or total is None or count is None:
+        return None
+
+    p = count / samples
+    fpc = math.sqrt((total - samples) / (total - 1)) if total > 1 and total > samples else 0
+    se = math.sqrt(p * (1 - p) / samples) * fpc
+    value = int(round(p * total))
+    lower = max(int(math.floor((p - z * se) * total)), count)
+    upper = min(int(math.ceil((p + z * se) * total)), total - (samples - count))
+    return dict(value=min(max(value, lower), upper), lower=lower, upper=upper)
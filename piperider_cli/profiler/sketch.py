@@ -0,0 +1,169 @@
+import hashlib
+import heapq
+import math
+from typing import Any, Dict, List, Tuple
+
+HASH_SPACE = 1 << 64
+
+
+def hash64(value: Any) -> int:
+    """
+    A stable 64-bit hash of a value. The builtin hash() is randomized per process, so the estimations would not be
+    reproducible between runs.
+
+    :param value:
+    :return: the hash value in [0, 2^64)
+    """
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog estimates the number of distinct values with 2^precision registers.
+
+    The relative standard error is 1.04 / sqrt(2^precision), e.g. 0.81% for precision 14.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError('precision should be between 4 and 18')
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: Any):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h: int):
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge HyperLogLog with different precision')
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        elif m == 64:
+            alpha = 0.709
+        elif m == 32:
+            alpha = 0.697
+        else:
+            alpha = 0.673
+
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # small range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Space-Saving keeps the most frequent values with a fixed number of counters.
+
+    The count of a tracked value is overestimated by at most total / capacity.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counters: Dict[Any, int] = {}
+        self.total = 0
+        # min-heap of (count, seq, value). The entries are lazily refreshed because the counts only increase.
+        self._heap: List[Tuple[int, int, Any]] = []
+        self._seq = 0
+
+    def _push(self, value: Any):
+        self._seq += 1
+        heapq.heappush(self._heap, (self.counters[value], self._seq, value))
+
+    def add(self, value: Any, count: int = 1):
+        self.total += count
+        if value in self.counters:
+            self.counters[value] += count
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[value] = count
+            self._push(value)
+            return
+
+        # replace the value with the minimum count
+        while True:
+            minimum, _, victim = heapq.heappop(self._heap)
+            if self.counters[victim] == minimum:
+                break
+            self._push(victim)
+        del self.counters[victim]
+        self.counters[value] = minimum + count
+        self._push(value)
+
+    @property
+    def max_error(self) -> int:
+        return self.total // self.capacity if len(self.counters) >= self.capacity else 0
+
+    def topk(self, k: int) -> List[Tuple[Any, int]]:
+        return sorted(self.counters.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+class KMinValues:
+    """
+    K-minimum-values sketch with multiplicities. It keeps the k smallest hash values and their exact counts, so that
+    it estimates both the number of distinct values and the number of values appearing exactly once.
+
+    The relative standard error is about 1 / sqrt(k - 2).
+    """
+
+    def __init__(self, k: int = 4096):
+        self.k = k
+        self.counts: Dict[int, int] = {}
+        # max-heap of the retained hash values
+        self._heap: List[int] = []
+
+    @property
+    def relative_error(self) -> float:
+        return 1 / math.sqrt(self.k - 2)
+
+    def add(self, value: Any):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h: int):
+        if h in self.counts:
+            self.counts[h] += 1
+            return
+
+        if len(self.counts) < self.k:
+            self.counts[h] = 1
+            heapq.heappush(self._heap, -h)
+        elif h < -self._heap[0]:
+            # an evicted hash value is never accepted again, because the threshold only decreases
+            evicted = -heapq.heapreplace(self._heap, -h)
+            del self.counts[evicted]
+            self.counts[h] = 1
+
+    def is_exact(self) -> bool:
+        return len(self.counts) < self.k
+
+    def distinct(self) -> int:
+        if self.is_exact():
+            return len(self.counts)
+        threshold = (-self._heap[0] + 1) / HASH_SPACE
+        return int(round((self.k - 1) / threshold))
+
+    def non_duplicates(self) -> int:
+        singletons = sum(1 for c in self.counts.values() if c == 1)
+        if self.is_exact():
+            return singletons
+        return int(round(self.distinct() * singletons / len(self.counts)))
@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import column as column_clause, table as table_clause
+
+
+def _by_name(names: List[str], rows, normalize=lambda x: x) -> Dict[str, dict]:
+    """
+    Map the rows of (table name, stats) back to the requested names.
+    """
+    requested = {normalize(name): name for name in names}
+    result = {}
+    for name, stats in rows:
+        if name in requested:
+            result[requested[name]] = {k: v for k, v in stats.items() if v is not None}
+    return result
+
+
+def _query_snowflake(engine: Engine, schema: Optional[str], names: List[str]) -> Dict[str, dict]:
+    t = table_clause('TABLES', column_clause('table_name'), column_clause('row_count'), column_clause('created'),
+                     column_clause('last_altered'), column_clause('bytes'), column_clause('table_schema'),
+                     schema='INFORMATION_SCHEMA')
+    stmt = select(
+        t.c.table_name,
+        t.c.row_count,
+        func.convert_timezone('UTC', t.c.created),
+        func.convert_timezone('UTC', t.c.last_altered),
+        t.c.bytes
+    ).where(t.c.table_schema == str.upper(schema), t.c.table_name.in_([str.upper(name) for name in names]))
+
+    with engine.connect() as conn:
+        rows = [(name, dict(row_count=row_count,
+                            created=created.isoformat() if created else None,
+                            last_altered=last_altered.isoformat() if last_altered else None,
+                            bytes=size_bytes))
+                for name, row_count, created, last_altered, size_bytes in conn.execute(stmt)]
+    return _by_name(names, rows, str.upper)
+
+
+def _query_bigquery(engine: Engine, schema: Optional[str], names: List[str]) -> Dict[str, dict]:
+    t = table_clause(f'{schema}.__TABLES__', column_clause('table_id'), column_clause('row_count'),
+                     column_clause('creation_time'), column_clause('last_modified_time'), column_clause('size_bytes'))
+    stmt = select(
+        t.c.table_id,
+        t.c.row_count,
+        t.c.creation_time,
+        t.c.last_modified_time,
+        t.c.size_bytes
+    ).where(t.c.table_id.in_(names))
+
+    def _isoformat(timestamp):
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp / 1000.0, timezone.utc).isoformat()
+
+    with engine.connect() as conn:
+        rows = [(name, dict(row_count=row_count, created=_isoformat(created), last_altered=_isoformat(last_altered),
+                            bytes=size_bytes))
+                for name, row_count, created, last_altered, size_bytes in conn.execute(stmt)]
+    return _by_name(names, rows)
+
+
+def _query_redshift(engine: Engine, schema: Optional[str], names: List[str]) -> Dict[str, dict]:
+    t = table_clause('SVV_TABLE_INFO', column_clause('schema'), column_clause('table'), column_clause('tbl_rows'),
+                     column_clause('size'))
+    stmt = select(t.c.table, t.c.tbl_rows, t.c.size).where(
+        t.c.schema == (schema if schema else func.current_schema()),
+        t.c.table.in_(names))
+
+    with engine.connect() as conn:
+        rows = [(name, dict(row_count=int(row_count) if row_count is not None else None,
+                            bytes=size_mbytes * 1024 if size_mbytes is not None else None))
+                for name, row_count, size_mbytes in conn.execute(stmt)]
+    return _by_name(names, rows)
+
+
+def _query_postgres(engine: Engine, schema: Optional[str], names: List[str], approximate: bool) -> Dict[str, dict]:
+    pg_class = table_clause('pg_class', column_clause('oid'), column_clause('relname'), column_clause('relnamespace'),
+                            column_clause('relkind'), column_clause('reltuples'), schema='pg_catalog')
+    pg_namespace = table_clause('pg_namespace', column_clause('oid'), column_clause('nspname'), schema='pg_catalog')
+    stmt = select(
+        pg_class.c.relname,
+        pg_class.c.reltuples,
+        func.pg_total_relation_size(pg_class.c.oid)
+    ).select_from(
+        pg_class.join(pg_namespace, pg_namespace.c.oid == pg_class.c.relnamespace)
+    ).where(
+        pg_namespace.c.nspname == (schema if schema else func.current_schema()),
+        pg_class.c.relname.in_(names),
+        pg_class.c.relkind.in_(['r', 'p', 'm'])
+    )
+
+    rows = []
+    with engine.connect() as conn:
+        for name, reltuples, size_bytes in conn.execute(stmt):
+            stats = dict(bytes=size_bytes)
+            # the tables never analyzed have no estimation, they are counted by the table profiler
+            if approximate and reltuples is not None and reltuples > 0:
+                stats['row_count'] = int(reltuples)
+                stats['approximate'] = dict(method='pg_class.reltuples', relative_error=None)
+            rows.append((name, stats))
+    return _by_name(names, rows)
+
+
+def _query_duckdb(engine: Engine, schema: Optional[str], names: List[str]) -> Dict[str, dict]:
+    t = func.duckdb_tables().table_valued('schema_name', 'table_name', 'estimated_size')
+    stmt = select(t.c.table_name, t.c.estimated_size).where(
+        t.c.schema_name == (schema if schema else func.current_schema()),
+        t.c.table_name.in_(names))
+
+    with engine.connect() as conn:
+        rows = [(name, dict(row_count=estimated_size,
+                            approximate=dict(method='duckdb_tables.estimated_size', relative_error=None)))
+                for name, estimated_size in conn.execute(stmt)]
+    return _by_name(names, rows)
+
+
+def query_table_stats(engine: Engine, schema: Optional[str], names: List[str], approximate: bool = False) \
+    -> Dict[str, dict]:
+    """
+    Query the statistics of the tables in the same schema by one query, instead of one query per table.
+
+    The statistics of Snowflake, BigQuery and Redshift are maintained by the data source. The row counts of Postgres
+    and DuckDB are estimations, so they are only used for the approximate profiling.
+
+    :param engine: the engine of the database
+    :param schema: the schema of the tables, the default schema if not specified
+    :param names: the names of the tables
+    :param approximate: whether the estimated row count is acceptable
+    :return: the statistics by the table name, which may have row_count, bytes, created and last_altered. The tables
+        not found are absent.
+    """
+    backend = engine.url.get_backend_name()
+    if backend == 'snowflake':
+        return _query_snowflake(engine, schema or inspect(engine).default_schema_name, names)
+    elif backend == 'bigquery':
+        return _query_bigquery(engine, schema or engine.url.database, names)
+    elif backend == 'redshift':
+        return _query_redshift(engine, schema, names)
+    elif backend == 'postgresql':
+        return _query_postgres(engine, schema, names, approximate)
+    elif backend == 'duckdb' and approximate:
+        return _query_duckdb(engine, schema, names)
+    return {}
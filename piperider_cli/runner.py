@@ -2,6 +2,7 @@ import hashlib
 import json
 import math
 import os
+import re
 import shlex
 import shutil
 import subprocess
@@ -31,6 +32,8 @@ from piperider_cli.event.events import RunEventPayload
 from piperider_cli.exitcode import EC_WARN_NO_PROFILED_MODULES
 from piperider_cli.metrics_engine import MetricEngine, MetricEventHandler
 from piperider_cli.profiler import ProfileSubject, Profiler, ProfilerEventHandler
+from piperider_cli.profiler.cache import DEFAULT_CACHE_MAX_SIZE, ProfileCache
+from piperider_cli.runresult import RUN_HEADER_FILE, ReportIndex, RunResultWriter, load_run_result
 from piperider_cli.statistics import Statistics
 from piperider_cli.utils import create_link, remove_link
 
@@ -50,6 +53,7 @@ class RichProfilerEventHandler(ProfilerEventHandler):
         self.tasks = {}
         self.table_total = 0
         self.table_completed = 0
+        self.table_running = 0
 
     def _get_width(self, tables):
         names = ['METADATA'] + tables
@@ -106,13 +110,17 @@ class RichProfilerEventHandler(ProfilerEventHandler):
         coft = f'[{padding}{self.table_completed}/{self.table_total}]'
         task_id = self.progress.add_task(table_name, total=None, coft=coft)
         self.tasks[table_name] = task_id
+        self.table_running += 1
 
     def handle_table_progress(self, table_name, table_result, total, completed):
         task_id = self.tasks[table_name]
         self.progress.update(task_id, total=total, completed=completed)
 
     def handle_table_end(self, table_name, table_result):
-        self.progress.stop()
+        # the tables may be profiled concurrently, keep the progress until the last running table ends
+        self.table_running -= 1
+        if self.table_running == 0:
+            self.progress.stop()
         task_id = self.tasks[table_name]
         self.progress.remove_task(task_id)
 
@@ -253,10 +261,14 @@ def _pre_run_validating(ds: DataSource) -> (PreRunValidatingResult, Exception):
     return PreRunValidatingResult.OK, None
 
 
+def get_default_output_path(filesystem: ReportDirectory, created_at, ds):
+    latest_source = f"{ds.name}-{convert_to_tzlocal(created_at).strftime('%Y%m%d%H%M%S')}"
+    return os.path.join(filesystem.get_output_dir(), latest_source)
+
+
 def prepare_default_output_path(filesystem: ReportDirectory, created_at, ds):
     latest_symlink_path = os.path.join(filesystem.get_output_dir(), 'latest')
-    latest_source = f"{ds.name}-{convert_to_tzlocal(created_at).strftime('%Y%m%d%H%M%S')}"
-    output_path = os.path.join(filesystem.get_output_dir(), latest_source)
+    output_path = get_default_output_path(filesystem, created_at, ds)
 
     if not os.path.exists(output_path):
         os.makedirs(output_path, exist_ok=True)
@@ -273,6 +285,10 @@ def prepare_default_output_path(filesystem: ReportDirectory, created_at, ds):
     return output_path
 
 
+# the fields of a profiled table kept in the run result after the table is written to run.json
+_TABLE_SUMMARY_KEYS = ['name', 'ref_id', 'row_count', 'col_count', 'reused_from']
+
+
 def _append_descriptions(profile_result):
     for table_v in profile_result['tables'].values():
         table_v['description'] = 'Description: N/A'
@@ -381,7 +397,8 @@ def get_dbt_all_subjects(dbt_state_dir, options, filter_fn):
                 schema = node.get('schema')
                 database = node.get('database')
                 ref_id = node.get("unique_id")
-            result.append(ProfileSubject(table, schema, database, name, ref_id))
+            checksum = node.get('checksum', {}).get('checksum')
+            result.append(ProfileSubject(table, schema, database, name, ref_id, checksum=checksum))
         return result
 
     subjects = as_subjects(dbtutil.get_dbt_state_candidate(dbt_state_dir, options, select_for_metadata=True))
@@ -422,6 +439,85 @@ def get_dbt_state_dir(target_path, dbt_config, ds, skip_datasource_connection=Fa
     return target_path, None
 
 
+def _uses_previous_run(configuration: Configuration, ds: DataSource) -> bool:
+    """
+    The previous run is only loaded for the features using it: the histograms are prefetched by its column bounds
+    unless `prefetchHistogram` is disabled, the incremental profiling reuses its unchanged tables, and the concurrent
+    tables are scheduled by its elapsed time.
+    """
+    profiler_config = configuration.profiler_config
+    if profiler_config.get('prefetchHistogram', True):
+        return True
+    if profiler_config.get('incremental', False):
+        return True
+    return ds.threads > 1 and profiler_config.get('concurrentTables', 1) > 1
+
+
+# the fields of the previous tables and columns used by the scheduling and the histogram prefetch
+_PREVIOUS_TABLE_FIELDS = ['name', 'ref_id', 'elapsed_milli']
+_PREVIOUS_COLUMN_FIELDS = ['name', 'schema_type', 'type', 'min', 'max', 'histogram']
+
+
+def _slim_previous_run(run_result: dict, incremental: bool) -> dict:
+    """
+    Keep the fields of the previous run used by the profiler, so the rest of run.json is released before profiling. The
+    whole table results are kept for the incremental profiling to reuse them.
+    """
+    tables = {}
+    for key, table in (run_result.get('tables') or {}).items():
+        if not table or incremental:
+            tables[key] = table
+            continue
+        tables[key] = {k: table.get(k) for k in _PREVIOUS_TABLE_FIELDS}
+        tables[key]['columns'] = {
+            name: {k: column.get(k) for k in _PREVIOUS_COLUMN_FIELDS}
+            for name, column in (table.get('columns') or {}).items() if column
+        }
+    return dict(id=run_result.get('id'), datasource=run_result.get('datasource'), tables=tables)
+
+
+def _load_previous_run(filesystem: ReportDirectory, ds: DataSource, incremental: bool = True) -> Optional[dict]:
+    """
+    Load the latest run result of the data source from the output directory.
+
+    :param incremental: keep the whole table results, otherwise only the fields for the scheduling and the histograms
+    """
+    output_dir = filesystem.get_output_dir()
+    if not os.path.exists(output_dir):
+        return None
+
+    # the output directory is named as "<datasource>-<YYYYmmddHHMMSS>", e.g. "prod-eu-..." is not a run of "prod"
+    pattern = re.compile(rf'{re.escape(ds.name)}-\d{{14}}')
+    candidates = sorted([d for d in os.listdir(output_dir) if pattern.fullmatch(d)], reverse=True)
+    for candidate in candidates:
+        run_json = os.path.join(output_dir, candidate, 'run.json')
+        if not os.path.exists(run_json):
+            continue
+        try:
+            run_result = load_run_result(run_json)
+        except Exception:
+            continue
+        if (run_result.get('datasource') or {}).get('name') != ds.name:
+            continue
+        return _slim_previous_run(run_result, incremental)
+    return None
+
+
+def _open_profile_cache(configuration: Configuration) -> Optional[ProfileCache]:
+    cache_config = configuration.profiler_config.get('cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+
+    max_size = cache_config.get('maxSize', DEFAULT_CACHE_MAX_SIZE)
+    path = os.path.join(FileSystem.PIPERIDER_WORKSPACE_PATH, 'cache', 'profile.db')
+    try:
+        return ProfileCache(path, max_size=max_size * 1024 * 1024)
+    except Exception as e:
+        console = Console()
+        console.print(f"[bold yellow]Warning:[/bold yellow] Failed to open the profile cache '{path}': {e}")
+        return None
+
+
 def get_git_branch():
     # NOTE: Provide git branch information directly for the archived dbt project without .git folder
     git_branch = os.environ.get('PIPERIDER_GIT_BRANCH', None)
@@ -530,6 +626,7 @@ class Runner:
         dbt_config = ds.args.get('dbt')
         dbt_manifest = None
         dbt_run_results = None
+        dbt_catalog = None
 
         if dbt_config:
             if not dbtutil.is_ready(dbt_config):
@@ -542,6 +639,8 @@ class Runner:
                 return 1
             dbt_manifest = dbtutil.get_dbt_manifest(dbt_target_path)
             dbt_run_results = dbtutil.get_dbt_run_results(dbt_target_path)
+            if configuration.profiler_config.get('dbtCatalog', False):
+                dbt_catalog = dbtutil.get_dbt_state_catalog(dbt_target_path, dbt_manifest, dbt_run_results)
             if dbt_select:
                 # If the dbt_resources were already provided by environment variable PIPERIDER_DBT_RESOURCES, skip the dbt select
                 dbt_resources = dbt_resources if dbt_resources else dbtutil.load_dbt_resources(dbt_target_path,
@@ -595,122 +694,170 @@ class Runner:
         run_result = {}
         profiler_result = {}
 
-        statistics = Statistics()
-        profiler = Profiler(ds, RichProfilerEventHandler([subject.name for subject in subjects]), configuration)
-
-        if skip_datasource_connection:
-            # Generate run result from dbt manifest
-            console.rule('Analyze dbt manifest')
-            profiler_result = profiler.collect_metadata_from_dbt_manifest(dbt_manifest, dbt_metadata_subjects, subjects)
-            console.rule('Skip Profile Data Source', style='dark_orange')
-            run_result.update(profiler_result)
-        else:
-            try:
-                event_payload.step = 'schema'
-                console.rule('Collect metadata')
-                profiler.collect_metadata(dbt_metadata_subjects, subjects)
-
-                event_payload.step = 'profile'
-                console.rule('Profile statistics')
-                profiler_result = profiler.profile(subjects, metadata_subjects=dbt_metadata_subjects)
-                run_result.update(profiler_result)
-            except NoSuchTableError as e:
-                console.print(f"[bold red]Error:[/bold red] No such table '{str(e)}'")
-                return 1
-            except Exception as e:
-                raise Exception(f'Profiler Exception: {type(e).__name__}(\'{e}\')')
-
-        statistics.reset()
-
-        # Query metrics
-        event_payload.step = 'metric'
-        if skip_datasource_connection is False:
-            console.rule('Query metrics')
-            metrics = []
-            if dbt_config:
-                metrics = dbtutil.get_dbt_state_metrics_16(dbt_target_path, dbt_config.get('tag'), dbt_resources)
-            statistics.display_statistic('query', 'metric')
-            if metrics:
-                run_result['metrics'] = MetricEngine(
-                    ds,
-                    metrics,
-                    RichMetricEventHandler([m.label for m in metrics])
-                ).execute()
-
-        # TODO: refactor input unused arguments
-
-        # DBT Test
-        event_payload.step = 'dbt test'
-        run_result['tests'] = []
-        if dbt_test_results:
-            console.rule('DBT Test Results')
-            _show_dbt_test_result(dbt_test_results)
-            run_result['tests'].extend(dbt_test_results)
-
-        if not table:
-            if dbt_config:
-                run_result['dbt'] = dict()
-                if dbt_manifest:
-                    def _slim_dbt_manifest(manifest):
-                        for key in manifest['nodes'].keys():
-                            raw_code = manifest['nodes'][key]['raw_code']
-                            sha1 = hashlib.sha1()
-                            sha1.update(raw_code.encode('utf-8'))
-                            manifest['nodes'][key]['raw_code'] = sha1.hexdigest()
-                        return manifest
-
-                    size = sys.getsizeof(dbt_manifest)
-                    if size > 1024 * 1024 * 10:
-                        # Reduce the manifest size if it's larger than 10MB
-                        run_result['dbt']['manifest'] = _slim_dbt_manifest(dbt_manifest)
-                    else:
-                        run_result['dbt']['manifest'] = dbt_manifest
-                if dbt_run_results:
-                    run_result['dbt']['run_results'] = dbt_run_results
-
-        for t in run_result['tables']:
-            _clean_up_profile_null_properties(run_result['tables'][t])
-
-        if dbt_config:
-            dbtutil.append_descriptions(run_result, dbt_target_path)
-
-        # Generate report
-        event_payload.step = 'report'
+        # the tables are written to run.json as they are profiled, the rest of the run result is written at the end
+        git_branch, git_sha = get_git_branch()
         run_result['id'] = run_id
         run_result['created_at'] = datetime_to_str(created_at)
-        git_branch, git_sha = get_git_branch()
         run_result['datasource'] = dict(name=ds.name, type=ds.type_name,
                                         git_branch=git_branch, git_sha=git_sha,
                                         skip_datasource=skip_datasource_connection)
-
-        decorate_with_metadata(run_result)
-
-        output_path = prepare_default_output_path(filesystem, created_at, ds)
+        output_path = get_default_output_path(filesystem, created_at, ds)
         output_file = os.path.join(output_path, 'run.json')
+        os.makedirs(output_path, exist_ok=True)
+        run_writer = RunResultWriter(output_file, run_result, run_format=configuration.run_format)
+        try:
+            statistics = Statistics()
+            previous_run = None
+            profile_cache = None
+            if not skip_datasource_connection:
+                if _uses_previous_run(configuration, ds):
+                    previous_run = _load_previous_run(filesystem, ds,
+                                                      incremental=configuration.profiler_config.get('incremental', False))
+                profile_cache = _open_profile_cache(configuration)
+
+            dbt_descriptions = dbtutil.get_descriptions(dbt_target_path) if dbt_config else {}
+
+            def _write_table(name: str, table_result: dict) -> dict:
+                _clean_up_profile_null_properties(table_result)
+                if dbt_config:
+                    dbtutil.append_table_descriptions(table_result, dbt_descriptions.get(name, []))
+                run_writer.write_table(name, table_result)
+                # only the summary of the table is kept after it is written
+                return {k: v for k, v in table_result.items() if k in _TABLE_SUMMARY_KEYS}
+
+            profiler = Profiler(ds, RichProfilerEventHandler([subject.name for subject in subjects]), configuration,
+                                previous_run=previous_run, cache=profile_cache, dbt_catalog=dbt_catalog,
+                                on_table_profiled=_write_table)
+
+            if skip_datasource_connection:
+                # Generate run result from dbt manifest
+                console.rule('Analyze dbt manifest')
+                profiler_result = profiler.collect_metadata_from_dbt_manifest(dbt_manifest, dbt_metadata_subjects, subjects)
+                console.rule('Skip Profile Data Source', style='dark_orange')
+                run_result.update(profiler_result)
+            else:
+                try:
+                    event_payload.step = 'schema'
+                    console.rule('Collect metadata')
+                    profiler.collect_metadata(dbt_metadata_subjects, subjects)
+
+                    event_payload.step = 'profile'
+                    console.rule('Profile statistics')
+                    profiler_result = profiler.profile(subjects, metadata_subjects=dbt_metadata_subjects)
+                    run_result.update(profiler_result)
+
+                    reused = [t for t in profiler_result.get('tables', {}).values() if t and t.get('reused_from')]
+                    if reused:
+                        console.print(f'Reused {len(reused)} unchanged tables from the previous run')
+                    if profile_cache is not None and profile_cache.hits:
+                        console.print(f'Reused {profile_cache.hits} columns from the profile cache')
+                except NoSuchTableError as e:
+                    console.print(f"[bold red]Error:[/bold red] No such table '{str(e)}'")
+                    return 1
+                except Exception as e:
+                    raise Exception(f'Profiler Exception: {type(e).__name__}(\'{e}\')')
+                finally:
+                    if profile_cache is not None:
+                        profile_cache.close()
+
+            statistics.reset()
+
+            # Query metrics
+            event_payload.step = 'metric'
+            if skip_datasource_connection is False:
+                console.rule('Query metrics')
+                metrics = []
+                if dbt_config:
+                    metrics = dbtutil.get_dbt_state_metrics_16(dbt_target_path, dbt_config.get('tag'), dbt_resources)
+                statistics.display_statistic('query', 'metric')
+                if metrics:
+                    run_result['metrics'] = MetricEngine(
+                        ds,
+                        metrics,
+                        RichMetricEventHandler([m.label for m in metrics])
+                    ).execute()
+
+            # TODO: refactor input unused arguments
+
+            # DBT Test
+            event_payload.step = 'dbt test'
+            run_result['tests'] = []
+            if dbt_test_results:
+                console.rule('DBT Test Results')
+                _show_dbt_test_result(dbt_test_results)
+                run_result['tests'].extend(dbt_test_results)
+
+            if not table:
+                if dbt_config:
+                    run_result['dbt'] = dict()
+                    if dbt_manifest:
+                        def _slim_dbt_manifest(manifest):
+                            # the manifest is shared by the manifest cache, so the nodes are copied instead of modified
+                            nodes = {}
+                            for key, node in manifest['nodes'].items():
+                                sha1 = hashlib.sha1()
+                                sha1.update(node['raw_code'].encode('utf-8'))
+                                nodes[key] = dict(node, raw_code=sha1.hexdigest())
+                            return dict(manifest, nodes=nodes)
+
+                        size = sys.getsizeof(dbt_manifest)
+                        if size > 1024 * 1024 * 10:
+                            # Reduce the manifest size if it's larger than 10MB
+                            run_result['dbt']['manifest'] = _slim_dbt_manifest(dbt_manifest)
+                        else:
+                            run_result['dbt']['manifest'] = dbt_manifest
+                    if dbt_run_results:
+                        run_result['dbt']['run_results'] = dbt_run_results
+
+            # the tables not profiled, e.g. the metadata of the dbt models, are written with the rest of the run result
+            remaining_tables = {t: v for t, v in run_result['tables'].items() if t not in run_writer.written}
+            for t in remaining_tables:
+                _clean_up_profile_null_properties(remaining_tables[t])
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(json.dumps(run_result, separators=(',', ':')))
-
-        if dbt_config:
-            abs_dir = os.path.abspath(dbt_target_path)
-            dbt_state_files = ['manifest.json', 'run_results.json', 'index.html', 'catalog.json']
-            dbt_output_dir = os.path.join(output_path, 'dbt')
-            os.makedirs(dbt_output_dir, exist_ok=True)
-            for file in dbt_state_files:
-                abs_file_path = os.path.join(abs_dir, file)
-                if not os.path.exists(abs_file_path):
-                    continue
-                shutil.copy2(abs_file_path, dbt_output_dir)
-
-        if output:
-            clone_directory(output_path, output)
-
-        if skip_report:
-            console.print(f'Results saved to {output if output else output_path}')
+            if dbt_config:
+                dbtutil.append_descriptions(dict(tables=remaining_tables), dbt_target_path)
 
-        _analyse_run_event(event_payload, run_result, dbt_test_results)
+            # Generate report
+            event_payload.step = 'report'
+            decorate_with_metadata(run_result)
 
-        if len(subjects) == 0 and len(run_result.get('metrics', [])) == 0 and not skip_datasource_connection:
-            return EC_WARN_NO_PROFILED_MODULES
+            prepare_default_output_path(filesystem, created_at, ds)
+            run_header = run_writer.close(run_result)
+            report_index = ReportIndex(filesystem.get_output_dir())
+            if not report_index.exists:
+                # index the outputs written before the index, e.g. by the older versions
+                report_index.build()
+            report_index.update(output_file, run_header)
+            report_index.save()
 
-        return 0
+            if dbt_config:
+                abs_dir = os.path.abspath(dbt_target_path)
+                dbt_state_files = ['manifest.json', 'run_results.json', 'index.html', 'catalog.json']
+                dbt_output_dir = os.path.join(output_path, 'dbt')
+                os.makedirs(dbt_output_dir, exist_ok=True)
+                for file in dbt_state_files:
+                    abs_file_path = os.path.join(abs_dir, file)
+                    if not os.path.exists(abs_file_path):
+                        continue
+                    shutil.copy2(abs_file_path, dbt_output_dir)
+
+            if output:
+                clone_directory(output_path, output)
+                # the header is only used to list the runs in the output directory of PipeRider
+                output_header = os.path.join(output, RUN_HEADER_FILE)
+                if os.path.exists(output_header):
+                    os.remove(output_header)
+
+            if skip_report:
+                console.print(f'Results saved to {output if output else output_path}')
+
+            _analyse_run_event(event_payload, run_result, dbt_test_results)
+
+            if len(subjects) == 0 and len(run_result.get('metrics', [])) == 0 and not skip_datasource_connection:
+                return EC_WARN_NO_PROFILED_MODULES
+
+            return 0
+        finally:
+            # remove the partial run.json and its directory if the run is failed
+            if run_writer.abort() and not os.listdir(output_path):
+                os.rmdir(output_path)
@@ -0,0 +1,389 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Dict, List, Optional, Tuple
+
+from piperider_cli.error import PipeRiderRunFormatError
+
+RUN_HEADER_FILE = 'run.header.json'
+REPORT_INDEX_FILE = 'index.jsonl'
+
+# the formats of run.json, the compressed formats are detected by the magic numbers, so the file name is unchanged
+RUN_FORMATS = ['json', 'gzip', 'zstd']
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# the keys written first, so the beginning of run.json identifies the run
+_HEADER_KEYS = ['id', 'created_at', 'datasource']
+# the levels of nested objects written item by item, e.g. run_result > tables > table or dbt > manifest > nodes
+_STREAMING_DEPTH = 3
+
+
+def summarize_run_result(run_result: dict) -> dict:
+    """
+    The summary of the run result to list and select the reports without loading the run.json.
+    """
+    pass_count = 0
+    fail_count = 0
+    for test in run_result.get('tests', []):
+        if test.get('status') == 'passed':
+            pass_count += 1
+        else:
+            fail_count += 1
+
+    return dict(
+        id=run_result['id'],
+        name=run_result['datasource']['name'],
+        created_at=run_result['created_at'],
+        table_count=len(run_result.get('tables', {}).keys()),
+        pass_count=pass_count,
+        fail_count=fail_count,
+        cloud=run_result.get('cloud'),
+    )
+
+
+def _write_json(f, encoder: json.JSONEncoder, value, depth: int):
+    if depth <= 0 or not isinstance(value, dict):
+        f.write(encoder.encode(value))
+        return
+
+    f.write('{')
+    for i, (key, item) in enumerate(value.items()):
+        if i > 0:
+            f.write(',')
+        # the non-string keys are converted as the json module does, e.g. True to "true"
+        f.write(encoder.encode(key if isinstance(key, str) else encoder.encode(key)))
+        f.write(':')
+        _write_json(f, encoder, item, depth - 1)
+    f.write('}')
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise PipeRiderRunFormatError('The zstd run result requires the zstandard package', 'zstd')
+
+
+def detect_run_format(run_json_path: str) -> str:
+    """
+    :return: the format of run.json, one of RUN_FORMATS
+    """
+    with open(run_json_path, 'rb') as f:
+        magic = f.read(len(_ZSTD_MAGIC))
+    if magic.startswith(_GZIP_MAGIC):
+        return 'gzip'
+    elif magic == _ZSTD_MAGIC:
+        return 'zstd'
+    return 'json'
+
+
+def _open_binary(run_json_path: str) -> IO[bytes]:
+    run_format = detect_run_format(run_json_path)
+    if run_format == 'gzip':
+        return gzip.open(run_json_path, 'rb')
+    elif run_format == 'zstd':
+        zstandard = _import_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(open(run_json_path, 'rb'), closefd=True)
+    return open(run_json_path, 'rb')
+
+
+def open_run_json(run_json_path: str) -> IO[str]:
+    """
+    Open run.json for reading in any of RUN_FORMATS.
+    """
+    return io.TextIOWrapper(_open_binary(run_json_path), encoding='utf-8')
+
+
+def load_run_result(run_json_path: str) -> dict:
+    """
+    Load the run result from run.json in any of RUN_FORMATS.
+    """
+    with open_run_json(run_json_path) as f:
+        return json.load(f)
+
+
+@contextmanager
+def open_run_json_as_plain(run_json_path: str):
+    """
+    Open run.json as the plain JSON in bytes, e.g. to upload it. The compressed run.json is decompressed to a temporary
+    file.
+    """
+    if detect_run_format(run_json_path) == 'json':
+        with open(run_json_path, 'rb') as f:
+            yield f
+        return
+
+    with tempfile.TemporaryFile() as tmp:
+        with _open_binary(run_json_path) as f:
+            shutil.copyfileobj(f, tmp)
+        tmp.seek(0)
+        yield tmp
+
+
+def _open_for_write(path: str, run_format: str) -> IO[str]:
+    if run_format == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8')
+    elif run_format == 'zstd':
+        zstandard = _import_zstandard()
+        writer = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+        return io.TextIOWrapper(writer, encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def _header_path(run_json_path: str) -> str:
+    return os.path.join(os.path.dirname(run_json_path), RUN_HEADER_FILE)
+
+
+class RunResultWriter:
+    """
+    Stream the run result to run.json. The tables are written one by one when they are profiled, so the profiled
+    tables are not kept in memory until the end of the run, and the rest of the run result is written by close().
+
+    The run result is written table by table and node by node, instead of encoding the whole run result, including the
+    dbt manifest, to one string in memory. The run.json is written to a temporary file and renamed by close(), so the
+    readers never see a partial file.
+
+    The compressed formats shrink the keys repeated in every column and the dbt manifest. The readers detect the format
+    by the content, so run.json keeps its name in all the formats.
+    """
+
+    def __init__(self, run_json_path: str, header: dict, run_format: str = 'json'):
+        """
+        :param run_json_path: the path of run.json
+        :param header: the keys written before the tables, i.e. id, created_at and datasource
+        :param run_format: the format of run.json, one of RUN_FORMATS
+        """
+        self.run_json_path = run_json_path
+        self.tmp_path = f'{run_json_path}.tmp'
+        self.header = {key: header[key] for key in _HEADER_KEYS if key in header}
+        self.written = set()
+        self.encoder = json.JSONEncoder(separators=(',', ':'))
+        self._file = _open_for_write(self.tmp_path, run_format)
+        self._file.write('{')
+        for key, value in self.header.items():
+            self._write_item(key, value, _STREAMING_DEPTH - 1)
+            self._file.write(',')
+        self._file.write(self.encoder.encode('tables'))
+        self._file.write(':{')
+
+    def _write_item(self, key: str, value, depth: int):
+        self._file.write(self.encoder.encode(key))
+        self._file.write(':')
+        _write_json(self._file, self.encoder, value, depth)
+
+    def write_table(self, name: str, table_result: dict):
+        """
+        Write the result of a table, the caller may release it afterwards.
+        """
+        if self.written:
+            self._file.write(',')
+        self._write_item(name, table_result, _STREAMING_DEPTH - 2)
+        self.written.add(name)
+
+    def close(self, run_result: dict) -> dict:
+        """
+        Write the tables not written yet and the rest of the run result, and then write the header to run.header.json.
+
+        :param run_result: the run result, the tables written by write_table() are skipped
+        :return: the header of run.json
+        """
+        tables = run_result.get('tables') or {}
+        for name, table_result in tables.items():
+            if name not in self.written:
+                self.write_table(name, table_result)
+        self._file.write('}')
+        for key, value in run_result.items():
+            if key not in self.header and key != 'tables':
+                self._file.write(',')
+                self._write_item(key, value, _STREAMING_DEPTH - 1)
+        self._file.write('}')
+        self._file.close()
+        self._file = None
+        os.replace(self.tmp_path, self.run_json_path)
+
+        stat = os.stat(self.run_json_path)
+        header = summarize_run_result(dict(run_result, **self.header,
+                                           tables=dict.fromkeys(self.written.union(tables.keys()))))
+        header['run_json'] = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        with open(_header_path(self.run_json_path), 'w', encoding='utf-8') as f:
+            f.write(self.encoder.encode(header))
+        return header
+
+    def abort(self) -> bool:
+        """
+        Remove the partial run.json if the writer is not closed, e.g. the run is failed.
+
+        :return: True if the partial run.json is removed
+        """
+        if self._file is None:
+            return False
+        self._file.close()
+        self._file = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        return True
+
+
+def write_run_result(run_json_path: str, run_result: dict, run_format: str = 'json'):
+    """
+    Write the whole run result to run.json and its header to run.header.json.
+
+    :param run_json_path: the path of run.json
+    :param run_result: the run result
+    :param run_format: the format of run.json, one of RUN_FORMATS
+    :return: the header of run.json
+    """
+    writer = RunResultWriter(run_json_path, run_result, run_format=run_format)
+    try:
+        return writer.close(run_result)
+    finally:
+        writer.abort()
+
+
+def read_run_header(run_json_path: str) -> Optional[dict]:
+    """
+    Read the header of run.json written by write_run_result.
+
+    :return: the summary of the run result, or None if the header is absent or the run.json was changed after the
+        header was written, e.g. by the older versions
+    """
+    try:
+        stat = os.stat(run_json_path)
+        with open(_header_path(run_json_path), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        run_json = header.pop('run_json')
+        if run_json.get('size') != stat.st_size or run_json.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+        return header
+    except Exception:
+        return None
+
+
+def find_run_jsons(path: str) -> List[str]:
+    """
+    Find the run.json files in the directories under the path, except the 'latest' links.
+    """
+    run_jsons = []
+    for root, dirs, _ in os.walk(path):
+        for dir_name in dirs:
+            if dir_name == 'latest':
+                continue
+            run_json = os.path.join(root, dir_name, 'run.json')
+            if os.path.exists(run_json):
+                run_jsons.append(run_json)
+    return run_jsons
+
+
+class ReportIndex:
+    """
+    The index of the run.json files in the output directory of PipeRider, so the reports are listed without reading
+    the run.json files. The index is a JSON lines file, each line is the header of a run.json with its path relative to
+    the output directory. The lines are appended when the runs are written, and the last line of a path wins.
+
+    The index is only written to the output directory of PipeRider, the other directories are read-only.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.index_path = os.path.join(output_dir, REPORT_INDEX_FILE)
+        self.entries: Dict[str, dict] = {}
+        self.line_count = 0
+        self.pending = []
+        self.exists = os.path.exists(self.index_path)
+        self._load()
+
+    def _load(self):
+        if not self.exists:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['path']] = entry
+                        self.line_count += 1
+                    except Exception:
+                        # ignore the line partially written
+                        continue
+        except Exception:
+            self.entries = {}
+            self.line_count = 0
+
+    def _key(self, run_json_path: str) -> str:
+        return os.path.relpath(os.path.abspath(run_json_path), os.path.abspath(self.output_dir)).replace(os.sep, '/')
+
+    def outputs(self) -> List[Tuple[str, dict]]:
+        """
+        :return: the list of the path of each indexed run.json and its summary, the size of the run.json is in the
+            'run_json' field of the summary
+        """
+        return [(os.path.join(self.output_dir, *key.split('/')), {k: v for k, v in entry.items() if k != 'path'})
+                for key, entry in self.entries.items()]
+
+    def build(self):
+        """
+        Index all the run.json files in the output directory, e.g. the index is absent because the runs were written
+        by the older versions. The run.json files without the header are read entirely.
+        """
+        for run_json in find_run_jsons(self.output_dir):
+            summary = read_run_header(run_json)
+            if summary is None:
+                try:
+                    summary = summarize_run_result(load_run_result(run_json))
+                except Exception:
+                    # the invalid run.json is not listed
+                    continue
+            self.update(run_json, summary)
+
+    def update(self, run_json_path: str, summary: dict):
+        """
+        Index the summary of the run.json when it is written. The change is written to the index file by save().
+        """
+        try:
+            stat = os.stat(run_json_path)
+        except OSError:
+            return
+        entry = dict(path=self._key(run_json_path), **{k: v for k, v in summary.items() if k != 'run_json'})
+        entry['run_json'] = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self.entries[entry['path']] = entry
+        self.pending.append(entry)
+
+    def save(self):
+        """
+        Append the updated entries to the index file. The index file is rewritten if most of the lines are outdated.
+        """
+        try:
+            if self.line_count + len(self.pending) > 2 * len(self.entries) + 16:
+                tmp_path = f'{self.index_path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for entry in self.entries.values():
+                        f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                os.replace(tmp_path, self.index_path)
+                self.line_count = len(self.entries)
+            elif self.pending:
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in self.pending))
+                self.line_count += len(self.pending)
+            self.exists = True
+        except OSError:
+            # the index is only a cache, the reports are still listed by walking through the output directory
+            pass
+        self.pending = []
+
+
+def update_report_index(run_json_path: str, header: dict):
+    """
+    Update the index of the output directory of the run.json after it is rewritten, e.g. by the cloud upload. The
+    run.json in the directories not indexed by PipeRider is skipped.
+    """
+    index = ReportIndex(os.path.dirname(os.path.dirname(os.path.abspath(run_json_path))))
+    if not index.exists:
+        return
+    index.update(run_json_path, header)
+    index.save()
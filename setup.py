@@ -75,6 +75,13 @@ setup(name='piperider',
           'duckdb': duckdb_require_packages,
           'csv': duckdb_require_packages,
           'parquet': duckdb_require_packages,
+          'columnar': [
+              'pyarrow>=8.0',
+              'numpy',
+          ],
+          'zstd': [
+              'zstandard',
+          ],
           'dev': [
               'tox',
               'pytest>=4.6',
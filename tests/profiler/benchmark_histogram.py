@@ -0,0 +1,84 @@
+"""
+Compare the histogram queries by the CASE expression and by the bucket arithmetic.
+
+    python -m tests.profiler.benchmark_histogram --rows 1000000 --repeat 3
+"""
+import argparse
+import time
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, create_engine, func, select
+
+from piperider_cli.profiler.profiler import histogram_bins, histogram_bucket, histogram_bucket_case, \
+    query_histogram_counts
+
+
+def _create_table(engine, rows: int) -> Table:
+    metadata = MetaData()
+    table = Table('benchmark', metadata, Column('f', Float), Column('i', Integer))
+    metadata.create_all(engine)
+
+    # generate the rows in the database, inserting them by the client is much slower than the queries to measure
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql(f"""
+                WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r WHERE x < {rows})
+                INSERT INTO benchmark SELECT (random() % 100000) / 1000.0, abs(random() % 100000) FROM r
+            """)
+        else:
+            conn.exec_driver_sql(f"""
+                INSERT INTO benchmark SELECT (random() - 0.5) * 200, floor(random() * 100000) FROM range({rows})
+            """)
+    return table
+
+
+def _measure(fn, repeat: int) -> float:
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+def benchmark(url: str, rows: int, repeat: int):
+    engine = create_engine(url)
+    table = _create_table(engine, rows)
+    backend = engine.dialect.name
+
+    with engine.connect() as conn:
+        for column, is_integer in [(table.c.f, False), (table.c.i, True)]:
+            _min, _max = conn.execute(select(func.min(column), func.max(column))).fetchone()
+            interval, num_buckets, _, _ = histogram_bins(_min, _max, is_integer)
+
+            case = histogram_bucket_case(column, _min, interval, num_buckets)
+            arithmetic = histogram_bucket(backend, column, _min, interval, num_buckets)
+            expected = query_histogram_counts(conn, table, column, case, num_buckets)
+            counts = query_histogram_counts(conn, table, column, arithmetic, num_buckets)
+            mismatches = sum(1 for a, b in zip(expected, counts) if a != b)
+
+            case_elapsed = _measure(lambda: query_histogram_counts(conn, table, column, case, num_buckets), repeat)
+            arithmetic_elapsed = _measure(
+                lambda: query_histogram_counts(conn, table, column, arithmetic, num_buckets), repeat)
+            print(f'{backend:8} {column.name}  buckets={num_buckets:3}  case={case_elapsed * 1000:8.1f}ms  '
+                  f'arithmetic={arithmetic_elapsed * 1000:8.1f}ms  '
+                  f'speedup={case_elapsed / arithmetic_elapsed:5.2f}x  mismatched_buckets={mismatches}')
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark('sqlite://', args.rows, args.repeat)
+    try:
+        import duckdb_engine  # noqa: F401
+    except ImportError:
+        print('duckdb is not installed, skip')
+        return
+    benchmark('duckdb:///:memory:', args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
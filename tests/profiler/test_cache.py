@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+from piperider_cli.profiler.cache import ProfileCache
+
+
+class TestProfileCache:
+
+    def setup_method(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache', 'profile.db')
+
+    def teardown_method(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        cache = ProfileCache(self.path)
+        key = ProfileCache.make_key('ds', 'main.test', 'num', 'INTEGER', {}, 'fingerprint')
+        assert cache.get(key) is None
+        cache.put(key, {'distinct': 3, 'topk': {'values': ['1'], 'counts': [2]}})
+        assert cache.get(key) == {'distinct': 3, 'topk': {'values': ['1'], 'counts': [2]}}
+        assert cache.hits == 1
+        assert cache.misses == 1
+        cache.close()
+
+        # persistent
+        cache = ProfileCache(self.path)
+        assert cache.get(key)['distinct'] == 3
+        cache.close()
+
+    def test_key(self):
+        key = ProfileCache.make_key('ds', 'main.test', 'num', 'INTEGER', {'fused': True}, 'fingerprint')
+        assert key == ProfileCache.make_key('ds', 'main.test', 'num', 'INTEGER', {'fused': True}, 'fingerprint')
+        assert key != ProfileCache.make_key('ds', 'main.test', 'num', 'BIGINT', {'fused': True}, 'fingerprint')
+        assert key != ProfileCache.make_key('ds', 'main.test', 'num', 'INTEGER', {}, 'fingerprint')
+        assert key != ProfileCache.make_key('ds', 'main.test', 'num', 'INTEGER', {'fused': True}, 'fingerprint2')
+
+    def test_lru_eviction(self):
+        value = {'value': 'x' * 100}
+        size = len('{"value":"' + 'x' * 100 + '"}')
+        cache = ProfileCache(self.path, max_size=size * 3)
+        cache.put('a', value)
+        cache.put('b', value)
+        cache.put('c', value)
+        assert cache.get('a') is not None
+
+        # 'b' is the least recently used
+        cache.put('d', value)
+        assert cache.size() <= size * 3
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert cache.get('d') is not None
+
+        # too large to cache
+        cache.put('e', {'value': 'x' * 1000})
+        assert cache.get('e') is None
+        cache.close()
@@ -0,0 +1,117 @@
+import csv
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pa = pytest.importorskip('pyarrow')
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.duckdb import CsvDataSource, ParquetDataSource
+from piperider_cli.profiler import Profiler, ProfileSubject
+from piperider_cli.profiler.columnar import ValueCounts, _quantiles
+
+
+def test_quantiles():
+    values = np.array([1000.0, 10.0, 500.0, 100.0, 750.0])
+    counts = np.array([1, 1, 2, 1, 5])
+    # the sorted values are 10, 100, 500, 500, 750, 750, 750, 750, 750, 1000
+    assert _quantiles(values, counts, [0, 5, 25, 50, 95, 100]) == {
+        0: 10, 5: 10, 25: 500, 50: 750, 95: 1000, 100: 1000,
+    }
+
+
+def test_columnar_engine_without_pyarrow(monkeypatch, capsys):
+    monkeypatch.setattr('importlib.util.find_spec', lambda name: None if name == 'pyarrow' else object())
+    config = Configuration([], profiler={'engine': 'columnar'})
+    assert config.profiler_config['engine'] == 'warehouse'
+    assert 'pyarrow' in capsys.readouterr().out
+
+
+def test_value_counts(monkeypatch):
+    monkeypatch.setattr('piperider_cli.profiler.columnar.VALUE_COUNTS_MERGE_SIZE', 4)
+    value_counts = ValueCounts()
+    value_counts.update(pa.array(['a', 'b', 'a']))
+    value_counts.update(pa.array(['c', 'b', 'd', 'e']))
+    value_counts.update(pa.array(['a']))
+    values, counts = value_counts.result()
+    assert dict(zip(values.to_pylist(), counts.tolist())) == {'a': 3, 'b': 2, 'c': 1, 'd': 1, 'e': 1}
+
+
+def _write_csv(path, rows=3000):
+    random.seed(1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'price', 'name', 'created_at', 'flag'])
+        for i in range(rows):
+            writer.writerow([
+                i % 50 if i % 7 else '',
+                round(random.uniform(-100, 1000), 2),
+                f'name{i % 30}' if i % 11 else '',
+                (datetime(2022, 1, 1) + timedelta(hours=i * 5)).isoformat(sep=' '),
+                'true' if i % 3 else 'false',
+            ])
+
+
+def _compare(expected, result):
+    for name, column in expected['columns'].items():
+        actual = result['columns'][name]
+        assert actual['type'] == column['type']
+        assert actual['schema_type'] == column['schema_type']
+        for metric, value in column.items():
+            if metric in ['profile_duration', 'elapsed_milli', 'topk', 'approximates']:
+                continue
+            if metric in ['p5', 'p25', 'p50', 'p75', 'p95']:
+                # the quantiles of DuckDB are estimated by approx_quantile
+                assert actual[metric] == pytest.approx(value, rel=0.05, abs=1), (name, metric)
+            elif isinstance(value, float):
+                assert actual[metric] == pytest.approx(value), (name, metric)
+            else:
+                assert actual[metric] == value, (name, metric)
+
+        if column.get('topk'):
+            # the order of the values with the same count depends on the engine
+            assert actual['topk']['counts'] == column['topk']['counts']
+
+
+def test_columnar_csv(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    _write_csv(path)
+    data_source = CsvDataSource('csv', credential={'path': path})
+    subjects = [ProfileSubject('data', ref_id='data')]
+
+    expected = Profiler(data_source).profile(subjects)['tables']['data']
+    config = Configuration([], profiler={'engine': 'columnar'})
+    result = Profiler(data_source, config=config).profile(subjects)['tables']['data']
+
+    assert 'approximates' not in result['columns']['price']
+    assert result['columns']['price']['histogram']['counts'] == expected['columns']['price']['histogram']['counts']
+    _compare(expected, result)
+
+    # configured percentiles
+    config = Configuration([], profiler={'engine': 'columnar', 'percentiles': [10, 99]})
+    result = Profiler(data_source, config=config).profile(subjects)['tables']['data']
+    assert list(result['columns']['price']['quantiles'].keys()) == ['p10', 'p99']
+
+    # limit
+    config = Configuration([], profiler={'engine': 'columnar', 'table': {'limit': 100}})
+    result = Profiler(data_source, config=config).profile(subjects)['tables']['data']
+    assert result['columns']['id']['samples'] == 100
+    assert result['columns']['name']['samples'] == 100
+
+
+def test_columnar_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    csv_path = str(tmp_path / 'data.csv')
+    _write_csv(csv_path)
+    path = str(tmp_path / 'data.parquet')
+    pq.write_table(pa.csv.read_csv(csv_path), path, row_group_size=1000)
+
+    data_source = ParquetDataSource('parquet', credential={'path': path})
+    subjects = [ProfileSubject('data', ref_id='data')]
+    expected = Profiler(data_source).profile(subjects)['tables']['data']
+    config = Configuration([], profiler={'engine': 'columnar'})
+    result = Profiler(data_source, config=config).profile(subjects)['tables']['data']
+    assert 'approximates' not in result['columns']['price']
+    _compare(expected, result)
@@ -0,0 +1,104 @@
+import random
+from collections import Counter
+
+import pytest
+from sqlalchemy import *
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from piperider_cli.profiler import duplicates
+from piperider_cli.profiler.duplicates import RowHashCounter, count_duplicate_rows
+
+ROWS = [
+    (1, 'aaa', 18.5),
+    (1, 'aaa', 18.5),
+    (1, 'aaa', 18.5),
+    (1, 'aaa', 21.0),
+    (1, None, 21.0),
+    (1, None, 21.0),
+    (1, '', 21.0),
+    (None, None, None),
+]
+
+
+def _create_table(engine):
+    metadata = MetaData()
+    table = Table('dup', metadata, Column('id', Integer), Column('name', String), Column('price', Float))
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(table.insert(), [dict(id=a, name=b, price=c) for a, b, c in ROWS])
+    return table
+
+
+def _no_exception(monkeypatch):
+    def _raise(e):
+        raise e
+
+    monkeypatch.setattr(duplicates, 'capture_exception', _raise)
+
+
+class TestDuplicates:
+
+    def test_sqlite(self, monkeypatch):
+        _no_exception(monkeypatch)
+        engine = create_engine('sqlite://')
+        table = _create_table(engine)
+        assert count_duplicate_rows(engine, table) == 5
+        assert count_duplicate_rows(engine, table, limit=4) == 3
+
+    def test_duckdb(self, monkeypatch):
+        _no_exception(monkeypatch)
+        engine = create_engine('duckdb:///:memory:')
+        table = _create_table(engine)
+        assert count_duplicate_rows(engine, table) == 5
+
+    def test_client_side_fallback(self, monkeypatch):
+        engine = create_engine('sqlite://')
+        table = _create_table(engine)
+
+        def _count_by_columns(*args):
+            raise ProgrammingError('SELECT ...', {}, Exception('not groupable'))
+
+        monkeypatch.setattr(duplicates, 'row_hash', lambda conn, columns: None)
+        monkeypatch.setattr(duplicates, '_count_by_columns', _count_by_columns)
+        assert count_duplicate_rows(engine, table) == 5
+        assert count_duplicate_rows(engine, table, limit=4) == 3
+
+    def test_client_side_fallback_errors(self, monkeypatch):
+        engine = create_engine('sqlite://')
+        table = _create_table(engine)
+        monkeypatch.setattr(duplicates, 'row_hash', lambda conn, columns: None)
+
+        def _count_by_columns(*args):
+            raise OperationalError('SELECT ...', {}, Exception('timeout'))
+
+        # the operational errors are not retried on the client side
+        monkeypatch.setattr(duplicates, '_count_by_columns', _count_by_columns)
+        with pytest.raises(OperationalError):
+            count_duplicate_rows(engine, table)
+
+        def _count_by_columns(*args):
+            raise ProgrammingError('SELECT ...', {}, Exception('not groupable'))
+
+        # the remote backends are only counted on the client side with a limit
+        monkeypatch.setattr(duplicates, '_count_by_columns', _count_by_columns)
+        monkeypatch.setattr(duplicates, 'DUPLICATE_ROWS_CLIENT_BACKENDS', [])
+        with pytest.raises(ProgrammingError):
+            count_duplicate_rows(engine, table)
+        assert count_duplicate_rows(engine, table, limit=4) == 3
+
+    def test_counter_spill(self):
+        random.seed(1)
+        rows = [(random.randint(0, 300), random.choice(['a', 'b', None])) for _ in range(2000)]
+        expected = sum(c for c in Counter(rows).values() if c > 1)
+
+        counter = RowHashCounter(memory_limit=50, partitions=4)
+        for row in rows:
+            counter.add(row)
+        assert counter._tmpdir is not None
+        assert counter.duplicates() == expected
+        assert counter._tmpdir is None
+
+        counter = RowHashCounter()
+        for row in rows:
+            counter.add(row)
+        assert counter.duplicates() == expected
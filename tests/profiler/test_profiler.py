@@ -1,4 +1,7 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+import os
+
+import pytest
 
 from piperider_cli.configuration import Configuration
 from piperider_cli.datasource.sqlite import SqliteDataSource
@@ -19,6 +22,11 @@ class TestProfiler:
         self.engine = self.data_source.get_engine_by_database()
         return self.data_source
 
+    def test_default_event_handler(self):
+        data_source = self.create_data_source()
+        # the default event handler keeps the progress of each profiling, it is not shared by the profilers
+        assert Profiler(data_source).event_handler is not Profiler(data_source).event_handler
+
     def test_basic_profile(self):
         data_source = self.create_data_source()
 
@@ -39,6 +47,28 @@ class TestProfiler:
         assert "test1" in result["tables"]
         assert "test2" not in result["tables"]
 
+    def test_on_table_profiled(self):
+        data_source = self.create_data_source()
+        data = [
+            ("user_id", "user_name", "age"),
+            (1, "bob", 23),
+            (2, "alice", 25),
+        ]
+        create_table(self.engine, "test1", data)
+        create_table(self.engine, "test2", data)
+
+        profiled = {}
+
+        def _on_table_profiled(name, table_result):
+            profiled[name] = table_result
+            return dict(name=name, row_count=table_result['row_count'])
+
+        result = Profiler(data_source, on_table_profiled=_on_table_profiled).profile()
+        assert sorted(profiled.keys()) == ["test1", "test2"]
+        assert profiled["test1"]["columns"]["age"]["max"] == 25
+        # the results are replaced by the returned ones
+        assert result["tables"]["test1"] == dict(name="test1", row_count=2)
+
     def test_integer_metrics(self):
         data_source = self.create_data_source()
         data = [
@@ -709,3 +739,848 @@ class TestProfiler:
         result = profiler.profile()
         assert result["tables"]["dup"]['duplicate_rows'] == 3
         assert almost_equal(result["tables"]["dup"]['duplicate_rows_p'], 3 / 4)
+
+    def test_fused_profile(self):
+        def _strip_durations(result):
+            for column in result['columns'].values():
+                del column['profile_duration']
+                del column['elapsed_milli']
+            return result['columns']
+
+        data = [
+            ('id', 'name', 'price', 'created_at', 'enabled'),
+            (1, 'aaa', 1.5, datetime(2022, 1, 1), True),
+            (2, 'bbb', -3.0, datetime(2022, 1, 2), False),
+            (3, '', 0.0, datetime(2022, 1, 5), True),
+            (4, 'aaa', None, None, None),
+        ]
+        columns = [
+            Column('id', Integer),
+            Column('name', String),
+            Column('price', Float),
+            Column('created_at', DateTime),
+            Column('enabled', Boolean),
+        ]
+
+        for table_config in [{}, {'limit': 3}]:
+            data_source = self.create_data_source()
+            create_table(self.engine, "test", data, columns=[c.copy() for c in columns])
+            profiler = Profiler(data_source, config=Configuration([], profiler={'table': table_config}))
+            expected = _strip_durations(profiler.profile()["tables"]["test"])
+
+            profiler = Profiler(data_source, config=Configuration([], profiler={'table': table_config, 'fused': True}))
+            fused = _strip_durations(profiler.profile()["tables"]["test"])
+            assert fused == expected
+
+    def test_approximate_profile(self):
+        data_source = self.create_data_source()
+        data = [
+            ('num', 'str'),
+            (1, 'aaa'),
+            (1, 'aaa'),
+            (2, 'bbb'),
+            (3, None),
+        ]
+        create_table(self.engine, "test", data)
+
+        profiler = Profiler(data_source, config=Configuration([], profiler={'approximate': True}))
+        result = profiler.profile()["tables"]["test"]['columns']
+
+        # the sketches are exact for small tables
+        assert result['num']['distinct'] == 3
+        assert result['num']['non_duplicates'] == 2
+        assert result['num']['duplicates'] == 2
+        assert result['num']['topk']['values'][0] == '1'
+        assert result['num']['topk']['counts'][0] == 2
+        assert result['str']['distinct'] == 2
+        assert result['str']['non_duplicates'] == 1
+        assert result['str']['topk']['values'] == ['aaa', 'bbb']
+        assert 'approximates' not in result['str']
+
+    def test_approximate_profile_large_table(self):
+        data_source = self.create_data_source()
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer))
+        table.create(bind=self.engine)
+        with self.engine.connect() as conn:
+            conn.execute(insert(table), [{'num': i % 8000} for i in range(10000)])
+
+        profiler = Profiler(data_source, config=Configuration([], profiler={'approximate': True}))
+        result = profiler.profile()["tables"]["test"]['columns']['num']
+
+        assert abs(result['distinct'] - 8000) / 8000 < 0.05
+        assert abs(result['non_duplicates'] - 6000) / 6000 < 0.1
+        assert result['approximates']['distinct']['method'] == 'hyperloglog'
+        assert result['approximates']['non_duplicates']['method'] == 'kmv'
+        assert result['topk']['counts'][0] >= 2
+
+    def test_approximate_profile_remote_table(self, monkeypatch):
+        from piperider_cli.profiler import profiler as profiler_module
+        from piperider_cli.profiler.profiler import BaseColumnProfiler
+
+        data_source = self.create_data_source()
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer))
+        table.create(bind=self.engine)
+        with self.engine.connect() as conn:
+            conn.execute(insert(table), [{'num': i % 8000} for i in range(10000)])
+
+        # the large columns of a remote backend are not streamed to the sketches
+        monkeypatch.setattr(profiler_module, 'SKETCH_LOCAL_BACKENDS', [])
+        monkeypatch.setattr(profiler_module, 'SKETCH_MAX_VALUES', 1000)
+        monkeypatch.setattr(BaseColumnProfiler, '_get_sketches', lambda *args: pytest.fail('the values are streamed'))
+
+        profiler = Profiler(data_source, config=Configuration([], profiler={'approximate': True}))
+        result = profiler.profile()["tables"]["test"]['columns']['num']
+
+        assert result['distinct'] == 8000
+        assert result['non_duplicates'] == 6000
+        assert result['topk']['counts'][0] == 2
+        assert 'approximates' not in result
+
+    def test_approximate_profile_native(self, tmp_path, monkeypatch):
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+        from piperider_cli.profiler.profiler import BaseColumnProfiler
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        with engine.connect() as conn:
+            conn.exec_driver_sql('CREATE TABLE test AS SELECT range % 8000 AS num FROM range(10000)')
+        engine.dispose()
+
+        # the backends with the native approximate functions are not streamed to the sketches
+        monkeypatch.setattr(BaseColumnProfiler, '_get_sketches', lambda *args: pytest.fail('the values are streamed'))
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        profiler = Profiler(data_source, config=Configuration([], profiler={'approximate': True}))
+        result = profiler.profile([ProfileSubject('test', ref_id='test')])['tables']['test']['columns']['num']
+
+        assert abs(result['distinct'] - 8000) / 8000 < 0.05
+        assert result['approximates']['distinct']['method'] == 'approx_count_distinct'
+        assert result['non_duplicates'] == 6000
+        assert result['topk']['counts'][0] == 2
+
+    def test_incremental_profile(self, monkeypatch):
+        from piperider_cli.profiler.profiler import TableProfiler
+
+        data_source = self.create_data_source()
+        data = [
+            ('num', 'str'),
+            (1, 'aaa'),
+            (2, 'bbb'),
+        ]
+        create_table(self.engine, "test", data)
+
+        last_altered = {'value': '2023-01-01T00:00:00+00:00'}
+        profile_table_metadata = TableProfiler._profile_table_metadata
+
+        def _profile_table_metadata(self, result):
+            profile_table_metadata(self, result)
+            result['last_altered'] = last_altered['value']
+
+        monkeypatch.setattr(TableProfiler, '_profile_table_metadata', _profile_table_metadata)
+        config = Configuration([], profiler={'incremental': True})
+
+        result = Profiler(data_source, config=config).profile()
+        assert result['tables']['test']['fingerprint'] is not None
+        assert 'reused_from' not in result['tables']['test']
+
+        # unchanged table
+        previous_run = {'id': 'run-1', 'tables': result['tables']}
+        result2 = Profiler(data_source, config=config, previous_run=previous_run).profile()
+        assert result2['tables']['test']['reused_from'] == 'run-1'
+        assert result2['tables']['test']['columns'] == result['tables']['test']['columns']
+
+        # keep the original run id
+        previous_run = {'id': 'run-2', 'tables': result2['tables']}
+        result3 = Profiler(data_source, config=config, previous_run=previous_run).profile()
+        assert result3['tables']['test']['reused_from'] == 'run-1'
+
+        # changed table
+        with self.engine.connect() as conn:
+            conn.execute("INSERT INTO test VALUES (3, 'ccc')")
+        last_altered['value'] = '2023-01-02T00:00:00+00:00'
+        result4 = Profiler(data_source, config=config, previous_run=previous_run).profile()
+        assert 'reused_from' not in result4['tables']['test']
+        assert result4['tables']['test']['row_count'] == 3
+        assert result4['tables']['test']['columns']['num']['distinct'] == 3
+
+        # changed profiler config
+        config = Configuration([], profiler={'incremental': True, 'table': {'limit': 1}})
+        previous_run = {'id': 'run-4', 'tables': result4['tables']}
+        result5 = Profiler(data_source, config=config, previous_run=previous_run).profile()
+        assert 'reused_from' not in result5['tables']['test']
+
+    def test_profile_cache(self, monkeypatch):
+        import tempfile
+        from piperider_cli.profiler.cache import ProfileCache
+        from piperider_cli.profiler.profiler import TableProfiler
+
+        data_source = self.create_data_source()
+        data = [
+            ('num', 'str'),
+            (1, 'aaa'),
+            (2, 'bbb'),
+        ]
+        create_table(self.engine, "test", data)
+
+        last_altered = {'value': '2023-01-01T00:00:00+00:00'}
+        profile_table_metadata = TableProfiler._profile_table_metadata
+
+        def _profile_table_metadata(self, result):
+            profile_table_metadata(self, result)
+            result['last_altered'] = last_altered['value']
+
+        monkeypatch.setattr(TableProfiler, '_profile_table_metadata', _profile_table_metadata)
+        config = Configuration([], profiler={'cache': {'enabled': True}})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ProfileCache(f'{tmpdir}/profile.db')
+            result = Profiler(data_source, config=config, cache=cache).profile()
+            assert cache.hits == 0
+
+            result2 = Profiler(data_source, config=config, cache=cache).profile()
+            assert cache.hits == 2
+            for column in ['num', 'str']:
+                expected = dict(result['tables']['test']['columns'][column])
+                actual = dict(result2['tables']['test']['columns'][column])
+                for key in ['profile_duration', 'elapsed_milli']:
+                    expected.pop(key)
+                    actual.pop(key)
+                assert expected == actual
+
+            # changed table
+            with self.engine.connect() as conn:
+                conn.execute("INSERT INTO test VALUES (3, 'ccc')")
+            last_altered['value'] = '2023-01-02T00:00:00+00:00'
+            result3 = Profiler(data_source, config=config, cache=cache).profile()
+            assert cache.hits == 2
+            assert result3['tables']['test']['columns']['num']['distinct'] == 3
+            cache.close()
+
+    def test_concurrent_tables(self, monkeypatch):
+        import os
+        import tempfile
+        from piperider_cli.profiler.profiler import TableProfiler
+
+        def _strip(tables):
+            for t in tables.values():
+                t.pop('profile_duration', None)
+                t.pop('elapsed_milli', None)
+                for c in t['columns'].values():
+                    c.pop('profile_duration', None)
+                    c.pop('elapsed_milli', None)
+            return tables
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dbpath = os.path.join(tmpdir, 'test.db')
+            engine = create_engine(f'sqlite:///{dbpath}')
+            data = [
+                ("user_id", "user_name", "age"),
+                (1, "bob", 23),
+                (2, "alice", 25),
+            ]
+            for i in range(6):
+                create_table(engine, f"test{i}", data)
+
+            def create_data_source():
+                return SqliteDataSource("test", credential={'dbpath': dbpath, 'threads': 4})
+
+            running = {'current': 0, 'max': 0}
+            profile = TableProfiler.profile
+
+            async def _profile(self):
+                running['current'] += 1
+                running['max'] = max(running['max'], running['current'])
+                try:
+                    return await profile(self)
+                finally:
+                    running['current'] -= 1
+
+            monkeypatch.setattr(TableProfiler, 'profile', _profile)
+
+            config = Configuration([], profiler={'concurrentTables': 3})
+            subjects = [ProfileSubject(f'test{i}', ref_id=f'test{i}') for i in range(6)]
+            result = Profiler(create_data_source(), config=config).profile(subjects)
+            assert 1 < running['max'] <= 3
+            assert list(result['tables'].keys()) == [f'test{i}' for i in range(6)]
+
+            running['max'] = 0
+            expected = Profiler(create_data_source()).profile(subjects)
+            assert running['max'] == 1
+            assert _strip(result['tables']) == _strip(expected['tables'])
+
+    def test_schedule_longest_first(self):
+        import os
+        import tempfile
+        from piperider_cli.profiler.profiler import _critical_path
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dbpath = os.path.join(tmpdir, 'test.db')
+            engine = create_engine(f'sqlite:///{dbpath}')
+            for i, rows in enumerate([2, 50, 10]):
+                data = [("id", "name")] + [(j, f"name{j}") for j in range(rows)]
+                create_table(engine, f"test{i}", data)
+
+            data_source = SqliteDataSource("test", credential={'dbpath': dbpath, 'threads': 4})
+            config = Configuration([], profiler={'concurrentTables': 2})
+            subjects = [ProfileSubject(f'test{i}', ref_id=f'test{i}') for i in range(3)]
+            result = Profiler(data_source, config=config).profile(subjects)
+            schedule = result['schedule']
+            assert schedule['concurrency'] == 2
+            assert schedule['cost_unit'] == 'cells'
+            assert schedule['order'] == ['test1', 'test2', 'test0']
+            assert schedule['estimates']['test1'] == {'cost': 100, 'source': 'metadata'}
+            assert schedule['critical_path'][-1]['end_milli'] == schedule['makespan_milli']
+            assert list(result['tables'].keys()) == ['test0', 'test1', 'test2']
+
+            # prefer the elapsed time of the previous run
+            previous_run = {'id': 'run-1', 'tables': {
+                'test0': {'name': 'test0', 'elapsed_milli': 1000},
+                'test1': {'name': 'test1', 'elapsed_milli': 10},
+            }}
+            data_source = SqliteDataSource("test", credential={'dbpath': dbpath, 'threads': 4})
+            result = Profiler(data_source, config=config, previous_run=previous_run).profile(subjects)
+            schedule = result['schedule']
+            assert schedule['cost_unit'] == 'milli'
+            assert schedule['order'][0] == 'test0'
+            assert schedule['estimates']['test0'] == {'cost': 1000, 'source': 'previous_run'}
+            assert schedule['estimates']['test2']['source'] == 'metadata'
+
+        assert _critical_path({}) == []
+        assert _critical_path({'a': (0, 100), 'b': (0, 30), 'c': (30, 80), 'd': (80, 120)}) == [
+            {'name': 'b', 'start_milli': 0, 'end_milli': 30},
+            {'name': 'c', 'start_milli': 30, 'end_milli': 80},
+            {'name': 'd', 'start_milli': 80, 'end_milli': 120},
+        ]
+
+    def test_schedule_same_name_in_schemas(self, tmp_path):
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        with engine.begin() as conn:
+            for schema, rows in [('a', 10), ('b', 50)]:
+                conn.exec_driver_sql(f'CREATE SCHEMA {schema}')
+                conn.exec_driver_sql(f'CREATE TABLE {schema}.orders AS SELECT range AS id FROM range({rows})')
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        config = Configuration([], profiler={'concurrentTables': 2})
+        subjects = [ProfileSubject('orders', schema=schema, name='orders', ref_id=f'{schema}.orders')
+                    for schema in ['a', 'b']]
+        result = Profiler(data_source, config=config).profile(subjects)
+        schedule = result['schedule']
+        # the timings and the estimates of the tables of the same name are not overwritten
+        assert schedule['order'] == ['b.orders', 'a.orders']
+        assert schedule['estimates']['a.orders'] == {'cost': 10, 'source': 'metadata'}
+        assert schedule['estimates']['b.orders'] == {'cost': 50, 'source': 'metadata'}
+        assert {x['name'] for x in schedule['critical_path']} <= {'a.orders', 'b.orders'}
+
+    def test_sample_profile(self):
+        data_source = self.create_data_source()
+        metadata = MetaData()
+        table = Table('test', metadata, Column('id', Integer), Column('num', Integer), Column('str', String))
+        table.create(bind=self.engine)
+        with self.engine.connect() as conn:
+            # the rows are sampled by the hash of their values, so the identical rows are sampled together
+            rows = [{'id': i, 'num': i % 100 if i % 4 else None, 'str': f's{i % 3}'} for i in range(10000)]
+            conn.execute(table.insert(), rows)
+
+        config = Configuration([], profiler={'table': {'sample': {'percent': 10}, 'duplicateRows': True}})
+        profiler = Profiler(data_source, config=config)
+        result = profiler.profile([ProfileSubject('test', ref_id='test')])['tables']['test']
+        assert result['sampling']['method'] == 'hash'
+        assert result['row_count'] == 10000
+        assert 800 < result['samples'] < 1200
+        assert result['samples_p'] == result['samples'] / 10000
+        assert result['duplicate_rows_p'] == result['duplicate_rows'] / result['samples']
+
+        # the columns share the same sample
+        num = result['columns']['num']
+        assert num['samples'] == result['columns']['str']['samples'] == result['samples']
+        assert num['total'] == 10000
+        assert num['nulls'] + num['non_nulls'] == result['samples']
+
+        estimate = num['sample_estimates']['nulls']
+        assert estimate['lower'] <= 2500 <= estimate['upper']
+        assert estimate['lower'] <= estimate['value'] <= estimate['upper']
+
+        # the fused profiling shares the same sample
+        config = Configuration([], profiler={'table': {'sample': {'percent': 10}}, 'fused': True})
+        fused = Profiler(data_source, config=config).profile([ProfileSubject('test', ref_id='test')])
+        assert fused['tables']['test']['columns']['num']['nulls'] == num['nulls']
+
+    def test_table_metadata_connections(self):
+        from sqlalchemy import event
+        from piperider_cli.profiler.profiler import TableProfiler
+
+        self.create_data_source()
+        create_table(self.engine, "test", [('num',), (1,), (2,)])
+        table = Table('test', MetaData(), autoload_with=self.engine)
+
+        connects = []
+        event.listen(self.engine, 'engine_connect', lambda conn, *args: connects.append(conn))
+
+        def _row_count(**kwargs):
+            result = {}
+            TableProfiler(self.engine, None, ProfileSubject('test'), table, None, None,
+                          **kwargs)._profile_table_metadata(result)
+            return result['row_count']
+
+        # the prefetched statistics are used without a connection
+        assert _row_count(catalog_stats={'row_count': 10, 'bytes': 4096}) == 10
+        assert _row_count(table_stats={'row_count': 20}) == 20
+        assert connects == []
+
+        # count the rows if the statistics have no row count
+        assert _row_count(table_stats={'bytes': 4096}) == 2
+        assert _row_count() == 2
+        assert len(connects) == 2
+
+    def test_materialized_sample_profile(self):
+        data_source = self.create_data_source()
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer), Column('str', Text), Column('dt', DateTime))
+        table.create(bind=self.engine)
+        with self.engine.connect() as conn:
+            rows = [{'num': i % 100 if i % 4 else None, 'str': f's{i % 3}', 'dt': datetime(2023, 1, 1 + i % 28)}
+                    for i in range(5000)]
+            conn.execute(table.insert(), rows)
+
+        def _strip(tresult):
+            tresult.pop('profile_duration')
+            tresult.pop('elapsed_milli')
+            for c in tresult['columns'].values():
+                c.pop('profile_duration')
+                c.pop('elapsed_milli')
+            return tresult
+
+        subjects = [ProfileSubject('test', ref_id='test')]
+        expected = None
+        for materialize in [None, 'table', 'duckdb']:
+            table_config = {'sample': {'percent': 10}, 'duplicateRows': True}
+            if materialize:
+                table_config['materialize'] = materialize
+            config = Configuration([], profiler={'table': table_config})
+            result = _strip(Profiler(data_source, config=config).profile(subjects)['tables']['test'])
+            if expected is None:
+                expected = result
+                continue
+
+            assert result['samples'] == expected['samples']
+            assert result['duplicate_rows'] == expected['duplicate_rows']
+            assert result['columns']['str']['schema_type'] == 'TEXT'
+            for name in ['num', 'str', 'dt']:
+                for metric in ['samples', 'nulls', 'distinct', 'min', 'max']:
+                    assert result['columns'][name].get(metric) == expected['columns'][name].get(metric), \
+                        (materialize, name, metric)
+                # the order of the values with the same count depends on the database
+                if name != 'dt':
+                    assert result['columns'][name]['topk']['counts'] == expected['columns'][name]['topk']['counts']
+
+        # the materialized table is dropped
+        assert inspect(self.engine).get_table_names() == ['test']
+
+        # limit only
+        config = Configuration([], profiler={'table': {'limit': 100, 'materialize': 'duckdb'}})
+        result = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+        assert result['samples'] == 100
+        assert result['columns']['num']['samples'] == 100
+        assert 'sample_estimates' not in result['columns']['num']
+
+    def test_materialized_temporary_table(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer), Column('str', Text))
+        # the table of the other run is kept
+        Table('piperider_sample_20230529120000_0123abcd', metadata, Column('num', Integer))
+        metadata.create_all(engine)
+        with engine.connect() as conn:
+            conn.execute(table.insert(), [{'num': i % 70 if i % 4 else None, 'str': f's{i % 3}'} for i in range(500)])
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject('test', ref_id='test')]
+        config = Configuration([], profiler={'table': {'limit': 10000}})
+        expected = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            config = Configuration([], profiler={'table': {'limit': 10000, 'materialize': 'table'}})
+            result = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+        finally:
+            event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+
+        assert any(statement.startswith('CREATE TEMPORARY TABLE piperider_sample_') for statement in statements)
+        assert any(statement.startswith('DROP TABLE piperider_sample_') for statement in statements)
+        assert any('FROM piperider_sample_' in statement for statement in statements)
+        for name in ['num', 'str']:
+            for metric in ['samples', 'nulls', 'distinct', 'min', 'max']:
+                assert result['columns'][name].get(metric) == expected['columns'][name].get(metric), (name, metric)
+
+        # only the temporary table of this run is dropped
+        engine = data_source.get_engine_by_database()
+        assert sorted(inspect(engine).get_table_names()) == ['piperider_sample_20230529120000_0123abcd', 'test']
+
+    def test_local_engine_profile(self, monkeypatch):
+        from piperider_cli.datasource.duckdb import LocalDuckDBDataSource
+        from piperider_cli.profiler.profiler import TableProfiler
+
+        data_source = self.create_data_source()
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer), Column('str', Text), Column('dt', DateTime))
+        table.create(bind=self.engine)
+        with self.engine.connect() as conn:
+            rows = [{'num': i % 100 if i % 4 else None, 'str': f's{i % 3}', 'dt': datetime(2023, 1, 1 + i % 28)}
+                    for i in range(5000)]
+            conn.execute(table.insert(), rows)
+
+        paths = []
+        local_init = LocalDuckDBDataSource.__init__
+
+        def _local_init(self, name, path=None, memory_limit=None, **kwargs):
+            paths.append(path)
+            local_init(self, name, path=path, memory_limit=memory_limit, **kwargs)
+
+        monkeypatch.setattr(LocalDuckDBDataSource, '__init__', _local_init)
+
+        subjects = [ProfileSubject('test', ref_id='test')]
+        config = Configuration([], profiler={'table': {'duplicateRows': True}})
+        expected = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+        assert paths == []
+
+        config = Configuration([], profiler={'engine': 'local', 'table': {'duplicateRows': True}})
+        result = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+        assert paths == [None]
+        assert result['row_count'] == 5000
+        assert result['duplicate_rows'] == expected['duplicate_rows']
+        assert result['columns']['str']['schema_type'] == 'TEXT'
+        for name in ['num', 'str', 'dt']:
+            for metric in ['samples', 'nulls', 'distinct', 'min', 'max']:
+                assert result['columns'][name].get(metric) == expected['columns'][name].get(metric), (name, metric)
+
+        # spill to a temporary file if the table is larger than the memory limit
+        monkeypatch.setattr(TableProfiler, '_estimate_bytes', lambda self: 128 * 1024 * 1024)
+        config = Configuration([], profiler={'engine': 'local', 'local': {'memoryLimit': 64}})
+        result = Profiler(data_source, config=config).profile(subjects)['tables']['test']
+        assert paths[-1] is not None
+        assert not os.path.exists(os.path.dirname(paths[-1]))
+        assert result['columns']['num']['distinct'] == expected['columns']['num']['distinct']
+
+    def test_histogram_bucket(self):
+        import random
+        from piperider_cli.profiler.profiler import histogram_bins, histogram_bucket, histogram_bucket_case, \
+            query_histogram_counts
+
+        random.seed(1)
+        values = [random.uniform(-10, 10) for _ in range(1000)] + [-10.0, 10.0, 0.0, None]
+        ints = [random.randint(0, 173) for _ in range(1000)] + [0, 173, None]
+        engines = [create_engine('sqlite://'), create_engine('duckdb:///:memory:')]
+        for engine in engines:
+            metadata = MetaData()
+            table = Table('test', metadata, Column('f', Float), Column('i', Integer))
+            metadata.create_all(engine)
+            with engine.connect() as conn:
+                conn.execute(table.insert(), [{'f': values[i % len(values)], 'i': ints[i % len(ints)]}
+                                              for i in range(len(values))])
+                for column, is_integer in [(table.c.f, False), (table.c.i, True)]:
+                    _min, _max = conn.execute(select(func.min(column), func.max(column))).fetchone()
+                    interval, num_buckets, _, _ = histogram_bins(_min, _max, is_integer)
+                    arithmetic = histogram_bucket(engine.dialect.name, column, _min, interval, num_buckets)
+                    counts = query_histogram_counts(conn, table, column, arithmetic, num_buckets)
+                    expected = query_histogram_counts(conn, table, column,
+                                                      histogram_bucket_case(column, _min, interval, num_buckets),
+                                                      num_buckets)
+                    assert counts == expected, (engine.dialect.name, column.name)
+
+    def test_histogram_with_previous_bounds(self, tmp_path, monkeypatch):
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+        from piperider_cli.profiler import profiler as profiler_module
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        metadata = MetaData()
+        table = Table('test', metadata, Column('num', Integer), Column('price', Float), Column('str', Text))
+        metadata.create_all(engine)
+        with engine.connect() as conn:
+            conn.execute(table.insert(), [{'num': i % 70, 'price': i / 7, 'str': 'x' * (i % 13)} for i in range(1000)])
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject('test', ref_id='test')]
+        previous = Profiler(data_source).profile(subjects)
+        previous_table = previous['tables']['test']
+
+        calls = []
+        profile_histogram = profiler_module.profile_histogram
+
+        def _profile_histogram(*args, **kwargs):
+            calls.append(args)
+            return profile_histogram(*args, **kwargs)
+
+        monkeypatch.setattr(profiler_module, 'profile_histogram', _profile_histogram)
+
+        # the same bounds, the histograms are queried with the base aggregates
+        result = Profiler(data_source, previous_run=previous).profile(subjects)['tables']['test']
+        assert calls == []
+        for name in ['num', 'price', 'str']:
+            for metric in ['histogram', 'distinct', 'min', 'max', 'nulls', 'avg']:
+                assert result['columns'][name][metric] == previous_table['columns'][name][metric], (name, metric)
+
+        # the bounds are changed, the histogram is queried again
+        engine = data_source.get_engine_by_database()
+        with engine.connect() as conn:
+            conn.execute(table.insert(), [{'num': 100, 'price': 1000.0, 'str': None}])
+        result = Profiler(data_source, previous_run=previous).profile(subjects)['tables']['test']
+        assert len(calls) == 2
+        assert result['columns']['num']['max'] == 100
+        assert sum(result['columns']['num']['histogram']['counts']) == 1001
+        assert result['columns']['num']['histogram']['counts'][-1] == 1
+        assert result['columns']['str']['histogram'] == previous_table['columns']['str']['histogram']
+
+    def test_histogram_with_aggregates_by_default(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        with engine.connect() as conn:
+            conn.exec_driver_sql('CREATE TABLE test AS SELECT range % 70 AS num FROM range(1000)')
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject('test', ref_id='test')]
+        previous = Profiler(data_source).profile(subjects)
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement.lower())
+
+        def _scans(config):
+            statements.clear()
+            result = Profiler(data_source, config=config, previous_run=previous).profile(subjects)
+            assert result['tables']['test']['columns']['num']['histogram'] == \
+                previous['tables']['test']['columns']['num']['histogram']
+            # the scans of the base aggregates and the histogram
+            return [s for s in statements if 'avg(' in s or ('count(' in s and 'group by' in s and 'num' in s)]
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        try:
+            # the base aggregates and the histogram are queried by one query in a default run
+            scans = _scans(Configuration([]))
+            assert len([s for s in scans if 'rollup' in s]) == 1
+            assert [s for s in scans if 'avg(' in s and 'rollup' not in s] == []
+
+            # the histogram is queried separately if the prefetch is disabled
+            scans = _scans(Configuration([], profiler={'prefetchHistogram': False}))
+            assert [s for s in scans if 'rollup' in s] == []
+        finally:
+            event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+    def test_configured_percentiles(self):
+        data_source = self.create_data_source()
+        data = [("col",)] + [(i,) for i in range(1, 1001)]
+        create_table(self.engine, "test", data)
+
+        result = Profiler(data_source).profile()["tables"]["test"]['columns']["col"]
+        assert 'quantiles' not in result
+
+        config = Configuration([], profiler={'percentiles': [99.9, 10, 90, 100]})
+        result = Profiler(data_source, config=config).profile()["tables"]["test"]['columns']["col"]
+        assert result['p5'] == 51
+        assert result['p95'] == 951
+        assert list(result['quantiles'].keys()) == ['p10', 'p90', 'p99.9', 'p100']
+        assert result['quantiles'] == {'p10': 101, 'p90': 901, 'p99.9': 1000, 'p100': 1000}
+
+    def test_datetime_histogram_with_previous_bounds(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        metadata = MetaData()
+        table = Table('test', metadata, Column('ts', DateTime), Column('d', Date))
+        metadata.create_all(engine)
+        with engine.connect() as conn:
+            conn.execute(table.insert(), [
+                {'ts': datetime(2020, 1, 1, i % 24) + timedelta(days=i % 900), 'd': date(2022, 3, 1 + i % 20)}
+                for i in range(1000)
+            ])
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject('test', ref_id='test')]
+        previous = Profiler(data_source).profile(subjects)
+        previous_table = previous['tables']['test']
+        assert previous_table['columns']['ts']['histogram']['labels'][0] == '2020-01-01 - 2020-02-01'
+        assert previous_table['columns']['d']['histogram']['labels'][0] == '2022-03-01 - 2022-03-02'
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement.lower())
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        try:
+            # the truncated dates are counted with the base aggregates
+            result = Profiler(data_source, previous_run=previous).profile(subjects)['tables']['test']
+            assert [s for s in statements if 'date_trunc' in s and 'grouping sets' not in s] == []
+            for name in ['ts', 'd']:
+                for metric in ['histogram', 'distinct', 'min', 'max', 'nulls']:
+                    assert result['columns'][name][metric] == previous_table['columns'][name][metric], (name, metric)
+
+            # the range is wider than the previous run, the histogram is yearly and queried again
+            engine = data_source.get_engine_by_database()
+            with engine.connect() as conn:
+                conn.execute(table.insert(), [{'ts': datetime(2030, 6, 1), 'd': None}])
+            statements.clear()
+            result = Profiler(data_source, previous_run=previous).profile(subjects)['tables']['test']
+            assert len([s for s in statements if 'date_trunc' in s and 'grouping sets' not in s]) == 1
+            histogram = result['columns']['ts']['histogram']
+            assert histogram['labels'][0] == '2020-01-01 - 2021-01-01'
+            assert histogram['counts'] == [466, 365, 169, 0, 0, 0, 0, 0, 0, 0, 1]
+            assert result['columns']['d']['histogram'] == previous_table['columns']['d']['histogram']
+        finally:
+            event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+    def test_datetime_histogram_counts(self):
+        from piperider_cli.profiler.profiler import datetime_histogram_bins, datetime_histogram_counts
+
+        _type, dmin, interval, num_buckets, _, bin_edges = datetime_histogram_bins(date(1900, 5, 3), date(2021, 1, 1))
+        assert _type == 'yearly' and interval.years == 3
+        counts = datetime_histogram_counts([('1900-01-01', 1), (date(1903, 1, 1), 2), (datetime(1905, 1, 1), 3),
+                                            (None, 4), ('2021-01-01', 5), ('3000-01-01', 6)],
+                                           _type, dmin, interval, num_buckets)
+        assert counts[:3] == [1, 5, 0]
+        assert counts[-1] == 5 and sum(counts) == 11
+
+        _type, dmin, interval, num_buckets, _, _ = datetime_histogram_bins(date(2021, 11, 15), date(2022, 2, 1))
+        assert _type == 'monthly' and num_buckets == 4
+        counts = datetime_histogram_counts([('2021-11-01', 1), ('2022-01-01', 2), ('2022-02-01', 3)],
+                                           _type, dmin, interval, num_buckets)
+        assert counts == [1, 0, 2, 3]
+
+    def test_prefetch_table_stats(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        with engine.connect() as conn:
+            conn.exec_driver_sql('CREATE TABLE t1 AS SELECT range AS num FROM range(1000)')
+            conn.exec_driver_sql('CREATE TABLE t2 AS SELECT range AS num FROM range(10)')
+        engine.dispose()
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject(name, ref_id=name) for name in ['t1', 't2']]
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement.lower())
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        try:
+            config = Configuration([], profiler={'approximate': True})
+            result = Profiler(data_source, config=config).profile(subjects)
+            # one query for all tables instead of counting each table
+            assert len([s for s in statements if 'estimated_size' in s]) == 1
+            assert [s for s in statements if s.startswith('select count(*)')] == []
+            assert result['tables']['t1']['row_count'] == 1000
+            assert result['tables']['t1']['approximates']['row_count']['method'] == 'duckdb_tables.estimated_size'
+            assert result['tables']['t2']['row_count'] == 10
+
+            # the estimations are only used by the approximate profiling
+            statements.clear()
+            result = Profiler(data_source).profile(subjects)
+            assert [s for s in statements if 'estimated_size' in s] == []
+            assert len([s for s in statements if s.startswith('select count(*)')]) == 2
+            assert result['tables']['t1']['row_count'] == 1000
+            assert 'approximates' not in result['tables']['t1']
+        finally:
+            event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+    def _create_catalog_tables(self, tmp_path, names):
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        with engine.connect() as conn:
+            for name in names:
+                conn.exec_driver_sql(f'CREATE TABLE {name} AS SELECT range AS num FROM range(1000)')
+        engine.dispose()
+
+        # the row counts of the catalog are not used by the profile cache
+        catalog = {'metadata': {}, 'sources': {}, 'nodes': {
+            name: {'metadata': {'type': 'BASE TABLE', 'schema': 'main', 'name': name},
+                   'columns': {'num': {'type': 'BIGINT', 'index': 1, 'name': 'num'}},
+                   'stats': {'row_count': {'id': 'row_count', 'value': 1, 'include': True}}}
+            for name in names}}
+        data_source = DuckDBDataSource('test', credential={'path': dbpath})
+        subjects = [ProfileSubject(name, schema='main', ref_id=name) for name in names]
+        return data_source, subjects, catalog
+
+    def test_prefetch_table_stats_with_cache(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from piperider_cli.profiler.cache import ProfileCache
+
+        data_source, subjects, catalog = self._create_catalog_tables(tmp_path, ['t1', 't2'])
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement.lower())
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        cache = ProfileCache(str(tmp_path / 'cache.db'))
+        try:
+            config = Configuration([], profiler={'approximate': True})
+            result = Profiler(data_source, config=config, cache=cache, dbt_catalog=catalog).profile(subjects)
+            # the tables in the catalog are prefetched together instead of counting each table
+            assert len([s for s in statements if 'estimated_size' in s]) == 1
+            assert [s for s in statements if s.startswith('select count(*)')] == []
+            assert result['tables']['t1']['row_count'] == 1000
+        finally:
+            cache.close()
+            event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+    def test_table_metadata_connections_with_cache(self, tmp_path):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from piperider_cli.profiler.cache import ProfileCache
+
+        data_source, subjects, catalog = self._create_catalog_tables(tmp_path, ['t1', 't2', 't3'])
+
+        connects = []
+
+        def _engine_connect(conn, *args):
+            connects.append(conn)
+
+        event.listen(Engine, 'engine_connect', _engine_connect)
+        cache = ProfileCache(str(tmp_path / 'cache.db'))
+        try:
+            config = Configuration([], profiler={'approximate': True})
+            Profiler(data_source, config=config, cache=cache, dbt_catalog=catalog).profile(subjects)
+            # one connection to prefetch the stats of the schema, and one to profile the columns of each table,
+            # the metadata of the tables doesn't open their own connections
+            assert len(connects) == len(subjects) + 1
+        finally:
+            cache.close()
+            event.remove(Engine, 'engine_connect', _engine_connect)
@@ -0,0 +1,177 @@
+from sqlalchemy import *
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from piperider_cli.datasource.sqlite import SqliteDataSource
+from piperider_cli.profiler import Profiler, ProfileSubject
+from piperider_cli.profiler import reflection
+from piperider_cli.profiler.reflection import parse_catalog_type, reflect_table, reflect_tables
+
+
+def _create_tables(engine):
+    metadata = MetaData()
+    Table('orders', metadata,
+          Column('id', Integer, nullable=False),
+          Column('price', Numeric(10, 2)),
+          Column('name', String(32)),
+          Column('created_at', DateTime))
+    Table('customers', metadata, Column('id', BigInteger), Column('email', Text), Column('active', Boolean))
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql('CREATE VIEW orders_view AS SELECT id, price FROM orders')
+
+
+def _schema(table):
+    return [(c.name, str(c.type), c.nullable) for c in table.columns]
+
+
+class TestReflection:
+
+    def test_reflect_tables(self):
+        engine = create_engine('sqlite://')
+        _create_tables(engine)
+
+        names = ['orders', 'customers', 'orders_view', 'not_exist']
+        tables = reflect_tables(engine, None, names)
+        assert tables['not_exist'] is None
+        for name in ['orders', 'customers', 'orders_view']:
+            assert _schema(tables[name]) == _schema(reflect_table(engine, None, name)), name
+        assert _schema(tables['orders'])[1] == ('price', 'NUMERIC(10, 2)', True)
+
+    def test_reflect_tables_duckdb(self):
+        engine = create_engine('duckdb:///:memory:')
+        _create_tables(engine)
+
+        names = ['orders', 'customers', 'not_exist']
+        tables = reflect_tables(engine, 'main', names)
+        assert tables['not_exist'] is None
+        for name in ['orders', 'customers']:
+            assert _schema(tables[name]) == _schema(reflect_table(engine, 'main', name)), name
+
+    def test_reflect_tables_queries(self, tmp_path):
+        from piperider_cli.datasource.duckdb import DuckDBDataSource
+
+        dbpath = str(tmp_path / 'test.duckdb')
+        engine = create_engine(f'duckdb:///{dbpath}')
+        _create_tables(engine)
+        with engine.connect() as conn:
+            for i in range(10):
+                conn.exec_driver_sql(f'CREATE TABLE t{i} (id INTEGER, name VARCHAR(32), price DECIMAL(10, 2))')
+        engine.dispose()
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        data_source = DuckDBDataSource('test', credential={'path': dbpath, 'threads': 4})
+        names = ['orders', 'customers', 'orders_view'] + [f't{i}' for i in range(10)]
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        try:
+            subjects = [ProfileSubject(name, schema='main', ref_id=name) for name in names]
+            result = Profiler(data_source).collect_metadata(subjects, subjects)
+        finally:
+            event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+        # the columns of all the tables in the schema are queried at once
+        assert len([s for s in statements if 'pg_attribute' in s]) == 1
+        assert len([s for s in statements if 'pg_catalog' in s]) <= 3
+        tables = result.map_name_tables
+        assert _schema(tables['orders'])[1] == ('price', 'NUMERIC(10, 2)', True)
+        assert _schema(tables['t9']) == [('id', 'INTEGER', True), ('name', 'VARCHAR', True),
+                                         ('price', 'NUMERIC(10, 2)', True)]
+        assert [c.name for c in tables['orders_view'].columns] == ['id', 'price']
+
+    def test_fallback(self, monkeypatch):
+        engine = create_engine('sqlite://')
+        _create_tables(engine)
+
+        def _get_multi_columns(*args, **kwargs):
+            raise Exception('not supported')
+
+        monkeypatch.setattr(reflection, '_get_multi_columns', _get_multi_columns)
+        tables = reflect_tables(engine, None, ['orders', 'not_exist'])
+        assert tables['not_exist'] is None
+        assert [c.name for c in tables['orders'].columns] == ['id', 'price', 'name', 'created_at']
+
+    def test_profiler_metadata(self, tmp_path, monkeypatch):
+        dbpath = str(tmp_path / 'test.db')
+        _create_tables(create_engine(f'sqlite:///{dbpath}'))
+        data_source = SqliteDataSource('test', credential={'dbpath': dbpath, 'threads': 2})
+
+        calls = []
+
+        def _reflect_tables(engine, schema, names, inspector=None):
+            calls.append((names, inspector))
+            return reflect_tables(engine, schema, names, inspector=inspector)
+
+        monkeypatch.setattr('piperider_cli.profiler.profiler.reflect_tables', _reflect_tables)
+        subjects = [ProfileSubject(name, ref_id=name) for name in ['orders', 'customers', 'orders_view', 'not_exist']]
+        result = Profiler(data_source).profile(subjects)
+        assert sorted(len(names) for names, _ in calls) == [2, 2]
+        # the chunks share the inspector caching the schema
+        assert calls[0][1] is calls[1][1]
+        assert set(result['tables']['orders']['columns'].keys()) == {'id', 'price', 'name', 'created_at'}
+        assert result['tables']['orders_view']['col_count'] == 2
+        assert result['tables']['not_exist']['columns'] == {}
+
+    def test_parse_catalog_type(self):
+        dialect = create_engine('duckdb:///:memory:').dialect
+        assert str(parse_catalog_type(dialect, 'INTEGER')) == 'INTEGER'
+        assert str(parse_catalog_type(dialect, 'DECIMAL(18,3)')) == 'DECIMAL(18, 3)'
+        assert str(parse_catalog_type(dialect, 'character varying(32)')) == 'VARCHAR(32)'
+        assert isinstance(parse_catalog_type(dialect, 'DOUBLE'), Float)
+        assert isinstance(parse_catalog_type(dialect, 'TIMESTAMP WITH TIME ZONE'), DateTime)
+        assert parse_catalog_type(dialect, 'STRUCT<a INTEGER>') is None
+        assert parse_catalog_type(dialect, 'UNKNOWN_TYPE') is None
+        assert parse_catalog_type(dialect, None) is None
+
+    def test_profile_with_dbt_catalog(self, monkeypatch):
+        data_source = SqliteDataSource('test')
+        _create_tables(data_source.get_engine_by_database())
+        with data_source.get_engine_by_database().connect() as conn:
+            conn.exec_driver_sql("INSERT INTO orders VALUES (1, 10.5, 'a', '2023-01-01 00:00:00')")
+
+        catalog = {
+            'metadata': {'generated_at': '2023-05-01T10:00:00Z'},
+            'nodes': {
+                'model.project.orders': {
+                    'metadata': {'type': 'table', 'schema': 'main', 'name': 'orders'},
+                    'columns': {
+                        'price': {'type': 'NUMERIC(10,2)', 'index': 2, 'name': 'price'},
+                        'id': {'type': 'INTEGER', 'index': 1, 'name': 'id'},
+                        'created_at': {'type': 'DATETIME', 'index': 4, 'name': 'created_at'},
+                        'name': {'type': 'VARCHAR(32)', 'index': 3, 'name': 'name'},
+                    },
+                    'stats': {'row_count': {'id': 'row_count', 'value': 1, 'include': True},
+                              'bytes': {'id': 'bytes', 'value': 4096, 'include': True}},
+                },
+                'model.project.customers': {
+                    'metadata': {'type': 'table', 'schema': 'main', 'name': 'customers'},
+                    'columns': {'id': {'type': 'STRUCT<a INTEGER>', 'index': 1, 'name': 'id'}},
+                    'stats': {},
+                },
+            },
+            'sources': {},
+        }
+
+        reflected = []
+
+        def _reflect_tables(engine, schema, names, inspector=None):
+            reflected.extend(names)
+            return reflect_tables(engine, schema, names, inspector=inspector)
+
+        monkeypatch.setattr('piperider_cli.profiler.profiler.reflect_tables', _reflect_tables)
+        subjects = [ProfileSubject('orders', ref_id='model.project.orders'),
+                    ProfileSubject('customers', ref_id='model.project.customers')]
+        result = Profiler(data_source, dbt_catalog=catalog).profile(subjects)
+
+        # the column type of customers is not recognized, it is reflected from the warehouse
+        assert reflected == ['customers']
+        orders = result['tables']['orders']
+        assert list(orders['columns'].keys()) == ['id', 'price', 'name', 'created_at']
+        assert orders['columns']['price']['schema_type'] == 'NUMERIC(10, 2)'
+        assert orders['columns']['price']['max'] == 10.5
+        assert orders['row_count'] == 1
+        assert orders['bytes'] == 4096
+        assert set(result['tables']['customers']['columns'].keys()) == {'id', 'email', 'active'}
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+
+from piperider_cli.profiler.sampling import NativeSample, SamplingConfig, estimate_sample_size, sample_table, scale_up
+
+
+def test_sampling_config():
+    assert SamplingConfig.from_profiler_config(None) is None
+    assert SamplingConfig.from_profiler_config({'table': {'limit': 100}}) is None
+    assert SamplingConfig.from_profiler_config({'table': {'sample': {'percent': 100}}}) is None
+    assert SamplingConfig.from_profiler_config({'table': {'sample': {'percent': 10}}}) == SamplingConfig(percent=10)
+    assert SamplingConfig.from_profiler_config({'table': {'sample': {'rows': 10, 'seed': 3}}}) == \
+           SamplingConfig(rows=10, seed=3)
+
+
+def test_native_sample_postgres():
+    table = Table('t', MetaData(), Column('i', Integer), schema='s')
+    sample = NativeSample.create(table, 10.5, None, 1)
+    sql = str(select(func.count(sample.c.i)).compile(dialect=postgresql.dialect()))
+    assert 'FROM s.t AS _sample TABLESAMPLE BERNOULLI (10.5) REPEATABLE (1)' in sql
+
+
+def test_hash_sample_sqlite():
+    engine = create_engine('sqlite://')
+    table = Table('t', MetaData(), Column('i', Integer))
+    table.create(bind=engine)
+    with engine.connect() as conn:
+        conn.execute(table.insert(), [{'i': i} for i in range(10000)])
+        conn.execute(text('CREATE VIEW v AS SELECT i FROM t ORDER BY i DESC'))
+    view = Table('v', MetaData(), Column('i', Integer))
+
+    sample, info = sample_table(engine, table, SamplingConfig(percent=10), 10000)
+    assert info['method'] == 'hash'
+    with engine.connect() as conn:
+        values = [i for i, in conn.execute(select(sample.c.i))]
+        assert 800 < len(values) < 1200
+        # the sample is deterministic
+        assert conn.execute(select(func.count()).select_from(sample)).fetchone()[0] == len(values)
+
+        # the rows of a view are sampled by their values, not the rowid
+        sample, info = sample_table(engine, view, SamplingConfig(percent=10), 10000)
+        assert sorted(i for i, in conn.execute(select(sample.c.i))) == sorted(values)
+
+        # the fixed-size sampling is converted to the percentage
+        sample, info = sample_table(engine, table, SamplingConfig(rows=1000), 10000)
+        assert info['percent'] == 10
+        assert 800 < conn.execute(select(func.count()).select_from(sample)).fetchone()[0] < 1200
+
+    # no sampling if the table is small enough
+    assert sample_table(engine, table, SamplingConfig(rows=20000), 10000) == (None, None)
+
+
+def test_limit_sample_without_row_count():
+    # a backend without the native or hash sampling
+    engine = mock.Mock(url=make_url('oracle://'))
+    table = Table('t', MetaData(), Column('i', Integer))
+    assert sample_table(engine, table, SamplingConfig(percent=10), None) == (None, None)
+    sample, info = sample_table(engine, table, SamplingConfig(percent=10), 1000)
+    assert info['method'] == 'limit'
+
+
+def test_estimate_sample_size():
+    assert estimate_sample_size(SamplingConfig(percent=10), 1000) == 100
+    assert estimate_sample_size(SamplingConfig(rows=10), 1000) == 10
+    assert estimate_sample_size(SamplingConfig(rows=10000), 1000) == 1000
+
+
+def test_scale_up():
+    assert scale_up(10, 0, 1000) is None
+
+    estimate = scale_up(100, 1000, 100000)
+    assert estimate['value'] == 10000
+    assert estimate['lower'] < 10000 < estimate['upper']
+    # 95% interval of p=0.1 with 1000 samples is about +-1.86%
+    assert 8000 < estimate['lower'] and estimate['upper'] < 12000
+
+    # the whole table is sampled
+    assert scale_up(100, 1000, 1000) == dict(value=100, lower=100, upper=100)
+
+    # bounded by the counts in the sample
+    estimate = scale_up(0, 1000, 100000)
+    assert estimate == dict(value=0, lower=0, upper=0)
@@ -0,0 +1,50 @@
+from piperider_cli.profiler.sketch import HyperLogLog, KMinValues, SpaceSaving
+
+
+def test_hyperloglog():
+    hll = HyperLogLog()
+    for i in range(100000):
+        hll.add(i % 50000)
+    assert abs(hll.count() - 50000) / 50000 < 3 * hll.relative_error
+
+    other = HyperLogLog()
+    for i in range(50000, 60000):
+        other.add(i)
+    hll.merge(other)
+    assert abs(hll.count() - 60000) / 60000 < 3 * hll.relative_error
+
+
+def test_kmv_exact_when_small():
+    kmv = KMinValues(k=100)
+    for v in ['a', 'b', 'b', 'c', 'c', 'c', 'd']:
+        kmv.add(v)
+    assert kmv.is_exact()
+    assert kmv.distinct() == 4
+    assert kmv.non_duplicates() == 2
+
+
+def test_kmv_estimation():
+    kmv = KMinValues(k=1024)
+    # 20000 singletons and 10000 values appearing twice
+    for i in range(20000):
+        kmv.add(f'single-{i}')
+    for i in range(10000):
+        kmv.add(f'double-{i}')
+        kmv.add(f'double-{i}')
+    assert not kmv.is_exact()
+    assert abs(kmv.distinct() - 30000) / 30000 < 3 * kmv.relative_error
+    assert abs(kmv.non_duplicates() - 20000) / 20000 < 5 * kmv.relative_error
+
+
+def test_space_saving():
+    space_saving = SpaceSaving(capacity=10)
+    for i in range(1000):
+        space_saving.add('hot')
+        space_saving.add(f'cold-{i}')
+        if i % 2 == 0:
+            space_saving.add('warm')
+
+    topk = space_saving.topk(2)
+    assert [k for k, _ in topk] == ['hot', 'warm']
+    assert 1000 <= topk[0][1] <= 1000 + space_saving.max_error
+    assert 500 <= topk[1][1] <= 500 + space_saving.max_error
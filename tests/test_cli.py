@@ -1,16 +1,25 @@
 import os
+import shutil
+import tempfile
 from unittest import TestCase, mock
 
 from click.testing import CliRunner
 
 from piperider_cli.cli import init, version, diagnose, run
 from piperider_cli.cli_utils import verify_upload_related_options
+from piperider_cli.configuration import FileSystem
 
 
 class TestPipeRiderCli(TestCase):
     def setUp(self) -> None:
         self.cli_runner = CliRunner()
-        self.unit_test_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_project')
+        # the commands write the piperider config and outputs into a copy of the mock project
+        self.addCleanup(setattr, FileSystem, 'working_directory', FileSystem.working_directory)
+        self.addCleanup(setattr, FileSystem, 'dbt_profiles_dir', FileSystem.dbt_profiles_dir)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        self.unit_test_dir = os.path.join(tmpdir, 'mock_dbt_project')
+        shutil.copytree(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_project'), self.unit_test_dir)
         pass
 
     def test_version_command(self):
@@ -1,6 +1,7 @@
 import json
 import os
 import subprocess
+import tempfile
 import unittest
 from unittest import TestCase
 
@@ -28,6 +29,8 @@ class TestCompareSummaryNG(TestCase):
     def setUp(self):
         self.maxDiff = None
         self.dbt_state_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_dbt_data")
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
 
     def manifest_path(self, manifest_name):
         return os.path.join(self.dbt_state_dir, manifest_name)
@@ -53,7 +56,7 @@ class TestCompareSummaryNG(TestCase):
 
         pbcopy_string(result)
 
-        with open("output.md", "w") as fh:
+        with open(os.path.join(self.output_dir.name, "output.md"), "w") as fh:
             fh.write(result)
 
     def test_in_memory_compare_with_manifests_v_1_3(self):
@@ -63,7 +66,7 @@ class TestCompareSummaryNG(TestCase):
         data = ComparisonData(run1, run2, None)
         result = data.to_summary_markdown_ng()
 
-        with open("output_v1_3.md", "w") as fh:
+        with open(os.path.join(self.output_dir.name, "output_v1_3.md"), "w") as fh:
             fh.write(result)
 
     @unittest.skipIf(dbt_version < version.parse('1.4'), 'this only works after manifests generated after the v1.4')
@@ -74,7 +77,7 @@ class TestCompareSummaryNG(TestCase):
         data = ComparisonData(run1, run2, None)
         result = data.to_summary_markdown_ng()
 
-        with open("output.md", "w") as fh:
+        with open(os.path.join(self.output_dir.name, "output.md"), "w") as fh:
             fh.write(result)
 
     @unittest.skipIf(dbt_version < version.parse('1.4'), 'this only works after manifests generated after the v1.4')
@@ -85,7 +88,7 @@ class TestCompareSummaryNG(TestCase):
         data = ComparisonData(run2, run1, None)
         result = data.to_summary_markdown_ng()
 
-        with open("output.md", "w") as fh:
+        with open(os.path.join(self.output_dir.name, "output.md"), "w") as fh:
             fh.write(result)
 
     @unittest.skipIf(dbt_version < version.parse('1.6'), 'before 1.6 the legacy metrics are supported')
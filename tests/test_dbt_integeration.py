@@ -374,3 +374,147 @@ class TestDbtIntegration(_BaseDbtTest):
 
         changes = c.list_implicit_changes()
         self.assertDbtResources(changes, expected)
+
+    @unittest.skipIf(
+        dbt_version < version.parse("1.6") or dbt_version >= version.parse("1.7"),
+        "this case uses the manifests generated by the v1.6",
+    )
+    def test_manifests_shared_by_change_sets(self):
+        from unittest import mock
+
+        from piperider_cli.compare_report import ComparisonData
+        from piperider_cli.dbt import changeset
+
+        changeset._manifest_memo.clear()
+        counts = {}
+
+        def _count(name):
+            origin = getattr(changeset, name)
+
+            def _wrapper(*args, **kwargs):
+                counts[name] = counts.get(name, 0) + 1
+                return origin(*args, **kwargs)
+
+            return mock.patch.object(changeset, name, _wrapper)
+
+        names = ['load_manifest', 'list_resources_data_from_manifest', 'list_changes_in_unique_id',
+                 'list_modified_with_downstream']
+        with _count(names[0]), _count(names[1]), _count(names[2]), _count(names[3]):
+            data = ComparisonData(self.base_run_1_6(), self.target_run_1_6(), None)
+            self.assertDbtResources(data.explicit, ["model.jaffle_shop.orders"])
+            self.assertEqual(counts, {names[0]: 2, names[1]: 2, names[2]: 1, names[3]: 1})
+
+            # the same runs are compared by the memoized results
+            again = ComparisonData(self.base_run_1_6(), self.target_run_1_6(), None)
+            self.assertEqual(counts, {names[0]: 2, names[1]: 2, names[2]: 1, names[3]: 1})
+            self.assertEqual(again.explicit, data.explicit)
+            self.assertEqual(again.implicit, data.implicit)
+            self.assertEqual(again.to_summary_markdown_ng(), data.to_summary_markdown_ng())
+
+    def test_manifest_checksum(self):
+        from unittest import mock
+
+        from piperider_cli.dbt.changeset import manifest_checksum
+
+        base = self.base_run_1_6()['dbt']['manifest']
+        target = self.target_run_1_6()['dbt']['manifest']
+
+        # the manifests generated by dbt are identified by their metadata without serializing them
+        with mock.patch('piperider_cli.dbt.changeset.json.dumps', side_effect=AssertionError('should not be dumped')):
+            self.assertEqual(manifest_checksum(base), manifest_checksum(self.base_run_1_6()['dbt']['manifest']))
+            self.assertNotEqual(manifest_checksum(base), manifest_checksum(target))
+
+        # the others are hashed by their contents
+        base.pop('metadata')
+        target.pop('metadata')
+        self.assertNotEqual(manifest_checksum(base), manifest_checksum(target))
+        self.assertEqual(manifest_checksum(base), manifest_checksum(dict(base)))
+
+    @unittest.skipIf(
+        dbt_version < version.parse("1.6") or dbt_version >= version.parse("1.7"),
+        "this case uses the manifests generated by the v1.6",
+    )
+    def test_manifest_graph_compatible_with_list_task(self):
+        import tempfile
+
+        from piperider_cli.dbt.list_task import list_resources_data_from_manifest
+        from piperider_cli.dbtutil import ManifestGraph
+
+        for base_run, target_run in [(self.base_run_1_6(), self.target_run_1_6()),
+                                     (self.target_run_1_6(), self.base_run_1_6()),
+                                     (self.base_31587_with_ref(), self.target_31587_with_ref())]:
+            base = base_run.get("dbt", {}).get("manifest", {})
+            target_manifest = load_manifest(target_run.get("dbt", {}).get("manifest", {}))
+            graph = ManifestGraph(target_manifest)
+
+            with tempfile.TemporaryDirectory() as state:
+                with open(os.path.join(state, "manifest.json"), "w") as fh:
+                    json.dump(base, fh)
+
+                for select, include_downstream in [("state:modified", False), ("state:modified+", True)]:
+                    expected = list_resources_data_from_manifest(target_manifest, select=(select,), state=state)
+                    nodes = graph.select_modified(load_manifest(base), include_downstream)
+                    self.assertEqual([node.unique_id for node in nodes], [x["unique_id"] for x in expected])
+
+    @unittest.skipIf(dbt_version < version.parse("1.6"), "this case uses the manifests generated by the v1.6")
+    def test_manifest_graph_config_changed(self):
+        import copy
+
+        from piperider_cli.dbtutil import ManifestGraph
+
+        base = self.base_run_1_6().get("dbt", {}).get("manifest", {})
+        target = copy.deepcopy(base)
+        node = target["nodes"]["model.jaffle_shop.stg_orders"]
+        node["config"]["materialized"] = "table"
+        node["unrendered_config"]["materialized"] = "table"
+
+        graph = ManifestGraph(load_manifest(target))
+        self.assertEqual(graph.graph["model.jaffle_shop.stg_orders"],
+                         base["child_map"]["model.jaffle_shop.stg_orders"])
+
+        nodes = graph.select_modified(load_manifest(base))
+        self.assertEqual([node.unique_id for node in nodes], [
+            "model.jaffle_shop.stg_orders",
+            "test.jaffle_shop.accepted_values_stg_orders_status__placed__shipped__completed__return_pending__returned"
+            ".080fb20aad",
+            "test.jaffle_shop.not_null_stg_orders_order_id.81cfe2fe64",
+            "test.jaffle_shop.unique_stg_orders_order_id.e3b841c71a",
+        ])
+
+        nodes = graph.select_modified(load_manifest(base), include_downstream=True, resource_types=["model"])
+        self.assertIn("model.jaffle_shop.int_order_payments_pivoted", [node.unique_id for node in nodes])
+        self.assertNotIn("model.jaffle_shop.stg_payments", [node.unique_id for node in nodes])
+
+    def test_find_descendants(self):
+        from piperider_cli.dbtutil import find_descendants, prepare_topological_graph
+
+        manifest = self.target_run_1_6().get("dbt", {}).get("manifest", {})
+        graph = prepare_topological_graph(manifest)
+        self.assertTrue(all(k.split('.')[0] in ['model', 'metric'] for k in graph.keys()))
+
+        descendants = find_descendants(graph, ["model.jaffle_shop.stg_orders"])
+        self.assertIn("model.jaffle_shop.orders", descendants)
+        self.assertNotIn("test.jaffle_shop.unique_stg_orders_order_id.e3b841c71a", descendants)
+        self.assertNotIn("model.jaffle_shop.stg_orders", descendants)
+        self.assertNotIn("model.jaffle_shop.stg_payments", descendants)
+
+    @unittest.skipIf(dbt_version < version.parse("1.6"), "this case uses the manifests generated by the v1.6")
+    def test_manifest_graph_keeps_global_flags(self):
+        import dbt.flags as flags_module
+        from argparse import Namespace
+
+        from piperider_cli.dbtutil import ManifestGraph
+
+        base = load_manifest(self.base_run_1_6().get("dbt", {}).get("manifest", {}))
+        target = load_manifest(self.target_run_1_6().get("dbt", {}).get("manifest", {}))
+
+        original_flags = flags_module.get_flags()
+        flags = Namespace()
+        flags_module.set_flags(flags)
+        try:
+            nodes = ManifestGraph(target).select_modified(base)
+            self.assertTrue(len(nodes) > 0)
+            self.assertIs(flags_module.get_flags(), flags)
+            self.assertFalse(hasattr(flags, "WARN_ERROR"))
+        finally:
+            flags_module.set_flags(original_flags)
@@ -339,3 +339,59 @@ class TestRunner(TestCase):
 
         time_grains = dbtutil.get_support_time_grains('year')
         self.assertListEqual(time_grains, ['year'])
+
+    def test_get_dbt_state_catalog(self):
+        import json
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as target_path:
+            self.assertIsNone(dbtutil.get_dbt_state_catalog(target_path))
+
+            catalog = dict(metadata=dict(generated_at='2023-05-01T10:00:00.000000Z'), nodes={}, sources={})
+            with open(os.path.join(target_path, 'catalog.json'), 'w') as f:
+                json.dump(catalog, f)
+            manifest = dict(metadata=dict(generated_at='2023-05-01T09:59:00.000000Z'))
+            run_results = dict(metadata=dict(generated_at='2023-05-01T09:59:30.000000Z'))
+            self.assertEqual(dbtutil.get_dbt_state_catalog(target_path, manifest, run_results), catalog)
+
+            # 'dbt run' after 'dbt docs generate'
+            run_results = dict(metadata=dict(generated_at='2023-05-01T11:00:00.000000Z'))
+            self.assertIsNone(dbtutil.get_dbt_state_catalog(target_path, manifest, run_results))
+            manifest = dict(metadata=dict(generated_at='2023-05-02T00:00:00'))
+            self.assertIsNone(dbtutil.get_dbt_state_catalog(target_path, manifest, None))
+
+    def test_get_state_manifest_cached(self):
+        import json
+        import shutil
+        import tempfile
+
+        def _json_loads(content):
+            calls.append(content)
+            return json.loads(content)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_path = os.path.join(tmp_dir, 'target')
+            os.mkdir(target_path)
+            shutil.copy(os.path.join(self.dbt_state_dir, 'manifest.json'), target_path)
+
+            calls = []
+            with mock.patch.object(dbtutil, '_json_loads', _json_loads):
+                manifest = dbtutil.get_dbt_manifest(target_path)
+                self.assertIs(dbtutil._get_state_manifest(target_path), manifest)
+                self.assertEqual(len(calls), 1)
+
+                # the changed manifest is loaded again
+                with open(os.path.join(target_path, 'manifest.json'), 'w') as f:
+                    json.dump(dict(manifest, nodes={}), f)
+                self.assertEqual(dbtutil.get_dbt_manifest(target_path)['nodes'], {})
+                self.assertEqual(len(calls), 2)
+
+                # the later commands load the stored manifest
+                store_dir = os.path.join(tmp_dir, 'store')
+                with mock.patch.dict(os.environ, {dbtutil.MANIFEST_STORE_DIR_ENV: store_dir}):
+                    dbtutil._manifest_cache.clear()
+                    self.assertEqual(dbtutil.get_dbt_manifest(target_path)['nodes'], {})
+                    dbtutil._manifest_cache.clear()
+                    self.assertEqual(dbtutil.get_dbt_manifest(target_path)['nodes'], {})
+                    self.assertEqual(len(calls), 3)
+                    self.assertEqual(len(os.listdir(store_dir)), 1)
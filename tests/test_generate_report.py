@@ -0,0 +1,114 @@
+import base64
+import json
+import os
+import re
+
+from piperider_cli import generate_report
+from piperider_cli.generate_report import REPORT_SHARD_DIR, link_report_assets, setup_report_variables, \
+    write_report_html
+
+TEMPLATE = '<html><head><script defer="defer" src="./static/js/main.js"></script></head>' \
+           '<body><div id="root"></div><script id="piperider-report-variables">' \
+           'window.PIPERIDER_METADATA="";</script></body></html>'
+
+
+def _run(run_id, tables):
+    return {
+        'id': run_id,
+        'created_at': '2023-05-01T10:00:00.000000Z',
+        'datasource': {'name': 'local', 'type': 'sqlite'},
+        'tables': {name: {'name': name, 'row_count': i, 'columns': {'id': {'type': 'integer'}}}
+                   for i, name in enumerate(tables)},
+        'dbt': {'manifest': {'nodes': {}}},
+    }
+
+
+def _load_sharded_report(output_path):
+    """
+    Assemble the report data as the loader script in index.html does.
+    """
+    with open(os.path.join(output_path, 'index.html')) as f:
+        html = f.read()
+    assert 'main.js' not in html.split('<body>')[0]
+    data = json.loads(json.loads(re.search(r'var data=JSON\.parse\(("(?:[^"\\]|\\.)*")\)', html).group(1)))
+    shards = json.loads(re.search(r'shards=(\[[^\]]*\])', html).group(1))
+    for shard in shards:
+        with open(os.path.join(output_path, shard)) as f:
+            content = f.read()
+        literal = re.fullmatch(r'window\.PIPERIDER_REPORT_SHARD\(JSON\.parse\((.*)\)\);', content).group(1)
+        for path, value in json.loads(json.loads(literal)):
+            o = data
+            for key in path[:-1]:
+                o = o[key]
+            o[path[-1]] = value
+    return data, shards
+
+
+def test_sharded_single_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_report, 'prepare_piperider_metadata', lambda: {})
+    monkeypatch.setattr(generate_report, 'REPORT_SHARD_SIZE', 200)
+    run = _run('run-1', [f't{i}' for i in range(10)])
+
+    write_report_html(TEMPLATE, True, run, str(tmp_path), layout='sharded')
+    data, shards = _load_sharded_report(str(tmp_path))
+    assert data == run
+    assert list(data['tables'].keys()) == list(run['tables'].keys())
+    assert 1 < len(shards) < 11
+
+    # the shards are removed if the report is generated inline again
+    write_report_html(TEMPLATE, True, run, str(tmp_path))
+    assert not os.path.exists(str(tmp_path / REPORT_SHARD_DIR))
+    with open(str(tmp_path / 'index.html')) as f:
+        assert 'PIPERIDER_SINGLE_REPORT_DATA=JSON.parse(atob(' in f.read()
+
+
+def test_sharded_comparison_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_report, 'prepare_piperider_metadata', lambda: {})
+    comparison = dict(id='cmp', base=_run('run-1', ['a', 'b']), input=_run('run-2', ['b', 'c']), implicit=[],
+                      explicit=[], metadata={})
+
+    write_report_html(TEMPLATE, False, json.dumps(comparison), str(tmp_path), layout='sharded')
+    data, shards = _load_sharded_report(str(tmp_path))
+    assert data == comparison
+    assert len(shards) == 1
+
+
+def test_inline_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_report, 'prepare_piperider_metadata', lambda: {})
+    monkeypatch.setattr(generate_report, '_BASE64_CHUNK_SIZE', 3 * 7)
+    run = _run('run-1', ['a', 'b', 'c'])
+
+    write_report_html(TEMPLATE, True, run, str(tmp_path))
+    with open(str(tmp_path / 'index.html')) as f:
+        html = f.read()
+    assert html == setup_report_variables(TEMPLATE, True, run)
+    encoded = re.search(r'atob\("([^"]*)"\)', html).group(1)
+    assert json.loads(base64.b64decode(encoded)) == run
+
+
+def test_link_report_assets(tmp_path):
+    template_dir = tmp_path / 'template'
+    (template_dir / 'static' / 'js').mkdir(parents=True)
+    (template_dir / 'index.html').write_text(TEMPLATE)
+    (template_dir / 'static' / 'js' / 'main.js').write_text('console.log(1)')
+    (template_dir / 'logo.svg').write_text('<svg></svg>')
+    asset_dir = str(tmp_path / 'assets')
+
+    for report in ['a', 'b']:
+        link_report_assets(str(template_dir), str(tmp_path / report), asset_dir)
+    assert not os.path.exists(str(tmp_path / 'a' / 'index.html'))
+    for path in [os.path.join('static', 'js', 'main.js'), 'logo.svg']:
+        assert (tmp_path / 'a' / path).read_text() == (template_dir / path).read_text()
+        assert os.path.samefile(str(tmp_path / 'a' / path), str(tmp_path / 'b' / path))
+    assert len([f for _, _, files in os.walk(asset_dir) for f in files]) == 2
+
+    # the copied asset is replaced by the link
+    os.remove(str(tmp_path / 'b' / 'logo.svg'))
+    (tmp_path / 'b' / 'logo.svg').write_text('<svg></svg>')
+    link_report_assets(str(template_dir), str(tmp_path / 'b'), asset_dir)
+    assert os.path.samefile(str(tmp_path / 'a' / 'logo.svg'), str(tmp_path / 'b' / 'logo.svg'))
+
+    # the assets are copied without the asset directory
+    link_report_assets(str(template_dir), str(tmp_path / 'c'), None)
+    assert (tmp_path / 'c' / 'logo.svg').read_text() == '<svg></svg>'
+    assert not os.path.samefile(str(tmp_path / 'a' / 'logo.svg'), str(tmp_path / 'c' / 'logo.svg'))
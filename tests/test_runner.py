@@ -1,15 +1,82 @@
 import json
 import os
 import shutil
+import tempfile
 from unittest import TestCase
 
 from piperider_cli.configuration import FileSystem, Configuration
 from piperider_cli.error import PipeRiderConnectorUnsupportedError
 from piperider_cli.profiler import ProfileSubject
-from piperider_cli.runner import _filter_subject, get_dbt_profile_subjects, Runner
+from piperider_cli.runner import _filter_subject, _load_previous_run, get_dbt_profile_subjects, Runner
 from piperider_cli.statistics import Statistics
 
 
+class _DataSource:
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+
+
+class _ReportDirectory:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def get_output_dir(self):
+        return self.output_dir
+
+
+def test_load_previous_run(tmp_path):
+    from piperider_cli.runresult import write_run_result
+
+    for name, created_at in [('prod', '20240101000000'), ('prod-eu', '20240102000000'), ('prod', '20240103000000')]:
+        run_dir = tmp_path / f'{name}-{created_at}'
+        run_dir.mkdir()
+        write_run_result(str(run_dir / 'run.json'), dict(id=f'{name}-{created_at}', created_at=created_at,
+                                                         datasource=dict(name=name), tables={}))
+    (tmp_path / 'prod-latest').mkdir()
+
+    filesystem = _ReportDirectory(str(tmp_path))
+    assert _load_previous_run(filesystem, _DataSource('prod'))['id'] == 'prod-20240103000000'
+    assert _load_previous_run(filesystem, _DataSource('prod-eu'))['id'] == 'prod-eu-20240102000000'
+
+    # the run of another data source in the matched directory is skipped
+    write_run_result(str(tmp_path / 'prod-20240103000000' / 'run.json'),
+                     dict(id='other', created_at='20240103000000', datasource=dict(name='other'), tables={}))
+    assert _load_previous_run(filesystem, _DataSource('prod'))['id'] == 'prod-20240101000000'
+    assert _load_previous_run(filesystem, _DataSource('other')) is None
+
+
+def test_uses_previous_run():
+    from piperider_cli.runner import _uses_previous_run
+
+    # the histograms are prefetched by the previous run by default
+    assert _uses_previous_run(Configuration([]), _DataSource('prod'))
+    config = Configuration([], profiler={'prefetchHistogram': False})
+    assert not _uses_previous_run(config, _DataSource('prod'))
+    assert not _uses_previous_run(config, _DataSource('prod', threads=4))
+
+    config = Configuration([], profiler={'prefetchHistogram': False, 'incremental': True})
+    assert _uses_previous_run(config, _DataSource('prod'))
+    config = Configuration([], profiler={'prefetchHistogram': False, 'concurrentTables': 2})
+    assert not _uses_previous_run(config, _DataSource('prod'))
+    assert _uses_previous_run(config, _DataSource('prod', threads=4))
+
+
+def test_slim_previous_run():
+    from piperider_cli.runner import _slim_previous_run
+
+    column = dict(name='id', schema_type='INTEGER', type='integer', min=1, max=9, histogram=dict(counts=[1]),
+                  topk=dict(values=[1], counts=[1]))
+    table = dict(name='t', ref_id=None, elapsed_milli=10, row_count=3, fingerprint='f', columns=dict(id=column))
+    run_result = dict(id='run-1', datasource=dict(name='prod'), tables=dict(t=table, v=None), dbt=dict(manifest={}))
+
+    slim = _slim_previous_run(run_result, False)
+    assert slim['id'] == 'run-1' and 'dbt' not in slim
+    assert slim['tables']['t'] == dict(name='t', ref_id=None, elapsed_milli=10, columns=dict(
+        id=dict(name='id', schema_type='INTEGER', type='integer', min=1, max=9, histogram=dict(counts=[1]))))
+    assert _slim_previous_run(run_result, True)['tables']['t'] == table
+
+
 class TestRunnerSubjectFilter(TestCase):
 
     def setUp(self):
@@ -150,21 +217,26 @@ class TestExecuteRunnerWithoutDataSourceConnection(TestCase):
         self.dbt_project_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_project',
                                             'skip_datasource_connection')
 
+        # write the outputs out of the fixture directory
+        self.output_dir = tempfile.mkdtemp()
+
         FileSystem.set_working_directory(self.dbt_project_dir)
         FileSystem.set_dbt_profiles_dir(self.dbt_project_dir)
         Configuration.cleanup()
         pass
 
     def read_skip_datasource_value(self):
-        with open(os.path.join(self.dbt_project_dir, "run.json"), "r") as fh:
+        with open(os.path.join(self.output_dir, "run.json"), "r") as fh:
             ds = json.loads(fh.read()).get('datasource')
             result = ds['skip_datasource']
         return result
 
     def test_skip_datasource(self):
-        rc = Runner.exec(skip_datasource_connection=True, output=self.dbt_project_dir)
+        rc = Runner.exec(skip_datasource_connection=True, output=self.output_dir)
         self.assertTrue(self.read_skip_datasource_value())
         assert rc == 0
+        # the header of run.json is only kept in the output directory of PipeRider
+        assert not os.path.exists(os.path.join(self.output_dir, 'run.header.json'))
 
     def test_non_skip_datasource(self):
         # PipeRider has not supported 'hive' datasource yet
@@ -179,8 +251,8 @@ class TestExecuteRunnerWithoutDataSourceConnection(TestCase):
         piperider_output_dir = os.path.join(self.dbt_project_dir, '.piperider', 'outputs')
         try:
             shutil.rmtree(piperider_output_dir)
-            os.unlink(os.path.join(self.dbt_project_dir, 'run.json'))
         except FileNotFoundError:
             pass
+        shutil.rmtree(self.output_dir, ignore_errors=True)
         Configuration.cleanup()
         pass
@@ -0,0 +1,178 @@
+import json
+import os
+
+import pytest
+
+from piperider_cli.compare_report import CompareReport, RunOutput
+from piperider_cli.runresult import REPORT_INDEX_FILE, RUN_HEADER_FILE, ReportIndex, RunResultWriter, \
+    detect_run_format, load_run_result, open_run_json_as_plain, read_run_header, update_report_index, write_run_result
+
+
+def _run_result():
+    return {
+        'tables': {
+            'orders': {'name': 'orders', 'row_count': 3, 'columns': {'id': {'type': 'integer', 'nulls': 0}}},
+            'customers': {'name': 'customers', 'row_count': 1, 'columns': {}},
+        },
+        'tests': [{'status': 'passed'}, {'status': 'failed'}, {'status': 'passed'}],
+        'dbt': {'manifest': {'nodes': {'model.a': {'raw_code': 'select 1', 'tags': ['x']}}}},
+        'metadata': {1: 'one', True: None, 'unicode': '中文'},
+        'id': 'run-1',
+        'created_at': '2023-05-01T10:00:00.000000Z',
+        'datasource': {'name': 'local', 'type': 'sqlite'},
+    }
+
+
+def test_write_run_result(tmp_path):
+    run_json = str(tmp_path / 'run.json')
+    run_result = _run_result()
+    write_run_result(run_json, run_result)
+
+    with open(run_json) as f:
+        content = f.read()
+    assert json.loads(content) == json.loads(json.dumps(run_result))
+    assert content.startswith('{"id":"run-1","created_at":')
+    assert not os.path.exists(f'{run_json}.tmp')
+
+    header = read_run_header(run_json)
+    assert header == dict(id='run-1', name='local', created_at='2023-05-01T10:00:00.000000Z', table_count=2,
+                          pass_count=2, fail_count=1, cloud=None)
+
+
+def test_run_result_writer(tmp_path):
+    run_json = str(tmp_path / 'run.json')
+    run_result = _run_result()
+    tables = run_result.pop('tables')
+
+    writer = RunResultWriter(run_json, run_result)
+    writer.write_table('orders', tables['orders'])
+    # the run.json is not visible until it is closed
+    assert not os.path.exists(run_json)
+
+    header = writer.close(dict(run_result, tables=dict(orders=dict(name='orders'), customers=tables['customers'])))
+    assert load_run_result(run_json) == json.loads(json.dumps(dict(run_result, tables=tables)))
+    assert header['table_count'] == 2
+    assert not writer.abort()
+
+
+def test_run_result_writer_abort(tmp_path):
+    run_json = str(tmp_path / 'run.json')
+    writer = RunResultWriter(run_json, _run_result(), run_format='gzip')
+    writer.write_table('orders', _run_result()['tables']['orders'])
+    assert writer.abort()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_run_output_with_header(tmp_path, monkeypatch):
+    run_json = str(tmp_path / 'run.json')
+    write_run_result(run_json, _run_result())
+
+    def _summarize_run_result(run_result):
+        raise AssertionError('run.json should not be loaded')
+
+    monkeypatch.setattr('piperider_cli.compare_report.summarize_run_result', _summarize_run_result)
+    run = RunOutput(run_json)
+    assert (run.report_id, run.name, run.table_count, run.pass_count, run.fail_count) == ('run-1', 'local', 2, 2, 1)
+
+
+def test_run_output_without_header(tmp_path):
+    run_json = str(tmp_path / 'run.json')
+    write_run_result(run_json, _run_result())
+
+    # the run.json changed by others, e.g. the older versions, is loaded entirely
+    run_result = _run_result()
+    run_result['tables'].pop('customers')
+    with open(run_json, 'w') as f:
+        f.write(json.dumps(run_result))
+    assert read_run_header(run_json) is None
+    assert RunOutput(run_json).table_count == 1
+
+    os.remove(str(tmp_path / RUN_HEADER_FILE))
+    assert RunOutput(run_json).table_count == 1
+
+
+def _write_outputs(output_dir):
+    for i, name in enumerate(['local', 'local', 'other']):
+        run_result = _run_result()
+        run_result['id'] = f'run-{i}'
+        run_result['datasource']['name'] = name
+        run_result['created_at'] = f'2023-05-0{i + 1}T10:00:00.000000Z'
+        run_dir = output_dir / f'{name}-{i}'
+        run_dir.mkdir(parents=True)
+        write_run_result(str(run_dir / 'run.json'), run_result)
+
+
+def test_report_index(tmp_path, monkeypatch):
+    output_dir = tmp_path / 'outputs'
+    _write_outputs(output_dir)
+
+    # the index of the output directory is built once if it is absent
+    outputs = CompareReport(str(output_dir), datasource='local').list_existing_outputs()
+    assert [o.report_id for o in outputs] == ['run-1', 'run-0']
+    index = ReportIndex(str(output_dir))
+    assert sorted(index.entries.keys()) == ['local-0/run.json', 'local-1/run.json', 'other-2/run.json']
+
+    # the indexed outputs are neither walked nor read again
+    def _find_run_jsons(path):
+        raise AssertionError(f'{path} should not be walked')
+
+    def _read_run_header(path):
+        raise AssertionError(f'{path} should not be read')
+
+    monkeypatch.setattr('piperider_cli.compare_report.find_run_jsons', _find_run_jsons)
+    monkeypatch.setattr('piperider_cli.compare_report.read_run_header', _read_run_header)
+    monkeypatch.setattr('os.path.getsize', _read_run_header)
+    outputs = CompareReport(str(output_dir)).list_existing_outputs()
+    assert [(o.name, o.table_count, o.pass_count) for o in outputs] == [('other', 2, 2), ('local', 2, 2),
+                                                                        ('local', 2, 2)]
+    assert outputs[0].file_size == os.stat(outputs[0].path).st_size
+    monkeypatch.undo()
+
+    # the index is updated when the run.json is rewritten
+    run_json = str(output_dir / 'local-0' / 'run.json')
+    run_result = _run_result()
+    run_result['id'] = 'run-0'
+    run_result['tables'].pop('customers')
+    update_report_index(run_json, write_run_result(run_json, run_result))
+    outputs = CompareReport(str(output_dir), datasource='local').list_existing_outputs()
+    assert [o.table_count for o in outputs] == [2, 1]
+
+
+def test_report_index_read_only(tmp_path):
+    search_path = tmp_path / 'shared'
+    _write_outputs(search_path)
+
+    # the directories other than the output directory are listed without writing the index
+    outputs = CompareReport(str(tmp_path / 'outputs')).list_existing_outputs(output_search_path=str(search_path))
+    assert len(outputs) == 3
+    assert not os.path.exists(str(search_path / REPORT_INDEX_FILE))
+
+    run_json = str(search_path / 'local-0' / 'run.json')
+    update_report_index(run_json, write_run_result(run_json, _run_result()))
+    assert not os.path.exists(str(search_path / REPORT_INDEX_FILE))
+
+
+def test_compressed_run_result(tmp_path):
+    run_json = str(tmp_path / 'run.json')
+    plain = str(tmp_path / 'plain.json')
+    write_run_result(plain, _run_result())
+    write_run_result(run_json, _run_result(), run_format='gzip')
+
+    assert detect_run_format(run_json) == 'gzip'
+    assert os.path.getsize(run_json) < os.path.getsize(plain)
+    assert load_run_result(run_json) == load_run_result(plain)
+    with open_run_json_as_plain(run_json) as f:
+        assert json.loads(f.read()) == load_run_result(plain)
+
+    os.remove(str(tmp_path / RUN_HEADER_FILE))
+    run = RunOutput(run_json)
+    assert (run.report_id, run.table_count, run.pass_count) == ('run-1', 2, 2)
+    assert run.load() == load_run_result(plain)
+
+
+def test_zstd_run_result(tmp_path):
+    pytest.importorskip('zstandard')
+    run_json = str(tmp_path / 'run.json')
+    write_run_result(run_json, _run_result(), run_format='zstd')
+    assert detect_run_format(run_json) == 'zstd'
+    assert load_run_result(run_json)['id'] == 'run-1'